@@ -0,0 +1,154 @@
+"""
+Accuracy vs. speed of the embedding backends on a fixed corpus of our articles.
+
+Usage (from LIT_article_bot/):
+    python -m benchmarks.embedding_backends
+    python -m benchmarks.embedding_backends --backends torch onnx-int8 --k 5 --min-recall 0.9
+
+Each backend runs in a fresh subprocess so cold-load time and peak memory
+are measured independently. Reports:
+  - load_s:      cold model load time
+  - emb/sec:     encode throughput over --texts documents
+  - peak_rss_mb: peak resident memory of the process
+  - recall@k:    overlap of each query's top-k documents with the torch
+                 (reference) backend's top-k
+  - hit@k:       share of article titles whose own article is in the top-k
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from embedding_service import BACKENDS, DEFAULT_MODEL, encode_texts, load_embedding_model
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "articles.jsonl")
+REFERENCE = "torch"
+
+
+def load_corpus(path):
+    with open(path) as f:
+        articles = [json.loads(line) for line in f if line.strip()]
+    documents = [f"{a['title']}\n\n{a['summary']}" for a in articles]
+    # Titles make realistic short /ask-style queries with a known answer
+    queries = [a['title'] for a in articles]
+    # Queries are scored against the summary only, so a title isn't matched to itself verbatim
+    return [a['summary'] for a in articles], queries, documents
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(args):
+    """Measures one backend and writes its embeddings for the accuracy comparison."""
+    import numpy as np
+
+    summaries, queries, documents = load_corpus(args.corpus)
+
+    start = time.perf_counter()
+    model = load_embedding_model(args.model, args.child, args.onnx_file, args.threads)
+    load_s = time.perf_counter() - start
+
+    encode_texts(model, documents[:4])  # warm up
+    workload = (documents * (args.texts // len(documents) + 1))[:args.texts]
+    start = time.perf_counter()
+    encode_texts(model, workload)
+    rate = len(workload) / (time.perf_counter() - start)
+
+    np.savez(
+        args.out,
+        docs=np.array(encode_texts(model, summaries)),
+        queries=np.array(encode_texts(model, queries))
+    )
+    print(json.dumps({"load_s": load_s, "rate": rate, "peak_rss_mb": peak_rss_mb()}))
+
+
+def top_k(doc_vectors, query_vectors, k):
+    import numpy as np
+
+    docs = doc_vectors / np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+    queries = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    scores = queries @ docs.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("EMBED_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--corpus", default=FIXTURE)
+    parser.add_argument("--texts", type=int, default=1000, help="documents encoded for throughput")
+    parser.add_argument("--threads", type=int, default=None, help="torch threads (default: all cores)")
+    parser.add_argument("--onnx-file", default=None)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.9, help="accuracy bar for the recommendation")
+    parser.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    import numpy as np
+
+    backends = [REFERENCE] + [b for b in args.backends if b != REFERENCE]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            out = os.path.join(tmp, f"{backend}.npz")
+            command = [
+                sys.executable, "-m", "benchmarks.embedding_backends",
+                "--child", backend, "--out", out,
+                "--model", args.model, "--corpus", args.corpus, "--texts", str(args.texts),
+            ]
+            if args.threads:
+                command += ["--threads", str(args.threads)]
+            if args.onnx_file:
+                command += ["--onnx-file", args.onnx_file]
+
+            proc = subprocess.run(command, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{backend}: failed\n{proc.stderr.strip()[-500:]}\n")
+                continue
+            results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+            vectors = np.load(out)
+            results[backend]["docs"] = vectors["docs"]
+            results[backend]["queries"] = vectors["queries"]
+
+    if REFERENCE not in results:
+        print("Reference backend failed; cannot compute recall.")
+        return
+
+    k = args.k
+    reference = top_k(results[REFERENCE]["docs"], results[REFERENCE]["queries"], k)
+    n_queries = len(reference)
+
+    print(f"Model {args.model}, {n_queries} queries, k={k}, {args.texts} texts for throughput\n")
+    print(f"{'backend':<12} {'load_s':>7} {'emb/sec':>9} {'peak_rss_mb':>12} {f'recall@{k}':>9} {f'hit@{k}':>7}")
+
+    passing = []
+    for backend, r in results.items():
+        ranked = top_k(r["docs"], r["queries"], k)
+        recall = sum(len(set(ranked[i]) & set(reference[i])) for i in range(n_queries)) / (n_queries * k)
+        hit = sum(i in ranked[i] for i in range(n_queries)) / n_queries
+        print(f"{backend:<12} {r['load_s']:>7.2f} {r['rate']:>9.1f} {r['peak_rss_mb']:>12.0f} {recall:>9.3f} {hit:>7.3f}")
+        if recall >= args.min_recall:
+            passing.append((r["rate"], backend))
+
+    if passing:
+        rate, backend = max(passing)
+        print(f"\nFastest backend with recall@{k} >= {args.min_recall}: {backend} ({rate:.1f} emb/sec)")
+        print(f"Set EMBED_BACKEND={backend} to use it.")
+    else:
+        print(f"\nNo backend met recall@{k} >= {args.min_recall}.")
+
+
+if __name__ == "__main__":
+    main()
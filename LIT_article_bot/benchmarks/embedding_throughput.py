@@ -0,0 +1,115 @@
+"""
+Embeddings/sec of the embedding service for different worker counts.
+
+Usage (from LIT_article_bot/):
+    python -m benchmarks.embedding_throughput --workers 0 1 2 4 8 --texts 2000 --clients 4
+
+workers=0 measures in-process encoding (the old behaviour) as a baseline.
+"""
+import argparse
+import os
+import threading
+import time
+
+from embedding_service import DEFAULT_MODEL, EmbeddingClient, launch_service
+
+SENTENCES = [
+    "The Personal Data Protection Commission imposed a financial penalty on the organisation.",
+    "Regulators are consulting on guidelines for generative AI models used in financial services.",
+    "The court held that the training of a model on copyrighted works was not fair use.",
+    "A new bill would require platforms to label deepfakes ahead of the general election.",
+    "Quantum-safe encryption standards were finalised after a multi-year review process.",
+    "Antitrust enforcers filed suit alleging the company abused its dominance in search.",
+    "The ministry announced a green data centre roadmap with renewable energy targets.",
+    "Lawyers warned that contract review tools can hallucinate clauses that do not exist.",
+]
+
+
+def make_corpus(n_texts, chars=1000):
+    """Deterministic ~1000-char chunks, the size RagEngine indexes."""
+    corpus = []
+    for i in range(n_texts):
+        words = []
+        j = i
+        while len(" ".join(words)) < chars:
+            words.append(SENTENCES[j % len(SENTENCES)])
+            j += 3
+        corpus.append(f"[{i}] " + " ".join(words)[:chars])
+    return corpus
+
+
+def run_clients(encode, corpus, clients, request_size):
+    """Splits the corpus across client threads, each sending request_size texts per call."""
+    shards = [corpus[i::clients] for i in range(clients)]
+
+    def worker(shard):
+        for i in range(0, len(shard), request_size):
+            encode(shard[i:i + request_size])
+
+    threads = [threading.Thread(target=worker, args=(shard,)) for shard in shards]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def bench_in_process(model_name, corpus, clients, request_size):
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    lock = threading.Lock()  # one model, shared like the bot did
+
+    def encode(texts):
+        with lock:
+            model.encode(texts, convert_to_numpy=True)
+
+    encode(corpus[:8])  # warm up
+    return run_clients(encode, corpus, clients, request_size)
+
+
+def bench_service(model_name, workers, batch_size, port, corpus, clients, request_size):
+    authkey = b"bench"
+    process = launch_service(model_name, workers, batch_size, "127.0.0.1", port, authkey)
+    try:
+        client = EmbeddingClient("127.0.0.1", port, authkey)
+        client.encode(corpus[:8])  # warm up
+        return run_clients(client.encode, corpus, clients, request_size)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("EMBED_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=4, help="concurrent callers (indexing + /ask)")
+    parser.add_argument("--request-size", type=int, default=32, help="texts per encode request")
+    parser.add_argument("--batch-size", type=int, default=64, help="texts per worker batch")
+    parser.add_argument("--port", type=int, default=6111)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.texts)
+    print(f"Encoding {len(corpus)} texts with {args.model}, {args.clients} clients, "
+          f"{args.request_size} texts/request, {os.cpu_count()} CPUs\n")
+    print(f"{'workers':>8} {'seconds':>10} {'emb/sec':>10} {'speedup':>8}")
+
+    baseline = None
+    for i, workers in enumerate(args.workers):
+        if workers == 0:
+            elapsed = bench_in_process(args.model, corpus, args.clients, args.request_size)
+        else:
+            elapsed = bench_service(
+                args.model, workers, args.batch_size, args.port + i,
+                corpus, args.clients, args.request_size
+            )
+        rate = len(corpus) / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {elapsed:>10.2f} {rate:>10.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
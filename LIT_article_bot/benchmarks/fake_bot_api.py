@@ -0,0 +1,213 @@
+"""
+Local fake of the Telegram Bot API, for exercising the bot without Telegram.
+
+Point the bot at it with TELEGRAM_BASE_URL=http://127.0.0.1:8081/bot. Every
+method call is recorded and answered with a plausible result. When the bot
+registers a webhook (BOT_MODE=webhook), the fake can deliver updates to it
+with the secret token, like Telegram does.
+
+Usage (from LIT_article_bot/), with the bot running in webhook mode:
+    python -m benchmarks.fake_bot_api --port 8081 --updates 50 --text "/search AI"
+
+This delivers 50 updates once the webhook is registered and reports the
+time from each update POST to the bot's reply.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+from urllib.parse import parse_qsl, urlparse
+
+from http_helpers import read_request, write_response
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {"id": 1000, "is_bot": True, "first_name": "Fake", "username": "fake_bot",
+            "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False}
+
+
+def make_message_update(update_id, chat_id, text, user_id=None):
+    """Telegram-shaped update for a private text message (commands get an entity)."""
+    user_id = user_id or chat_id
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private", "first_name": "Load"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "Load"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split(" ", 1)[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
+
+
+def _parse_params(request):
+    content_type = request.headers.get("content-type", "")
+    if "application/json" in content_type:
+        return json.loads(request.body or b"{}")
+    if "multipart/form-data" in content_type:
+        return {}  # file uploads aren't needed by the bot
+    params = {}
+    # PTB sends form fields whose non-string values are JSON-encoded
+    for key, value in parse_qsl(request.body.decode()):
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+class FakeBotApi:
+    def __init__(self, host="127.0.0.1", port=8081, latency=0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency  # seconds added to every API call
+        self.calls = []  # (monotonic time, method, params)
+        self.webhook = None  # (url, secret_token)
+        self._message_ids = itertools.count(1)
+        self._changed = asyncio.Condition()
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        logger.info(f"Fake Bot API on http://{self.host}:{self.port}/bot<token>/<method>")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    return
+                # Path is /bot<token>/<method>
+                method = request.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+                params = _parse_params(request)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                result = self._result_for(method, params)
+
+                async with self._changed:
+                    self.calls.append((time.monotonic(), method, params))
+                    self._changed.notify_all()
+
+                await write_response(writer, 200, json.dumps({"ok": True, "result": result}),
+                                     keep_alive=request.keep_alive)
+                if not request.keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _result_for(self, method, params):
+        if method == "getMe":
+            return BOT_USER
+        if method == "setWebhook":
+            self.webhook = (params.get("url"), params.get("secret_token"))
+            return True
+        if method == "deleteWebhook":
+            self.webhook = None
+            return True
+        if method == "getWebhookInfo":
+            url = self.webhook[0] if self.webhook else ""
+            return {"url": url, "has_custom_certificate": False, "pending_update_count": 0}
+        if method == "getUpdates":
+            return []
+        if method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            chat_id = params.get("chat_id", 0)
+            return {
+                "message_id": params.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        return True
+
+    async def wait_for(self, predicate, timeout=30, since=0):
+        """Waits for a recorded call matching predicate(method, params) after index `since`."""
+        deadline = time.monotonic() + timeout
+        async with self._changed:
+            while True:
+                for i in range(since, len(self.calls)):
+                    at, method, params = self.calls[i]
+                    if predicate(method, params):
+                        return self.calls[i]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(self._changed.wait(), remaining)
+
+    async def deliver_update(self, update):
+        """POSTs an update to the registered webhook, as Telegram would. Returns the HTTP status."""
+        if not self.webhook:
+            raise RuntimeError("No webhook registered yet")
+        url, secret = self.webhook
+        parsed = urlparse(url)
+        body = json.dumps(update).encode()
+        headers = (
+            f"POST {parsed.path or '/'} HTTP/1.1\r\n"
+            f"Host: {parsed.hostname}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n"
+        )
+        if secret:
+            headers += f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\n"
+        reader, writer = await asyncio.open_connection(parsed.hostname, parsed.port or 80)
+        writer.write(headers.encode() + b"\r\n" + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        writer.close()
+        return int(status_line.split()[1])
+
+
+async def _run(args):
+    api = FakeBotApi(args.host, args.port, args.latency)
+    await api.start()
+    if not args.updates:
+        await asyncio.Event().wait()
+
+    logger.info("Waiting for the bot to register its webhook...")
+    while not api.webhook:
+        await asyncio.sleep(0.2)
+
+    latencies = []
+    for i in range(args.updates):
+        chat_id = 5000 + i
+        since = len(api.calls)
+        start = time.monotonic()
+        status = await api.deliver_update(make_message_update(i + 1, chat_id, args.text))
+        if status != 200:
+            logger.warning(f"Update {i + 1} answered HTTP {status}")
+            continue
+        at, _, _ = await api.wait_for(
+            lambda m, p: m == "sendMessage" and str(p.get("chat_id")) == str(chat_id), since=since
+        )
+        latencies.append(at - start)
+
+    latencies.sort()
+    if latencies:
+        print(f"{len(latencies)} replies: p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms")
+    await api.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each API call")
+    parser.add_argument("--updates", type=int, default=0, help="updates to deliver via the webhook")
+    parser.add_argument("--text", default="/search AI")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    asyncio.run(_run(args))
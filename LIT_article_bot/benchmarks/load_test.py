@@ -0,0 +1,326 @@
+"""
+Concurrent user load test for the interactive commands.
+
+Feeds synthetic Updates (/search, /ask, /summarise and private links) into
+the real Application built by bot.build_application(), at a configurable
+rate, and measures how long users wait for replies and how far the event
+loop falls behind. Everything the handlers talk to is local:
+    - Telegram: benchmarks.fake_bot_api, in-process (TELEGRAM_BASE_URL)
+    - Ollama: the LLM client's stub backend (LLM_BACKEND=stub)
+    - Article pages (goose3): a stub serving fixtures/articles.jsonl
+    - Feeds and the PDPC API: the replay fixtures, for the fetch cycle
+The bot runs in a temporary directory with fresh stores, seeded with the
+fixture articles so /search and /ask have something to find.
+
+Two phases run back to back: commands alone ("idle"), then the same load
+while a fetch cycle runs ("during fetch"). For each request type it reports
+the acknowledgement ("first"), the first streamed text of the answer ("text",
+the latency users notice) and the final formatted answer ("final").
+
+Usage (from LIT_article_bot/):
+    python -m benchmarks.load_test --rate 5 --duration 30
+    python -m benchmarks.load_test --mix search=1 --rate 20 --dispatch webhook
+    python -m benchmarks.load_test --ollama-latency 2 --fetch-scale 50
+
+--dispatch polling puts updates on the Application's update queue, the way
+run_polling() delivers them. --dispatch webhook processes each update in its
+own task under WEBHOOK_MAX_CONCURRENCY, the way WebhookServer does. Every
+request comes from a new chat, so the per-chat send limit doesn't apply. The
+global send rate (SEND_GLOBAL_RATE) does, as it would in production.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timedelta
+
+from telegram import Update
+
+from benchmarks.fake_bot_api import FakeBotApi, make_message_update
+from benchmarks.replay_ingest import FIXTURE_DIR, Replay
+from streaming_reply import CURSOR
+
+ARTICLES_FILE = os.path.join(os.path.dirname(__file__), "fixtures", "articles.jsonl")
+
+REQUEST_TYPES = ("search", "ask", "summarise", "link")
+# These reply with a placeholder, then edit it as the LLM output streams in;
+# the final edit is the one without the streaming cursor
+STREAMED = {"ask", "summarise", "link"}
+
+
+def load_articles():
+    with open(ARTICLES_FILE) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def install_goose_stub(articles, latency):
+    """Stand-in for goose3: 'extracts' a fixture article after `latency` seconds."""
+    class Extracted:
+        def __init__(self, article):
+            self.title = article["title"]
+            self.cleaned_text = article["summary"]
+            self.domain = article["source"]
+
+    class Goose:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def extract(self, url=None, **kwargs):
+            time.sleep(latency)
+            return Extracted(articles[sum(map(ord, url)) % len(articles)])
+
+        def close(self):
+            pass
+
+    module = types.ModuleType("goose3")
+    module.Goose = Goose
+    sys.modules["goose3"] = module
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in REQUEST_TYPES:
+            raise argparse.ArgumentTypeError(f"unknown request type {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic sleep wakes up; the lateness is time the loop was blocked or busy."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.samples = []
+        self.task = None
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.monotonic() - start - self.interval))
+
+    def start(self):
+        self.samples = []
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        return self.samples
+
+
+class LoadGenerator:
+    def __init__(self, application, api, articles, mix, dispatch, max_concurrency):
+        self.application = application
+        self.api = api
+        self.articles = articles
+        self.mix = mix
+        self.dispatch = dispatch
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.random = random.Random(42)
+        self.update_ids = iter(range(1, 10 ** 9))
+        self.chat_ids = iter(range(100000, 10 ** 9))
+        self.tasks = set()
+
+    def _text_for(self, kind):
+        article = self.random.choice(self.articles)
+        topic = " ".join(article["title"].split()[:2])
+        if kind == "search":
+            return f"/search {topic}"
+        if kind == "ask":
+            return f"/ask What happened with {topic}?"
+        link = f"https://example.com/load/{next(self.update_ids)}"
+        return f"/summarise {link}" if kind == "summarise" else f"Have a look at {link}"
+
+    async def _deliver(self, update):
+        if self.dispatch == "polling":
+            await self.application.update_queue.put(update)
+        else:
+            async with self.semaphore:
+                await self.application.process_update(update)
+
+    async def _request(self, kind, results, timeout):
+        chat_id = next(self.chat_ids)
+        update = Update.de_json(make_message_update(next(self.update_ids), chat_id, self._text_for(kind)),
+                                self.application.bot)
+        since = len(self.api.calls)
+        start = time.monotonic()
+        delivery = asyncio.create_task(self._deliver(update))
+
+        def to_chat(method):
+            return lambda m, p: m == method and str(p.get("chat_id")) == str(chat_id)
+
+        try:
+            call = await self.api.wait_for(to_chat("sendMessage"), timeout=timeout, since=since)
+            first = final = text = call[0] - start
+            if kind in STREAMED:
+                # Streamed edits, then the final one
+                while True:
+                    since = self.api.calls.index(call, since) + 1
+                    call = await self.api.wait_for(to_chat("editMessageText"),
+                                                   timeout=max(0.0, start + timeout - time.monotonic()),
+                                                   since=since)
+                    streaming = call[2].get("text", "").endswith(CURSOR)
+                    if text == first:
+                        text = call[0] - start
+                    if not streaming:
+                        final = call[0] - start
+                        break
+        except asyncio.TimeoutError:
+            results["timeouts"] += 1
+        else:
+            results["first"].setdefault(kind, []).append(first)
+            results["text"].setdefault(kind, []).append(text)
+            results["final"].setdefault(kind, []).append(final)
+        await delivery
+
+    async def run(self, rate, duration, timeout):
+        """Poisson arrivals at `rate` requests/sec for `duration` seconds; waits for the stragglers."""
+        results = {"first": {}, "text": {}, "final": {}, "timeouts": 0, "sent": 0}
+        kinds, weights = zip(*self.mix.items())
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            kind = self.random.choices(kinds, weights)[0]
+            task = asyncio.create_task(self._request(kind, results, timeout))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            results["sent"] += 1
+            await asyncio.sleep(self.random.expovariate(rate))
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
+        return results
+
+
+def print_phase(name, results, lag, elapsed, extra=""):
+    print(f"\n== {name}: {results['sent']} requests in {elapsed:.1f}s, {results['timeouts']} timed out{extra}")
+    print(f"{'request':<10} {'n':>5} {'first p50':>10} {'text p50':>10} {'final p50':>10} {'p95':>8} "
+          f"{'p99':>8} {'max':>8}")
+    for kind in sorted(results["final"]):
+        first, text, final = results["first"][kind], results["text"][kind], results["final"][kind]
+        print(f"{kind:<10} {len(final):>5} {percentile(first, 0.5) * 1000:>8.0f}ms "
+              f"{percentile(text, 0.5) * 1000:>8.0f}ms "
+              f"{percentile(final, 0.5) * 1000:>8.0f}ms {percentile(final, 0.95) * 1000:>6.0f}ms "
+              f"{percentile(final, 0.99) * 1000:>6.0f}ms {max(final) * 1000:>6.0f}ms")
+    print(f"event loop lag: p50 {percentile(lag, 0.5) * 1000:.1f}ms, p99 {percentile(lag, 0.99) * 1000:.1f}ms, "
+          f"max {max(lag, default=0) * 1000:.1f}ms")
+
+
+async def run(args):
+    articles = load_articles()
+    api = FakeBotApi(port=args.api_port, latency=args.telegram_latency)
+    await api.start()
+
+    # Import the bot last: it builds its stores and clients at import time
+    import bot
+    seed_bot(bot, articles)
+    application = bot.build_application()
+    await application.initialize()
+    await bot.post_init(application)
+    await application.start()
+
+    generator = LoadGenerator(application, api, articles, args.mix, args.dispatch, args.max_concurrency)
+    monitor = LoopLagMonitor()
+    try:
+        # Phase 1: commands alone
+        monitor.start()
+        start = time.monotonic()
+        results = await generator.run(args.rate, args.duration, args.timeout)
+        print_phase("idle", results, await monitor.stop(), time.monotonic() - start)
+
+        # Phase 2: the same load while a fetch cycle posts the replayed feeds
+        context = types.SimpleNamespace(bot=application.bot)
+        fetch_run, _ = bot.fetch_runner.start(
+            lambda run: bot.fetch_cycle(context, run, datetime.now() - timedelta(days=3650)),
+            reason="load test"
+        )
+        monitor.start()
+        start = time.monotonic()
+        results = await generator.run(args.rate, args.duration, args.timeout)
+        lag = await monitor.stop()
+        elapsed = time.monotonic() - start
+        cycle_note = f"; fetch cycle {fetch_run.status} ({fetch_run.posted} posted so far)"
+        print_phase("during fetch", results, lag, elapsed, cycle_note)
+
+        if fetch_run.task and not fetch_run.task.done():
+            fetch_run.task.cancel()
+    finally:
+        await application.stop()
+        await bot.post_shutdown(application)
+        await application.shutdown()
+        await api.stop()
+
+
+def seed_bot(bot, articles):
+    """Stores and indexes the fixture articles, so /search and /ask have results."""
+    from pipeline import index_text, rag_metadata
+
+    for article in articles:
+        article = dict(article, link=article["link"] + "#seed",
+                       published=datetime.fromisoformat(article["published"]))
+        processed = {"category": article["category"]}
+        bot.storage.add_article(article["link"], article["title"], article["summary"], article["category"], "",
+                                source=article["source"])
+        bot.rag_engine.index_article(text=index_text(article), metadata=rag_metadata(article, processed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=5.0, help="requests per second (Poisson arrivals)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load per phase")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("search=4,ask=2,summarise=2,link=2"),
+                        help="request weights, e.g. search=4,ask=2,summarise=2,link=2")
+    parser.add_argument("--dispatch", choices=("polling", "webhook"), default="polling")
+    parser.add_argument("--max-concurrency", type=int, default=16, help="webhook dispatch only")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds before a request counts as timed out")
+    parser.add_argument("--ollama-latency", type=float, default=1.0)
+    parser.add_argument("--telegram-latency", type=float, default=0.05)
+    parser.add_argument("--fetch-latency", type=float, default=0.3, help="seconds per stubbed article page fetch")
+    parser.add_argument("--fetch-scale", type=int, default=10, help="replayed feed volume for the fetch cycle")
+    parser.add_argument("--api-port", type=int, default=8089)
+    args = parser.parse_args()
+
+    # The bot reads its configuration at import; point everything at local stubs
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": "123456:LOADTEST",
+        "TELEGRAM_BASE_URL": f"http://127.0.0.1:{args.api_port}/bot",
+        "CHANNEL_ID": "@loadtest",
+        "BOT_ROLE": "all",
+        "BOT_MODE": "webhook",  # no Updater; updates come from this script
+        "METRICS_PORT": "0",
+        "EMBED_WORKERS": "0",
+        "CHROMA_HOST": "",
+        "CHROMA_DB_PATH": os.path.join(workdir, "chroma"),
+        "LEXICAL_DB_PATH": os.path.join(workdir, "lexical.db"),
+        "SHARE_CACHE_PERSIST": "false",
+        "LLM_BACKEND": "stub",
+        "LLM_STUB_LATENCY": str(args.ollama_latency),
+    })
+    sys.path.insert(0, os.getcwd())
+    os.chdir(workdir)  # bot_data.db is created in the working directory
+
+    install_goose_stub(load_articles(), args.fetch_latency)
+    Replay(FIXTURE_DIR, args.fetch_scale).install()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
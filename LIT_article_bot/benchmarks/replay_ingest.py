@@ -0,0 +1,369 @@
+"""
+Offline replay benchmark for the ingest pipeline.
+
+Replays recorded feed and PDPC API responses through RSSFetcher,
+ArticleProcessor, Storage and RagEngine, the same way a fetch cycle does
+(fetch -> is_new -> route -> summarize -> post -> store -> index).
+Ollama (LLM_BACKEND=stub) and Telegram are replaced by deterministic stubs
+with configurable latency; nothing leaves the machine.
+
+Usage (from LIT_article_bot/):
+    python -m benchmarks.replay_ingest                         # 10x, 100x, 1000x
+    python -m benchmarks.replay_ingest --scales 1 10 --ollama-latency 0.2
+    python -m benchmarks.replay_ingest --save-baseline         # write baselines
+    python -m benchmarks.replay_ingest --check-baseline        # exit 1 on regression
+    python -m benchmarks.replay_ingest --record                # capture live responses
+
+Scale N repeats every recorded entry N times (with unique links), so 100x
+is a hundred times the recorded feed volume. Each scale runs in a fresh
+subprocess against empty temporary stores, so peak RSS is per scale.
+
+The shipped fixtures (benchmarks/fixtures/replay/) are built from
+fixtures/articles.jsonl in the recorded layout; --record replaces them with
+real responses from RSS_FEEDS and the PDPC API.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "replay")
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines", "replay_ingest.json")
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- Stubs ---
+
+class StubTelegram:
+    """Channel posts that just take `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.sent = 0
+
+    def send_message(self, chat_id, text, **kwargs):
+        time.sleep(self.latency)
+        self.sent += 1
+        return {"message_id": self.sent, "chat_id": chat_id, "text": text}
+
+
+# --- Replay of recorded HTTP responses ---
+
+class ReplayResponse:
+    def __init__(self, url, content, status_code=200):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} for replayed {self.url}")
+
+
+def scale_feed(content, scale):
+    """Re-renders a recorded RSS/Atom document as RSS 2.0 with every entry repeated `scale` times."""
+    import feedparser
+    from email.utils import format_datetime
+    from datetime import datetime
+    from xml.sax.saxutils import escape
+
+    feed = feedparser.parse(content)
+    items = []
+    for copy in range(scale):
+        for entry in feed.entries:
+            link = entry.get("link", "")
+            parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+            pub_date = format_datetime(datetime(*parsed[:6])) if parsed else ""
+            suffix = f" [{copy}]" if copy else ""
+            items.append(
+                "<item>"
+                f"<title>{escape(entry.get('title', '') + suffix)}</title>"
+                f"<link>{escape(link + (f'#r{copy}' if copy else ''))}</link>"
+                f"<description>{escape(entry.get('summary', ''))}</description>"
+                f"<pubDate>{pub_date}</pubDate>"
+                "</item>"
+            )
+    title = escape(feed.feed.get("title", "Replay"))
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>{title}</title>'
+        + "".join(items) + "</channel></rss>"
+    ).encode()
+
+
+def scale_pdpc(content, scale):
+    data = json.loads(content)
+    items = []
+    for copy in range(scale):
+        for item in data.get("items", []):
+            item = dict(item)
+            if copy:
+                item["title"] = f"{item.get('title', '')} [{copy}]"
+                item["url"] = f"{item.get('url', '')}#r{copy}"
+            items.append(item)
+    return json.dumps({**data, "items": items}).encode()
+
+
+class Replay:
+    """Serves recorded responses in place of requests.get/post."""
+
+    def __init__(self, fixture_dir, scale):
+        with open(os.path.join(fixture_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.responses = {}
+        for method in ("get", "post"):
+            for url, entry in manifest.get(method, {}).items():
+                with open(os.path.join(fixture_dir, entry["file"]), "rb") as f:
+                    content = f.read()
+                if scale > 1:
+                    is_json = "json" in entry.get("content_type", "")
+                    content = scale_pdpc(content, scale) if is_json else scale_feed(content, scale)
+                self.responses[(method, url)] = content
+        self.feed_urls = list(manifest.get("get", {}))
+
+    def get(self, url, *args, **kwargs):
+        return self._respond("get", url)
+
+    def post(self, url, *args, **kwargs):
+        return self._respond("post", url)
+
+    def _respond(self, method, url):
+        content = self.responses.get((method, url))
+        if content is None:
+            return ReplayResponse(url, b"", 404)
+        return ReplayResponse(url, content)
+
+    def install(self):
+        import requests
+        requests.get = self.get
+        requests.post = self.post
+
+
+# --- One scale, in a child process ---
+
+def run_child(args):
+    workdir = tempfile.mkdtemp(prefix="replay-")
+    # Empty stores per run; config reads these at import
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "replay")
+    os.environ["CHROMA_DB_PATH"] = os.path.join(workdir, "chroma")
+    os.environ["LEXICAL_DB_PATH"] = os.path.join(workdir, "lexical.db")
+    os.environ["EMBED_WORKERS"] = str(args.embed_workers)
+    os.environ["CHROMA_HOST"] = ""
+    # Ollama is replaced by the client's stub backend
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_LATENCY"] = str(args.ollama_latency)
+
+    replay = Replay(args.fixtures, args.child)
+    replay.install()
+
+    import metrics
+    from fetcher import RSSFetcher
+    from processor import ArticleProcessor
+    from storage import Storage
+    from pipeline import ensure_default_keywords, channel_router, format_article_message, index_text, rag_metadata
+
+    fetcher = RSSFetcher(replay.feed_urls)
+    processor = ArticleProcessor()
+    storage = Storage(os.path.join(workdir, "bot_data.db"))
+    ensure_default_keywords(storage)
+    rag_engine = None
+    if not args.no_index:
+        from rag_engine import RagEngine
+        rag_engine = RagEngine(related_store=storage)
+    telegram = StubTelegram(args.telegram_latency)
+
+    # Setup above isn't part of the measurement
+    metrics.STAGE_SECONDS.series.clear()
+
+    start = time.perf_counter()
+    articles = fetcher.fetch_updates(None)
+    router = channel_router(storage)
+    relevant = posted = 0
+    for article in articles:
+        if not storage.is_new(article['link']):
+            continue
+        if not router.route(article):
+            continue
+        relevant += 1
+
+        processed_data = processor.process_article(article, router.keywords)
+        if not processed_data:
+            continue
+        with metrics.timed("telegram_send", "group"):
+            telegram.send_message("@replay", format_article_message(article, processed_data), parse_mode="HTML")
+        storage.add_article(
+            article['link'], article['title'], processed_data['summary'],
+            processed_data.get('category'), processed_data['hashtags'], source=article['source']
+        )
+        posted += 1
+        if rag_engine:
+            rag_engine.index_article(text=index_text(article), metadata=rag_metadata(article, processed_data))
+    elapsed = time.perf_counter() - start
+
+    stages = {}
+    with metrics.STAGE_SECONDS._lock:
+        for (stage, target), series in metrics.STAGE_SECONDS.series.items():
+            name = f"{stage}:{target}" if stage == "sqlite" else stage
+            acc = stages.setdefault(name, {"calls": 0, "total_s": 0.0})
+            acc["calls"] += series[-1]
+            acc["total_s"] += series[-2]
+
+    print(json.dumps({
+        "scale": args.child,
+        "articles": len(articles),
+        "relevant": relevant,
+        "posted": posted,
+        "seconds": elapsed,
+        "articles_per_sec": len(articles) / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }))
+
+
+# --- Recording ---
+
+def record(fixture_dir):
+    """Runs one live fetch and saves every feed/PDPC response it made as the new fixtures."""
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "record")
+    import requests
+    from config import RSS_FEEDS
+    from fetcher import RSSFetcher
+
+    responses_dir = os.path.join(fixture_dir, "responses")
+    os.makedirs(responses_dir, exist_ok=True)
+    manifest = {"get": {}, "post": {}}
+    real_get, real_post = requests.get, requests.post
+
+    def recorder(method, real):
+        def call(url, *args, **kwargs):
+            response = real(url, *args, **kwargs)
+            if response.ok:
+                n = len(manifest["get"]) + len(manifest["post"])
+                content_type = response.headers.get("Content-Type", "")
+                extension = "json" if "json" in content_type else "xml"
+                filename = f"responses/{method}-{n:03d}.{extension}"
+                with open(os.path.join(fixture_dir, filename), "wb") as f:
+                    f.write(response.content)
+                manifest[method][url] = {"file": filename, "content_type": content_type}
+            return response
+        return call
+
+    requests.get = recorder("get", real_get)
+    requests.post = recorder("post", real_post)
+    articles = RSSFetcher(RSS_FEEDS).fetch_updates(None)
+
+    with open(os.path.join(fixture_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Recorded {len(manifest['get'])} feeds and {len(manifest['post'])} API responses "
+          f"({len(articles)} articles) to {fixture_dir}")
+
+
+# --- Baselines ---
+
+def compare(results, baseline, tolerance):
+    """Returns regression messages: throughput down or peak RSS up by more than `tolerance`."""
+    problems = []
+    for scale, result in results.items():
+        base = baseline.get(str(scale))
+        if not base:
+            continue
+        if result["articles_per_sec"] < base["articles_per_sec"] * (1 - tolerance):
+            problems.append(
+                f"{scale}x: {result['articles_per_sec']:.1f} articles/sec vs baseline {base['articles_per_sec']:.1f}"
+            )
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            problems.append(
+                f"{scale}x: peak RSS {result['peak_rss_mb']:.0f} MB vs baseline {base['peak_rss_mb']:.0f} MB"
+            )
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--ollama-latency", type=float, default=0.0, help="seconds per stub LLM call")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="seconds per stubbed channel post")
+    parser.add_argument("--embed-workers", type=int, default=0, help="EMBED_WORKERS for the run (0 = in-process)")
+    parser.add_argument("--no-index", action="store_true", help="skip RagEngine indexing")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression before failing (0.2 = 20%%)")
+    parser.add_argument("--record", action="store_true", help="record live responses into --fixtures")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+    if args.record:
+        record(args.fixtures)
+        return
+
+    results = {}
+    for scale in args.scales:
+        command = [
+            sys.executable, "-m", "benchmarks.replay_ingest", "--child", str(scale),
+            "--fixtures", args.fixtures,
+            "--ollama-latency", str(args.ollama_latency),
+            "--telegram-latency", str(args.telegram_latency),
+            "--embed-workers", str(args.embed_workers),
+        ]
+        if args.no_index:
+            command.append("--no-index")
+        proc = subprocess.run(command, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{scale}x: failed\n{proc.stderr.strip()[-800:]}\n")
+            continue
+        results[scale] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    print(f"Ollama stub {args.ollama_latency}s, Telegram stub {args.telegram_latency}s, "
+          f"{'no indexing' if args.no_index else f'EMBED_WORKERS={args.embed_workers}'}\n")
+    print(f"{'scale':>6} {'articles':>9} {'posted':>7} {'seconds':>8} {'articles/sec':>13} {'peak_rss_mb':>12}")
+    for scale, r in results.items():
+        print(f"{scale:>5}x {r['articles']:>9} {r['posted']:>7} {r['seconds']:>8.2f} "
+              f"{r['articles_per_sec']:>13.1f} {r['peak_rss_mb']:>12.0f}")
+
+    for scale, r in results.items():
+        print(f"\nStages at {scale}x (total seconds, calls):")
+        for stage, s in sorted(r["stages"].items(), key=lambda item: item[1]["total_s"], reverse=True):
+            print(f"  {stage:<28} {s['total_s']:>9.3f}s {s['calls']:>8}")
+
+    if args.save_baseline and results:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({str(scale): r for scale, r in results.items()}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if args.check_baseline:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+            sys.exit(1)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.tolerance)
+        if problems:
+            print("\nRegressions:\n  " + "\n  ".join(problems))
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} of {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,52 @@
 import logging
 import asyncio
+import os
+import signal
+import socket
+import threading
 
 from datetime import datetime, timedelta
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ApplicationBuilder, ContextTypes, CallbackQueryHandler, CommandHandler, Application, MessageHandler, filters
 from telegram.error import TelegramError
 
-from config import TELEGRAM_BOT_TOKEN, CHANNEL_ID, CHECK_INTERVAL_MINUTES, RSS_FEEDS, ADMIN_IDS, DEFAULT_KEYWORDS
+from config import TELEGRAM_BOT_TOKEN, CHANNEL_ID, CHECK_INTERVAL_MINUTES, RSS_FEEDS, ADMIN_IDS
+from config import SEND_GLOBAL_RATE, SEND_PRIVATE_RATE, SEND_GROUP_RATE_PER_MIN, SEND_MAX_RETRIES
+from config import SHARE_CACHE_MAX_SIZE, SHARE_CACHE_TTL_HOURS, SHARE_CACHE_PERSIST
+from config import BOT_ROLE, WORK_QUEUE_DB, WORK_POLL_SECONDS
+from config import DIGEST_MODE, DIGEST_MIN_ARTICLES, DIGEST_MAX_ARTICLES
+from config import METRICS_HOST, METRICS_PORT, LLM_WARMUP, STREAM_REPLIES, STREAM_EDIT_INTERVAL
+from config import USER_REQUESTS_PER_MINUTE, USER_REQUEST_BURST, USER_MAX_CONCURRENT
+from config import VECTOR_MAINTENANCE_HOURS
+from config import (
+    BOT_MODE, TELEGRAM_BASE_URL, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_LISTEN, WEBHOOK_PORT,
+    WEBHOOK_SECRET, WEBHOOK_MAX_CONCURRENCY
+)
 from fetcher import RSSFetcher
-from processor import ArticleProcessor
-from storage import Storage
-from rag_engine import RagEngine
+from processor import ArticleProcessor, MAIN_CHANNEL
+from storage import Storage, TREND_RETENTION_DAYS
+from rag_engine import RagEngine, parse_query_filters
+from send_queue import SendQueue, PRIORITY_USER, PRIORITY_CHANNEL
+from streaming_reply import StreamingReply
+from single_flight import SingleFlight, canonical_url, normalize_query
+from user_limiter import UserLimiter
+from ttl_cache import TTLCache
+from fetch_cycle import FetchCycleRunner
+from pipeline import (
+    ensure_default_keywords, channel_router, format_article_message, format_digest_messages, group_for_digest,
+    index_text, rag_metadata, article_to_payload, article_from_payload
+)
+from work_queue import (
+    WorkQueue, SCHEDULER_LEASE, JOB_FETCH_CYCLE, JOB_POST_ARTICLE, JOB_POST_DIGEST, JOB_INDEX_ARTICLE
+)
+from webhook_server import WebhookServer
+import metrics
+from metrics import MetricsServer
+from profiler import profiler
+from llm_client import get_client
+from llm_scheduler import LLMCancelled, PRIORITY_INTERACTIVE, llm_request
 import uuid
 
-# Global Cache for /summarise -> Share flow
-# Key: UUID, Value: Article Data Dict
-TEMP_ARTICLE_CACHE = {}
-
 # Setup Logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -30,8 +60,41 @@ logger = logging.getLogger(__name__)
 fetcher = RSSFetcher(RSS_FEEDS)
 processor = ArticleProcessor()
 storage = Storage()
+
+# Cache for /summarise -> Share flow
+# Key: UUID, Value: Article Data Dict. Bounded + expiring, persisted in bot_data.db
+# so Share buttons keep working across restarts.
+TEMP_ARTICLE_CACHE = TTLCache(
+    max_size=SHARE_CACHE_MAX_SIZE,
+    ttl_seconds=SHARE_CACHE_TTL_HOURS * 3600,
+    db_file=storage.db_file if SHARE_CACHE_PERSIST else None
+)
 # Initialize RAG Engine (Global)
-rag_engine = RagEngine()
+rag_engine = RagEngine(related_store=storage)
+# One LLM client (connection, warm model, deadlines) shared by summaries and /ask
+llm = get_client()
+# user_id -> cancel event of that user's LLM request in progress (see interactive_llm)
+pending_llm_requests = {}
+# Identical link summaries and /ask questions in flight are done once and shared
+in_flight = SingleFlight(rerun_on=(LLMCancelled,))
+# Per-user rate limit and concurrency cap for /ask, /summarise and private links (admins exempt)
+user_limiter = UserLimiter(USER_REQUESTS_PER_MINUTE, USER_REQUEST_BURST, USER_MAX_CONCURRENT, exempt=ADMIN_IDS)
+# Fetch cycles run one at a time in the background
+fetch_runner = FetchCycleRunner()
+# BOT_ROLE=frontend: fetching/summarizing/indexing is done by worker.py processes
+work_queue = WorkQueue(WORK_QUEUE_DB) if BOT_ROLE == "frontend" else None
+FRONTEND_ID = f"frontend-{socket.gethostname()}-{os.getpid()}"
+post_job_task = None
+# All outbound messages are paced through one queue (started in post_init)
+send_queue = SendQueue(SEND_GLOBAL_RATE, SEND_PRIVATE_RATE, SEND_GROUP_RATE_PER_MIN, SEND_MAX_RETRIES)
+# Prometheus scrape endpoint (started in post_init)
+metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+metrics.Gauge("litbot_send_queue_depth", "Messages waiting in the outbound send queue.", send_queue.depth)
+metrics.Gauge("litbot_llm_queue_depth", "LLM requests waiting for a slot.", llm.scheduler.depth)
+metrics.Gauge("litbot_share_cache_entries", "Pending /summarise share entries.", lambda: len(TEMP_ARTICLE_CACHE))
+if work_queue:
+    metrics.Gauge("litbot_work_queue_pending", "Jobs waiting for a worker or the front-end.",
+                  lambda: work_queue.stats().get("pending", 0))
 START_TIME = datetime.now()
 
 # --- Helper Checks ---
@@ -46,6 +109,111 @@ def is_admin(user_id):
         
     return True
 
+async def reply(update, text, **kwargs):
+    """Replies to the user via the send queue (ahead of channel posts)."""
+    message = update.effective_message
+    return await send_queue.send(
+        update.effective_chat.id,
+        lambda: message.reply_text(text, **kwargs),
+        priority=PRIORITY_USER
+    )
+
+def start_stream(placeholder, header=""):
+    """A StreamingReply that edits `placeholder` (a sent Message), or None if streaming is off."""
+    if not STREAM_REPLIES or placeholder is None:
+        return None
+    return StreamingReply(send_queue, placeholder, interval=STREAM_EDIT_INTERVAL, header=header)
+
+async def finish_reply(update, stream, text, **kwargs):
+    """Delivers the final answer: as the last edit of the stream, or as a new reply."""
+    if stream and await stream.finish(text, **kwargs):
+        return
+    await reply(update, text, **kwargs)
+
+async def post_to_channel(bot, text, chat_id=None, **kwargs):
+    """Posts to a channel (default CHANNEL_ID) via the send queue. Raises TelegramError if delivery fails."""
+    chat_id = chat_id or CHANNEL_ID
+    return await send_queue.send(
+        chat_id,
+        lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs),
+        priority=PRIORITY_CHANNEL
+    )
+
+def channel_targets(names):
+    """[(name, chat_id)] for routed channel names; the main channel is CHANNEL_ID."""
+    chat_ids = storage.get_channels()
+    chat_ids[MAIN_CHANNEL] = CHANNEL_ID
+    targets = []
+    for name in names or [MAIN_CHANNEL]:
+        if chat_ids.get(name):
+            targets.append((name, chat_ids[name]))
+        else:
+            logger.warning(f"No chat configured for channel '{name}'; skipping.")
+    return targets
+
+async def post_article_to_channels(bot, article, processed_data):
+    """Posts one summarized article to every channel it was routed to. Returns True if any post went out."""
+    message = format_article_message(article, processed_data)
+    posted = False
+    for name, chat_id in channel_targets(article.get('channels')):
+        try:
+            logger.info(f"Sending message to {name} for: {article['title']}")
+            # Paced by the send queue (per-chat + global rate limits)
+            await post_to_channel(
+                bot,
+                message,
+                chat_id=chat_id,
+                parse_mode='HTML',
+                reply_markup=remove_button_markup()
+            )
+            posted = True
+        except TelegramError as e:
+            logger.error(f"Failed to send message to {name}: {e}")
+    return posted
+
+async def post_digest_to_channels(bot, items, on_posted):
+    """
+    Posts digest messages to each channel the items were routed to. Each
+    article is summarized once and recorded (on_posted) once, after its first
+    successful post. Returns the last TelegramError, or None.
+    """
+    recorded = set()
+    error = None
+    names = []
+    for article, _ in items:
+        for name in article.get('channels') or [MAIN_CHANNEL]:
+            if name not in names:
+                names.append(name)
+
+    for name, chat_id in channel_targets(names):
+        routed = [(a, p) for a, p in items if name in (a.get('channels') or [MAIN_CHANNEL])]
+        for message, posted in format_digest_messages(routed, DIGEST_MODE):
+            try:
+                logger.info(f"Sending digest with {len(posted)} articles to {name}")
+                await post_to_channel(
+                    bot,
+                    message,
+                    chat_id=chat_id,
+                    parse_mode='HTML',
+                    disable_web_page_preview=True,
+                    reply_markup=remove_button_markup()
+                )
+            except TelegramError as e:
+                logger.error(f"Failed to send digest to {name}: {e}")
+                error = e
+                continue
+
+            for article, processed_data in posted:
+                if article['link'] not in recorded:
+                    recorded.add(article['link'])
+                    await on_posted(article, processed_data)
+    return error
+
+def remove_button_markup():
+    """Remove button attached to channel posts (handled in handle_callback)."""
+    keyboard = [[InlineKeyboardButton("Remove ❌", callback_data="remove")]]
+    return InlineKeyboardMarkup(keyboard)
+
 # --- Error Handler ---
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     """Log the error and send a telegram message to notify the developer."""
@@ -68,160 +236,432 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     for admin_id in ADMIN_IDS:
         if admin_id != 0:
             try:
-                await context.bot.send_message(chat_id=admin_id, text=message, parse_mode='HTML')
+                await send_queue.send(
+                    admin_id,
+                    lambda: context.bot.send_message(chat_id=admin_id, text=message, parse_mode='HTML'),
+                    priority=PRIORITY_USER
+                )
             except Exception as e:
                 logger.error(f"Failed to send error report to admin {admin_id}: {e}")
 
 
+async def interactive_llm(update, func, *args, **kwargs):
+    """
+    Runs func(*args, **kwargs) in a thread with its LLM calls queued at interactive
+    priority. Raises LLMCancelled if the user sends a newer LLM request or
+    /cancel first; the abandoned request leaves the LLM queue without running.
+    """
+    user_id = update.effective_user.id
+    previous = pending_llm_requests.get(user_id)
+    if previous:
+        previous.set()
+    cancelled = threading.Event()
+    pending_llm_requests[user_id] = cancelled
+    try:
+        # asyncio.to_thread copies the context, so the LLM client sees this priority
+        with llm_request(PRIORITY_INTERACTIVE, cancelled):
+            result = await asyncio.to_thread(profiler.wrap(func), *args, **kwargs)
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+    finally:
+        if pending_llm_requests.get(user_id) is cancelled:
+            del pending_llm_requests[user_id]
+    if cancelled.is_set():
+        raise LLMCancelled("superseded by a newer request")
+    return result
+
+def extract_article(url):
+    """Scrapes a page with goose3 (blocking). Returns article data for the processor, or None without a title."""
+    from goose3 import Goose
+    g = Goose()
+    try:
+        with metrics.timed("goose_extract"):
+            article = g.extract(url=url)
+    finally:
+        g.close()
+    if not article.title:
+        return None
+    return {
+        "title": article.title,
+        "link": url,
+        "summary": article.cleaned_text[:2000],
+        "published": datetime.now(),
+        "source": article.domain
+    }
+
+async def shared_article(url, source):
+    """extract_article, shared by concurrent requests for the same page."""
+    article_data = await in_flight.run(
+        ("extract", canonical_url(url)),
+        lambda on_text: asyncio.to_thread(profiler.wrap(extract_article), url)
+    )
+    if not article_data:
+        return None
+    # Each caller gets its own copy; the link is the one this user sent
+    return dict(article_data, link=url, source=article_data['source'] or source)
+
+async def find_related(article_data, limit=3):
+    """
+    [(link, title)] of the closest indexed articles: the precomputed neighbours
+    if this article is indexed, else one embedding and one vector query.
+    """
+    try:
+        related = await asyncio.to_thread(storage.get_related, article_data['link'], limit)
+        if not related:
+            related = await asyncio.to_thread(
+                profiler.wrap(rag_engine.related_articles), index_text(article_data), article_data['link'], limit
+            )
+        return related
+    except Exception as e:
+        logger.warning(f"Related-article lookup failed: {e}")
+        return []
+
+async def shared_summary(update, article_data, stream):
+    """processor.process_article at interactive priority, shared by concurrent requests for the same page."""
+    current_keywords = storage.get_keywords()
+    processed_data = await in_flight.run(
+        ("summary", canonical_url(article_data['link'])),
+        lambda on_text: interactive_llm(update, processor.process_article, article_data, current_keywords,
+                                        on_text=on_text),
+        on_text=stream.update if stream else None
+    )
+    return dict(processed_data) if processed_data else None
+
 # --- Command Handlers ---
 
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Reports bot health and statistics."""
     if not is_admin(update.effective_user.id):
-        await update.message.reply_text("Access Denied: You are not the configured admin.")
+        await reply(update, "Access Denied: You are not the configured admin.")
         return
 
     uptime = datetime.now() - START_TIME
+    if work_queue:
+        jobs = work_queue.stats()
+        fetch_status = (
+            f"by workers (leader: {work_queue.lease_holder(SCHEDULER_LEASE) or 'none'}) | "
+            f"jobs: {jobs.get('pending', 0)} pending, {jobs.get('running', 0)} running, {jobs.get('failed', 0)} failed"
+        )
+    else:
+        run = fetch_runner.current
+        fetch_status = run.summary() if run else "no runs yet"
     msg = (
         f"✅ <b>Bot Status: Online</b>\n"
         f"⏱ Uptime: {str(uptime).split('.')[0]}\n"
         f"📡 Sources: {len(RSS_FEEDS)}\n"
         f"🔑 Active Keywords: {len(storage.get_keywords())}\n"
+        f"📣 Channels: {1 + len(storage.get_channels())}\n"
+        f"🧠 LLM: {llm.summary()}\n"
+        f"🔁 User requests: {in_flight.stats['joined']} coalesced, {user_limiter.stats['rejected']} rate-limited\n"
         f"📚 History Size: {storage.get_history_count()}\n"
-        f"📅 Check Interval: {CHECK_INTERVAL_MINUTES} mins"
+        f"🧩 Vector store: {rag_engine.shards.summary()}\n"
+        f"📅 Check Interval: {CHECK_INTERVAL_MINUTES} mins\n"
+        f"🔄 Fetch: {fetch_status}\n"
+        f"📤 Send Queue: {send_queue.depth()} pending, {send_queue.stats['sent']} sent, "
+        f"{send_queue.stats['retries']} retries, {send_queue.stats['flood_waits']} flood waits\n"
+        f"🗂 Share Cache: {len(TEMP_ARTICLE_CACHE)}/{TEMP_ARTICLE_CACHE.max_size} entries, "
+        f"{TEMP_ARTICLE_CACHE.stats['evictions']} evicted, {TEMP_ARTICLE_CACHE.stats['expirations']} expired"
     )
-    await update.message.reply_text(msg, parse_mode='HTML')
+    stage_lines = metrics.summary(top=5)
+    if stage_lines:
+        msg += "\n⏲ <b>Slowest stages (total time):</b>\n" + "\n".join(f"• {line}" for line in stage_lines)
+    await reply(update, msg, parse_mode='HTML')
 
 async def force_fetch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Manually triggers the fetch job."""
+    """Manually triggers a fetch cycle in the background and reports back when it's done."""
     if not is_admin(update.effective_user.id):
-        await update.message.reply_text("Access Denied: You are not the configured admin.")
+        await reply(update, "Access Denied: You are not the configured admin.")
         return
 
-    await update.message.reply_text("🔄 Force fetching articles...")
     logger.info("Manual force fetch triggered.")
-    
-    # Run the scheduled logic immediately
-    # We pass 'context' but verify if scheduled_job uses it correctly (yes)
-    await scheduled_job(context)
-    
-    await update.message.reply_text("Fetch complete.")
+    if work_queue:
+        # Split deployment: the leader worker runs it
+        job_id, created = await asyncio.to_thread(
+            work_queue.enqueue,
+            JOB_FETCH_CYCLE,
+            {"lookback_minutes": CHECK_INTERVAL_MINUTES + 30, "reason": f"force_fetch by {update.effective_user.id}"},
+            dedupe_key=JOB_FETCH_CYCLE,
+            max_attempts=1
+        )
+        if created:
+            await reply(update, f"🔄 Queued fetch job #{job_id} for the workers. I'll report back when it's done.")
+        else:
+            await reply(update, f"⏳ Fetch job #{job_id} is already queued. I'll report back when it's done.")
+        asyncio.create_task(report_fetch_job(update, job_id))
+        return
+
+    lookback = datetime.now() - timedelta(minutes=CHECK_INTERVAL_MINUTES + 30)
+    run, started = fetch_runner.start(
+        lambda run: fetch_cycle(context, run, lookback),
+        reason=f"force_fetch by {update.effective_user.id}"
+    )
+
+    if started:
+        status_message = await reply(update, f"🔄 Started fetch run #{run.run_id}. I'll report back when it's done.")
+    else:
+        status_message = await reply(
+            update, f"⏳ Fetch run #{run.run_id} is already in progress ({run.stage}). I'll report back when it's done."
+        )
+
+    # Don't hold the handler for the whole cycle
+    asyncio.create_task(report_fetch_run(update, run, status_message))
+
+async def report_fetch_run(update: Update, run, status_message, interval=15):
+    """Keeps the admin's status message updated with progress, then replies with the result."""
+    last_text = None
+    while not run.done:
+        await asyncio.wait({run.task}, timeout=interval)
+        if run.done:
+            break
+        text = f"🔄 {run.summary()}"
+        if text != last_text:
+            try:
+                await send_queue.send(
+                    update.effective_chat.id,
+                    lambda: status_message.edit_text(text),
+                    priority=PRIORITY_USER
+                )
+                last_text = text
+            except TelegramError as e:
+                logger.warning(f"Could not update fetch progress message: {e}")
+
+    icon = "✅" if run.status == "done" else "❌"
+    await reply(update, f"{icon} Fetch complete. {run.summary()}")
+
+async def report_fetch_job(update: Update, job_id, interval=5, timeout=3600):
+    """BOT_ROLE=frontend: waits for a worker to finish the fetch job, then replies with its result."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        job = await asyncio.to_thread(work_queue.get_job, job_id)
+        if job and job["status"] == "done":
+            await reply(update, f"✅ Fetch complete. {job['result']}")
+            return
+        if job is None or job["status"] == "failed":
+            error = job["error"] if job else "job not found"
+            await reply(update, f"❌ Fetch job #{job_id} failed: {error}")
+            return
+        await asyncio.sleep(interval)
+    await reply(update, f"⌛ Fetch job #{job_id} hasn't finished yet; check /status later.")
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Profiles the next fetch cycle or a time window. Usage: /profile next_cycle|60s [top_n]"""
+    if not is_admin(update.effective_user.id):
+        await reply(update, "Access Denied: You are not the configured admin.")
+        return
+
+    usage = "Usage: /profile next_cycle [top_n] or /profile 60s [top_n] (up to 600s)"
+    if not context.args:
+        await reply(update, usage)
+        return
+
+    mode = context.args[0].lower()
+    try:
+        top_n = int(context.args[1]) if len(context.args) > 1 else 15
+    except ValueError:
+        await reply(update, usage)
+        return
+    if profiler.busy:
+        await reply(update, "⏳ A profiling session is already running or armed.")
+        return
+
+    async def send_report(report):
+        import html
+        await reply(update, f"<pre>{html.escape(report.summary())}</pre>", parse_mode='HTML')
+
+    if mode == "next_cycle":
+        if work_queue:
+            await reply(update, "Fetch cycles run in the workers in this deployment; profile a window here instead.")
+            return
+        profiler.arm_next_cycle(send_report, top_n)
+        await reply(update, "🔬 The next fetch cycle will be profiled. Use /force_fetch to start one now.")
+        return
+
+    if mode.endswith("s") and mode[:-1].isdigit():
+        seconds = min(int(mode[:-1]), 600)
+        await reply(update, f"🔬 Profiling everything the bot does for {seconds}s...")
+
+        async def run_window():
+            try:
+                await send_report(await profiler.profile_window(seconds, top_n))
+            except Exception as e:
+                logger.error(f"Profiling window failed: {e}")
+                await reply(update, f"❌ Profiling failed: {e}")
+
+        # Keep handling updates while the window is open
+        asyncio.create_task(run_window())
+        return
+
+    await reply(update, usage)
+
+def split_channel_arg(args):
+    """
+    Splits an optional leading `channel:<name>` off command args.
+    Returns (channel, rest); channel is None for the main channel.
+    """
+    if args and args[0].lower().startswith("channel:"):
+        name = args[0].split(":", 1)[1]
+        return (None if name == MAIN_CHANNEL else name), args[1:]
+    return None, args
+
+def unknown_channel(channel):
+    """Error text if `channel` isn't configured, else None."""
+    if channel is not None and channel not in storage.get_channels():
+        return f"Unknown channel <b>{channel}</b>. See /channels."
+    return None
 
 async def list_keywords_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Lists all active keywords."""
+    """Lists all active keywords. Usage: /list_keywords [channel:<name>]"""
     if not is_admin(update.effective_user.id):
-        await update.message.reply_text("Access Denied: You are not the configured admin.")
+        await reply(update, "Access Denied: You are not the configured admin.")
+        return
+
+    channel, _ = split_channel_arg(context.args)
+    error = unknown_channel(channel)
+    if error:
+        await reply(update, error, parse_mode='HTML')
         return
 
-    keywords = storage.get_keywords()
+    keywords = storage.get_keywords(channel)
     if not keywords:
-        await update.message.reply_text("No keywords set.")
+        await reply(update, "No keywords set.")
         return
         
     # Join
-    msg = "<b> Active Keywords:</b>\n" + ", ".join(keywords)
-    await update.message.reply_text(msg, parse_mode='HTML')
+    msg = f"<b> Active Keywords ({channel or MAIN_CHANNEL}):</b>\n" + ", ".join(keywords)
+    await reply(update, msg, parse_mode='HTML')
 
 async def add_keyword_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Adds a keyword. Usage: /add_keyword <word>"""
+    """Adds a keyword. Usage: /add_keyword [channel:<name>] <word>"""
     if not is_admin(update.effective_user.id):
-        await update.message.reply_text("Access Denied: You are not the configured admin.")
+        await reply(update, "Access Denied: You are not the configured admin.")
         return
 
-    if not context.args:
-        await update.message.reply_text("Usage: /add_keyword <word>")
+    channel, args = split_channel_arg(context.args)
+    if not args:
+        await reply(update, "Usage: /add_keyword [channel:<name>] <word>")
+        return
+    error = unknown_channel(channel)
+    if error:
+        await reply(update, error, parse_mode='HTML')
         return
     
     # Handle multi-word keywords properly if passed as one string? 
     # Telegram args splits by space. If user sends "/add_keyword machine learning", args=['machine', 'learning']
-    keyword = " ".join(context.args)
+    keyword = " ".join(args)
     
-    if storage.add_keyword(keyword):
-        await update.message.reply_text(f"Added keyword: <b>{keyword}</b>", parse_mode='HTML')
-        logger.info(f"Keyword added: {keyword}")
+    if storage.add_keyword(keyword, channel):
+        await reply(update, f"Added keyword: <b>{keyword}</b> ({channel or MAIN_CHANNEL})", parse_mode='HTML')
+        logger.info(f"Keyword added to {channel or MAIN_CHANNEL}: {keyword}")
     else:
-        await update.message.reply_text(f"Keyword <b>{keyword}</b> already exists.", parse_mode='HTML')
+        await reply(update, f"Keyword <b>{keyword}</b> already exists.", parse_mode='HTML')
 
 async def remove_keyword_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Removes a keyword. Usage: /remove_keyword <word>"""
+    """Removes a keyword. Usage: /remove_keyword [channel:<name>] <word>"""
     if not is_admin(update.effective_user.id):
-        await update.message.reply_text("Access Denied: You are not the configured admin.")
+        await reply(update, "Access Denied: You are not the configured admin.")
         return
 
-    if not context.args:
-        await update.message.reply_text("Usage: /remove_keyword <word>")
+    channel, args = split_channel_arg(context.args)
+    if not args:
+        await reply(update, "Usage: /remove_keyword [channel:<name>] <word>")
         return
     
-    keyword = " ".join(context.args)
+    keyword = " ".join(args)
     
-    if storage.remove_keyword(keyword):
-        await update.message.reply_text(f"🗑 Removed keyword: <b>{keyword}</b>", parse_mode='HTML')
-        logger.info(f"Keyword removed: {keyword}")
+    if storage.remove_keyword(keyword, channel):
+        await reply(update, f"🗑 Removed keyword: <b>{keyword}</b> ({channel or MAIN_CHANNEL})", parse_mode='HTML')
+        logger.info(f"Keyword removed from {channel or MAIN_CHANNEL}: {keyword}")
+    else:
+        await reply(update, f"Keyword <b>{keyword}</b> not found.", parse_mode='HTML')
+
+async def channels_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Lists the channels articles are routed to."""
+    if not is_admin(update.effective_user.id):
+        await reply(update, "Access Denied: You are not the configured admin.")
+        return
+
+    subscriptions = storage.get_subscriptions(MAIN_CHANNEL)
+    msg = "<b>📡 Channels:</b>\n" \
+          f"• <b>{MAIN_CHANNEL}</b> ({CHANNEL_ID}): {len(subscriptions[MAIN_CHANNEL])} keywords\n"
+    for name, chat_id in storage.get_channels().items():
+        msg += f"• <b>{name}</b> ({chat_id}): {len(subscriptions.get(name, []))} keywords\n"
+    msg += "\nAdd with /add_channel &lt;name&gt; &lt;chat_id&gt;, then /add_keyword channel:&lt;name&gt; &lt;word&gt;."
+    await reply(update, msg, parse_mode='HTML')
+
+async def add_channel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Adds a topic channel. Usage: /add_channel <name> <chat_id>"""
+    if not is_admin(update.effective_user.id):
+        await reply(update, "Access Denied: You are not the configured admin.")
+        return
+
+    if not context.args or len(context.args) != 2:
+        await reply(update, "Usage: /add_channel <name> <chat_id>  (e.g. /add_channel privacy -1001234567890)")
+        return
+
+    name, chat_id = context.args
+    if name == MAIN_CHANNEL or ":" in name:
+        await reply(update, f"Channel name can't be '{MAIN_CHANNEL}' or contain ':'.")
+        return
+
+    if storage.add_channel(name, chat_id):
+        await reply(update, f"Added channel <b>{name}</b> ({chat_id}). The bot must be an admin there.", parse_mode='HTML')
+        logger.info(f"Channel added: {name} -> {chat_id}")
     else:
-        await update.message.reply_text(f"Keyword <b>{keyword}</b> not found.", parse_mode='HTML')
+        await reply(update, "❌ Failed to add channel.")
+
+async def remove_channel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Removes a topic channel and its keywords. Usage: /remove_channel <name>"""
+    if not is_admin(update.effective_user.id):
+        await reply(update, "Access Denied: You are not the configured admin.")
+        return
+
+    if not context.args:
+        await reply(update, "Usage: /remove_channel <name>")
+        return
+
+    name = context.args[0]
+    if storage.remove_channel(name):
+        await reply(update, f"🗑 Removed channel: <b>{name}</b>", parse_mode='HTML')
+        logger.info(f"Channel removed: {name}")
+    else:
+        await reply(update, f"Channel <b>{name}</b> not found.", parse_mode='HTML')
 
 async def share_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Manually shares an article. Usage: /share <url>"""
     if not is_admin(update.effective_user.id):
-        await update.message.reply_text("Access Denied: You are not the configured admin.")
+        await reply(update, "Access Denied: You are not the configured admin.")
         return
 
     if not context.args:
-        await update.message.reply_text("Usage: /share <url>")
+        await reply(update, "Usage: /share <url>")
         return
     
     url = context.args[0]
-    await update.message.reply_text("🔄 Scraping and processing article...")
+    await reply(update, "🔄 Scraping and processing article...")
 
     try:
-        from goose3 import Goose
-        g = Goose()
-        article = g.extract(url=url)
-        
-        # Parse published date (fallback to now)
-        published = datetime.now()
+        # Scraping is blocking; shared with any /summarise of the same page in flight
+        article_data = await shared_article(url, "Manual Share")
         
-        # Construct article object compatible with processor
-        article_data = {
-            "title": article.title,
-            "link": url,
-            "summary": article.cleaned_text[:2000], # Use cleaned text for AI summary context
-            "published": published,
-            "source": article.domain or "Manual Share"
-        }
-        
-        # Clean up resources
-        g.close()
+        if not article_data:
+            await reply(update, "❌ Could not extract article content.")
+            return
         
         # Process using existing logic
         current_keywords = storage.get_keywords()
-        processed_data = processor.process_article(article_data, current_keywords)
+        # Summarization calls the LLM; keep it off the event loop
+        processed_data = await interactive_llm(update, processor.process_article, article_data, current_keywords)
         
         if processed_data:
-            import html
-            safe_title = html.escape(article_data['title'])
-            
-            category_tag = f"<b>[{processed_data.get('category', 'Tech Law')}]</b>"
-            # Manually added tag
-            manual_tag = "\n<i>(Manually Shared)</i>"
-            
-            message = f"{category_tag}\n" \
-                      f"<b>{safe_title}</b>\n\n" \
-                      f"{processed_data['summary']}\n\n" \
-                      f"Source: {article_data['source']}\n" \
-                      f"{processed_data['hashtags']}\n" \
-                      f"{manual_tag}\n\n" \
-                      f"<a href='{article_data['link']}'>Read Full Article</a>"
+            message = format_article_message(article_data, processed_data, note="Manually Shared")
             
-            # Add Remove Button
-            keyboard = [[InlineKeyboardButton("Remove ❌", callback_data="remove")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await context.bot.send_message(
-                chat_id=CHANNEL_ID, 
-                text=message, 
+            await post_to_channel(
+                context.bot,
+                message,
                 parse_mode='HTML',
-                reply_markup=reply_markup
+                reply_markup=remove_button_markup()
             )
             
             # Add to storage so we don't duplicate if it comes in via RSS later
@@ -231,31 +671,64 @@ async def share_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 article_data['title'], 
                 processed_data['summary'],
                 processed_data.get('category'),
-                processed_data['hashtags']
+                processed_data['hashtags'],
+                source=article_data['source']
             )
             
             # Index manually shared article
             try:
-                rag_engine.index_article(
-                    text=f"{article_data['title']}\n\n{article_data['summary']}",
-                    metadata={
-                        'source': article_data['source'],
-                        'title': article_data['title'],
-                        'link': article_data['link'],
-                        'published_str': str(article_data['published'])
-                    }
+                # Embedding runs in the embedding service; don't block the event loop waiting
+                await asyncio.to_thread(
+                    profiler.wrap(rag_engine.index_article),
+                    text=index_text(article_data),
+                    metadata=rag_metadata(article_data, processed_data)
                 )
             except Exception as e:
                 logger.error(f"Manual RAG Indexing failed: {e}")
                 
-            await update.message.reply_text("✅ Article shared successfully.")
+            await reply(update, "✅ Article shared successfully.")
             
         else:
-            await update.message.reply_text("❌ Failed to process article.")
+            await reply(update, "❌ Failed to process article.")
             
+    except LLMCancelled:
+        logger.info(f"Share of {url} cancelled")
     except Exception as e:
         logger.error(f"Share command failed: {e}")
-        await update.message.reply_text(f"❌ Error sharing article: {e}")
+        await reply(update, f"❌ Error sharing article: {e}")
+
+async def trends_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Top moving keywords, categories and sources. Usage: /trends [7d|30d]"""
+    if not is_admin(update.effective_user.id):
+        await reply(update, "Access Denied: You are not the configured admin.")
+        return
+
+    import re
+    period = context.args[0].lower() if context.args else "7d"
+    match = re.fullmatch(r'(\d+)d?', period)
+    if not match or not 1 <= int(match.group(1)) <= TREND_RETENTION_DAYS // 2:
+        await reply(update, f"Usage: /trends [7d|30d] (up to {TREND_RETENTION_DAYS // 2}d)")
+        return
+    days = int(match.group(1))
+
+    # Reads only the per-day counters, however large the history is
+    trends = storage.get_trends(days)
+    if not any(trends.values()):
+        await reply(update, f"No articles stored in the last {days} days.")
+        return
+
+    import html
+
+    def line(term, current, previous, prefix=""):
+        change = current - previous
+        arrow = f"▲{change}" if change > 0 else (f"▼{-change}" if change < 0 else "=")
+        return f"• {prefix}{html.escape(term)}: {current} ({arrow})\n"
+
+    msg = f"📈 <b>Trends, last {days} days</b> (vs the {days} before)\n"
+    for kind, heading, prefix in (("keyword", "Keywords", "#"), ("category", "Categories", ""), ("source", "Sources", "")):
+        if trends[kind]:
+            msg += f"\n<b>{heading}</b>\n" + "".join(line(*row, prefix=prefix) for row in trends[kind])
+    await reply(update, msg, parse_mode='HTML')
 
 async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Searches for past articles. Usage: /search <query>"""
@@ -264,14 +737,14 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # actually request said "Users can search", so let's allow everyone.
     
     if not context.args:
-        await update.message.reply_text("Usage: /search <topic>")
+        await reply(update, "Usage: /search <topic>")
         return
 
     query = " ".join(context.args)
     results = storage.search_articles(query)
     
     if not results:
-        await update.message.reply_text(f"No articles found for '<b>{query}</b>'.", parse_mode='HTML')
+        await reply(update, f"No articles found for '<b>{query}</b>'.", parse_mode='HTML')
         return
         
     msg = f"🔍 <b>Search Results for '{query}':</b>\n\n"
@@ -288,24 +761,59 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         msg += f"• <a href='{link}'>{display_title}</a>\n  <i>{date_str} {tag_str}</i>\n"
         
-    await update.message.reply_text(msg, parse_mode='HTML', disable_web_page_preview=True)
+    await reply(update, msg, parse_mode='HTML', disable_web_page_preview=True)
 
 async def ask_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Answers questions using RAG. Usage: /ask <question>"""
+    """
+    Answers questions using RAG.
+    Usage: /ask [since:2024-06] [until:2025] [source:PDPC] [cat:"Data Privacy"] <question>
+    """
+    usage = 'Usage: /ask [since:2024-06] [source:PDPC] [cat:"Data Privacy"] <question>'
     if not context.args:
-        await update.message.reply_text("Usage: /ask <question>")
+        await reply(update, usage)
         return
     
-    query = " ".join(context.args)
-    await update.message.reply_text(f"🤔 Thinking about: '{query}'...")
+    query, filters = parse_query_filters(" ".join(context.args))
+    if not query:
+        await reply(update, usage)
+        return
+
+    scope = " ".join(f"{k}:{v}" for k, v in filters.items() if k in ('source', 'category'))
+    if 'since' in filters:
+        scope += f" since:{datetime.fromtimestamp(filters['since']).date()}"
+    if 'until' in filters:
+        scope += f" until:{datetime.fromtimestamp(filters['until']).date()}"
+    scope_note = f" ({scope.strip()})" if scope else ""
+
+    user_id = update.effective_user.id
+    refusal = user_limiter.acquire(user_id)
+    if refusal:
+        await reply(update, refusal)
+        return
+    stream = None
     
     try:
-        # Run in thread to avoid blocking main loop
-        response = await asyncio.to_thread(rag_engine.generate_answer, query)
-        await update.message.reply_text(response, parse_mode='Markdown')
+        thinking = await reply(update, f"🤔 Thinking about: '{query}'{scope_note}...")
+        # The answer replaces the placeholder as it is generated
+        stream = start_stream(thinking)
+        # Run in thread to avoid blocking main loop; the same question asked concurrently is answered once
+        response = await in_flight.run(
+            ("ask", normalize_query(query), repr(sorted(filters.items()))),
+            lambda on_text: interactive_llm(update, rag_engine.generate_answer, query, filters, on_text=on_text),
+            on_text=stream.update if stream else None
+        )
+        await finish_reply(update, stream, response, parse_mode='Markdown')
+    except LLMCancelled:
+        logger.info(f"Ask cancelled: {query}")
+        if stream:
+            await stream.finish("🛑 Cancelled.")
     except Exception as e:
         logger.error(f"Ask command failed: {e}")
-        await update.message.reply_text("❌ An error occurred while generating the answer.")
+        await reply(update, "❌ An error occurred while generating the answer.")
+    finally:
+        user_limiter.release(user_id)
+        if stream:
+            await stream.close()
 
 async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -328,31 +836,28 @@ async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_T
 
     # Process first URL found
     url = urls[0]
-    await update.message.reply_text("🤔 Reading and summarizing...")
+    user_id = update.effective_user.id
+    refusal = user_limiter.acquire(user_id)
+    if refusal:
+        await reply(update, refusal)
+        return
+    stream = None
     
     try:
-        from goose3 import Goose
-        g = Goose()
-        article = g.extract(url=url)
+        reading = await reply(update, "🤔 Reading and summarizing...")
+        # Concurrent requests for the same page share one extraction and one summary
+        article_data = await shared_article(url, "Private Share")
         
-        if not article.title:
-            await update.message.reply_text("❌ Could not extract article content.")
-            g.close()
+        if not article_data:
+            await reply(update, "❌ Could not extract article content.")
             return
 
-        # Prepare for processor
-        article_data = {
-            "title": article.title,
-            "link": url,
-            "summary": article.cleaned_text[:2000], 
-            "published": datetime.now(),
-            "source": article.domain or "Private Share"
-        }
-        g.close()
-        
-        # We need keywords for hashtag generation, use current ones
-        current_keywords = storage.get_keywords()
-        processed_data = processor.process_article(article_data, current_keywords)
+        # Related articles are looked up while the summary is generated
+        related_task = asyncio.create_task(find_related(article_data))
+
+        # Summarization calls the LLM; keep it off the event loop. The summary streams into the placeholder.
+        stream = start_stream(reading, header=article_data['title'])
+        processed_data = await shared_summary(update, article_data, stream)
         
         if processed_data:
             import html
@@ -366,31 +871,31 @@ async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_T
             )
             
             # --- Related Articles Logic ---
-            category = processed_data.get('category')
-            if category:
-                # Search for articles in the same category
-                results = storage.search_articles(category)
-                
-                # Filter out the current article (check against link)
-                # results is list of tuples: (link, title, created_at, category, tags)
-                related = [r for r in results if r[0] != url][:3]
-                
-                if related:
-                    response += "\n\n📚 <b>Related from History:</b>\n"
-                    for link, title, created_at, _, _ in related:
-                        # Fallback title
-                        display_title = title if title else link
-                        response += f"• <a href='{link}'>{display_title}</a>\n"
-
-            await update.message.reply_text(response, parse_mode='HTML', disable_web_page_preview=True)
+            related = await related_task
+            if related:
+                response += "\n\n📚 <b>Related from History:</b>\n"
+                for link, title in related:
+                    # Fallback title
+                    display_title = html.escape(title) if title else link
+                    response += f"• <a href='{link}'>{display_title}</a>\n"
+
+            await finish_reply(update, stream, response, parse_mode='HTML', disable_web_page_preview=True)
             # NOTE: We do NOT add to storage here. This is a private utility.
             
         else:
-            await update.message.reply_text("❌ Failed to generate summary.")
+            await reply(update, "❌ Failed to generate summary.")
 
+    except LLMCancelled:
+        logger.info(f"Private summary of {url} cancelled")
+        if stream:
+            await stream.finish("🛑 Cancelled.")
     except Exception as e:
         logger.error(f"Private summary failed: {e}")
-        await update.message.reply_text("❌ Error processing link.")
+        await reply(update, "❌ Error processing link.")
+    finally:
+        user_limiter.release(user_id)
+        if stream:
+            await stream.close()
 
 async def summarise_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -398,35 +903,29 @@ async def summarise_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Usage: /summarise <url>
     """
     if not context.args:
-        await update.message.reply_text("Usage: /summarise <url>")
+        await reply(update, "Usage: /summarise <url>")
         return
 
     url = context.args[0]
-    await update.message.reply_text("🤔 Reading and summarizing...")
+    user_id = update.effective_user.id
+    refusal = user_limiter.acquire(user_id)
+    if refusal:
+        await reply(update, refusal)
+        return
+    stream = None
 
     try:
-        from goose3 import Goose
-        g = Goose()
-        article = g.extract(url=url)
+        reading = await reply(update, "🤔 Reading and summarizing...")
+        # Concurrent requests for the same page share one extraction and one summary
+        article_data = await shared_article(url, "Manual Summary")
         
-        if not article.title:
-            await update.message.reply_text("❌ Could not extract article content.")
-            g.close()
+        if not article_data:
+            await reply(update, "❌ Could not extract article content.")
             return
 
-        # Prepare for processor
-        article_data = {
-            "title": article.title,
-            "link": url,
-            "summary": article.cleaned_text[:2000], 
-            "published": datetime.now(),
-            "source": article.domain or "Manual Summary"
-        }
-        g.close()
-        
-        # Process
-        current_keywords = storage.get_keywords()
-        processed_data = processor.process_article(article_data, current_keywords)
+        # Summarization calls the LLM; keep it off the event loop. The summary streams into the placeholder.
+        stream = start_stream(reading, header=article_data['title'])
+        processed_data = await shared_summary(update, article_data, stream)
         
         if processed_data:
             import html
@@ -441,37 +940,55 @@ async def summarise_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             # Store in Cache for Sharing
             cache_id = str(uuid.uuid4())
-            TEMP_ARTICLE_CACHE[cache_id] = {
+            TEMP_ARTICLE_CACHE.set(cache_id, {
                 'article': article_data,
                 'processed': processed_data
-            }
+            })
             
             # Add Share Button
             keyboard = [[InlineKeyboardButton("Share to Channel 📢", callback_data=f"share|{cache_id}")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
 
-            await update.message.reply_text(response, parse_mode='HTML', reply_markup=reply_markup)
+            await finish_reply(update, stream, response, parse_mode='HTML', reply_markup=reply_markup)
             
         else:
-            await update.message.reply_text("❌ Failed to generate summary.")
+            await reply(update, "❌ Failed to generate summary.")
 
+    except LLMCancelled:
+        logger.info(f"Summarise of {url} cancelled")
+        if stream:
+            await stream.finish("🛑 Cancelled.")
     except Exception as e:
         logger.error(f"Summarise command failed: {e}")
-        await update.message.reply_text(f"❌ Error: {e}")
+        await reply(update, f"❌ Error: {e}")
+    finally:
+        user_limiter.release(user_id)
+        if stream:
+            await stream.close()
+
+async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Abandons your /ask, /summarise or link summary in progress. Usage: /cancel"""
+    cancelled = pending_llm_requests.pop(update.effective_user.id, None)
+    if cancelled:
+        cancelled.set()
+        await reply(update, "🛑 Cancelled your request in progress.")
+    else:
+        await reply(update, "Nothing to cancel.")
 
 # --- Existing Handlers ---
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles callback queries (Remove message, Share article)."""
     query = update.callback_query
-    await query.answer() # Acknowledge
+    chat_id = update.effective_chat.id
+    await send_queue.send(chat_id, lambda: query.answer(), priority=PRIORITY_USER) # Acknowledge
     
     data = query.data
     
     # --- Remove Action ---
     if data == "remove":
         try:
-            await query.delete_message()
+            await send_queue.send(chat_id, lambda: query.delete_message(), priority=PRIORITY_USER)
             logger.info("Message removed by user.")
         except TelegramError as e:
             logger.error(f"Failed to delete message: {e}")
@@ -482,7 +999,11 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         cached_item = TEMP_ARTICLE_CACHE.get(cache_id)
         
         if not cached_item:
-            await query.edit_message_text(text="❌ Error: Article data expired or not found.")
+            await send_queue.send(
+                chat_id,
+                lambda: query.edit_message_text(text="❌ Error: Article data expired or not found."),
+                priority=PRIORITY_USER
+            )
             return
             
         article_data = cached_item['article']
@@ -491,28 +1012,15 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Construct Channel Message
         import html
         safe_title = html.escape(article_data['title'])
-        category_tag = f"<b>[{processed_data.get('category', 'Tech Law')}]</b>"
-        manual_tag = "\n<i>(Shared via /summarise)</i>"
-        
-        message = f"{category_tag}\n" \
-                  f"<b>{safe_title}</b>\n\n" \
-                  f"{processed_data['summary']}\n\n" \
-                  f"Source: {article_data['source']}\n" \
-                  f"{processed_data['hashtags']}\n" \
-                  f"{manual_tag}\n\n" \
-                  f"<a href='{article_data['link']}'>Read Full Article</a>"
-        
-        # Add Remove Button for the channel message
-        keyboard = [[InlineKeyboardButton("Remove ❌", callback_data="remove")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        message = format_article_message(article_data, processed_data, note="Shared via /summarise")
         
         try:
             # Send to Channel
-            await context.bot.send_message(
-                chat_id=CHANNEL_ID, 
-                text=message, 
+            await post_to_channel(
+                context.bot,
+                message,
                 parse_mode='HTML',
-                reply_markup=reply_markup
+                reply_markup=remove_button_markup()
             )
             
             # Store & Index
@@ -522,116 +1030,160 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     article_data['title'], 
                     processed_data['summary'],
                     processed_data.get('category'),
-                    processed_data['hashtags']
+                    processed_data['hashtags'],
+                    source=article_data.get('source')
                 )
                 
-                rag_engine.index_article(
-                    text=f"{article_data['title']}\n\n{article_data['summary']}",
-                    metadata={
-                        'source': article_data['source'],
-                        'title': article_data['title'],
-                        'link': article_data['link'],
-                        'published_str': str(article_data['published'])
-                    }
+                # Embedding runs in the embedding service; don't block the event loop waiting
+                await asyncio.to_thread(
+                    profiler.wrap(rag_engine.index_article),
+                    text=index_text(article_data),
+                    metadata=rag_metadata(article_data, processed_data)
                 )
             except Exception as e:
                 logger.error(f"Storage/Indexing failed during share: {e}")
 
             # Update the button text to show success on the user's side
-            await query.edit_message_reply_markup(reply_markup=None)
-            await query.message.reply_text(f"✅ Shared <b>{safe_title}</b> to channel!", parse_mode='HTML')
+            await send_queue.send(
+                chat_id, lambda: query.edit_message_reply_markup(reply_markup=None), priority=PRIORITY_USER
+            )
+            await reply(update, f"✅ Shared <b>{safe_title}</b> to channel!", parse_mode='HTML')
             
             # Clear cache
-            del TEMP_ARTICLE_CACHE[cache_id]
+            TEMP_ARTICLE_CACHE.pop(cache_id)
             
         except Exception as e:
             logger.error(f"Failed to share article: {e}")
-            await query.message.reply_text("❌ Failed to share article to channel.")
+            await reply(update, "❌ Failed to share article to channel.")
+
+async def record_posted(article, processed_data):
+    """Stores a posted article in history and indexes it for /ask."""
+    # Mark as sent - STORE METADATA NOW
+    storage.add_article(
+        article['link'], 
+        article['title'], 
+        processed_data['summary'],
+        processed_data.get('category'),
+        processed_data['hashtags'],
+        source=article.get('source')
+    )
+    metrics.count("articles_posted")
+    
+    # RAG Indexing
+    try:
+        # Index relevant article
+        await asyncio.to_thread(
+            profiler.wrap(rag_engine.index_article),
+            text=index_text(article),
+            metadata=rag_metadata(article, processed_data)
+        )
+    except Exception as e:
+        logger.error(f"RAG Indexing failed: {e}")
 
-async def process_and_send(context: ContextTypes.DEFAULT_TYPE, articles, limit=None):
-    """Processes fetched articles and sends them."""
+async def process_and_send(context: ContextTypes.DEFAULT_TYPE, articles, limit=None, run=None):
+    """Processes fetched articles and sends them. Returns the number posted."""
     count = 0
     
     # Sort articles by date (newest first)
     articles.sort(key=lambda x: x['published'], reverse=True)
     
-    # Get current dynamic keywords
-    current_keywords = storage.get_keywords()
+    # Every channel's current keywords, matched in one pass per article
+    router = channel_router(storage)
+    current_keywords = router.keywords
+    # Digest mode collects the cycle's matches and posts them together at the end
+    digest = [] if DIGEST_MODE in ("cycle", "category") else None
 
     for article in articles:
-        if limit and count >= limit:
+        if limit and count + len(digest or []) >= limit:
             break
             
         link = article['link']
         if not storage.is_new(link):
             continue
+        if run:
+            run.checked += 1
 
-        if processor.is_relevant(article, current_keywords):
-            logger.info(f"Processing relevant article: {article['title']}")
-            
-            processed_data = processor.process_article(article, current_keywords)
-            
-            if processed_data:
-                # Escape title to prevent HTML errors
-                import html
-                safe_title = html.escape(article['title'])
-                
-                category_tag = f"<b>[{processed_data.get('category', 'Tech Law')}]</b>"
-                message = f"{category_tag}\n" \
-                          f"<b>{safe_title}</b>\n\n" \
-                          f"{processed_data['summary']}\n\n" \
-                          f"Source: {article['source']}\n" \
-                          f"{processed_data['hashtags']}\n\n" \
-                          f"<a href='{article['link']}'>Read Full Article</a>"
-                
-                # Add Remove Button
-                keyboard = [
-                    [InlineKeyboardButton("Remove ❌", callback_data="remove")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                try:
-                    logger.info(f"Sending message for: {article['title']}")
-                    await context.bot.send_message(
-                        chat_id=CHANNEL_ID, 
-                        text=message, 
-                        parse_mode='HTML',
-                        reply_markup=reply_markup
-                    )
-                    
-                    # Mark as sent - STORE METADATA NOW
-                    storage.add_article(
-                        link, 
-                        article['title'], 
-                        processed_data['summary'],
-                        processed_data.get('category'),
-                        processed_data['hashtags']
-                    )
-                    count += 1
-                    
-                    await asyncio.sleep(2) 
-                    
-                    # RAG Indexing
-                    try:
-                        # Index relevant article
-                        rag_engine.index_article(
-                            text=f"{article['title']}\n\n{article['summary']}",
-                            metadata={
-                                'source': article['source'],
-                                'title': article['title'],
-                                'link': article['link'],
-                                'published_str': str(article['published'])
-                            }
-                        )
-                    except Exception as e:
-                        logger.error(f"RAG Indexing failed: {e}")
-                    
-                except TelegramError as e:
-                    logger.error(f"Failed to send message: {e}")
-            else:
-                logger.warning(f"Failed to process article: {article['title']}")
+        channels = router.route(article)
+        if channels:
+            # Summarized once below, then posted to every matching channel
+            article['channels'] = channels
+            if digest is not None:
+                digest.append(article)
+                continue
+
+            if await send_article(context.bot, article, current_keywords):
+                count += 1
+                if run:
+                    run.posted = count
+
+    if digest:
+        if len(digest) >= DIGEST_MIN_ARTICLES:
+            count += await send_digest(context.bot, digest, current_keywords, run)
         else:
-            pass
+            # Quiet cycle: not worth a digest
+            for article in digest:
+                if await send_article(context.bot, article, current_keywords):
+                    count += 1
+                    if run:
+                        run.posted = count
+    return count
+
+async def send_article(bot, article, current_keywords):
+    """Summarizes one article and posts it to its channels. Returns True if posted."""
+    logger.info(f"Processing relevant article: {article['title']}")
+    
+    # Summarization calls Ollama; keep it off the event loop
+    processed_data = await asyncio.to_thread(profiler.wrap(processor.process_article), article, current_keywords)
+    
+    if not processed_data:
+        logger.warning(f"Failed to process article: {article['title']}")
+        return False
+
+    if not await post_article_to_channels(bot, article, processed_data):
+        return False
+
+    await record_posted(article, processed_data)
+    return True
+
+async def send_digest(bot, articles, current_keywords, run=None):
+    """
+    DIGEST_MODE: summarizes the articles with one Ollama prompt per category
+    group and posts them as digest messages. Returns the number posted.
+    """
+    if run:
+        run.set_stage(f"summarizing digest of {len(articles)}")
+    items = []
+    for group in group_for_digest(processor, articles, current_keywords, DIGEST_MAX_ARTICLES):
+        processed = await asyncio.to_thread(profiler.wrap(processor.process_batch), group, current_keywords)
+        items.extend(zip(group, processed))
+
+    count = 0
+
+    async def on_posted(article, processed_data):
+        nonlocal count
+        await record_posted(article, processed_data)
+        count += 1
+        if run:
+            run.posted += 1
+
+    await post_digest_to_channels(bot, items, on_posted)
+    return count
+
+async def fetch_cycle(context: ContextTypes.DEFAULT_TYPE, run, lookback, limit=None):
+    """One fetch -> match -> summarize -> post pass (run via fetch_runner, never concurrently)."""
+    # Profiled only when /profile next_cycle is armed
+    async with profiler.cycle(label=f"cycle-{run.run_id}-{run.reason.split()[0]}"):
+        run.set_stage("fetching feeds")
+        # Feed and scraper requests are blocking; keep them off the event loop
+        articles = await asyncio.to_thread(profiler.wrap(fetcher.fetch_updates), lookback)
+        run.found = len(articles)
+
+        if not articles:
+            logger.info("No new articles found.")
+            return
+
+        run.set_stage("processing articles")
+        await process_and_send(context, articles, limit=limit, run=run)
 
 async def scheduled_job(context: ContextTypes.DEFAULT_TYPE):
     """Periodic job to check for updates."""
@@ -639,14 +1191,11 @@ async def scheduled_job(context: ContextTypes.DEFAULT_TYPE):
     
     # Look back since last interval (plus a buffer)
     lookback = datetime.now() - timedelta(minutes=CHECK_INTERVAL_MINUTES + 30)
-    articles = fetcher.fetch_updates(lookback)
-    
-    if not articles:
-        logger.info("No new articles found.")
-        return
+    fetch_runner.start(lambda run: fetch_cycle(context, run, lookback), reason="scheduled")
 
-    await process_and_send(context, articles)
-    logger.info("Scheduled job finished.")
+async def vector_maintenance_job(context: ContextTypes.DEFAULT_TYPE):
+    """Periodic vector store retention (compaction, drops), kept off the indexing path."""
+    await asyncio.to_thread(rag_engine.maintain)
 
 async def startup_job(context: ContextTypes.DEFAULT_TYPE):
     """Job to run on startup: fetch 4 unique articles from last 7 days."""
@@ -656,46 +1205,158 @@ async def startup_job(context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"Loaded {storage.get_history_count()} articles from history.")
     
     # Check if keywords need initialization
-    if not storage.get_keywords():
-        logger.info("Initializing default keywords...")
-        for k in DEFAULT_KEYWORDS:
-            storage.add_keyword(k)
+    if ensure_default_keywords(storage):
+        logger.info("Initialized default keywords.")
     
     lookback = datetime.now() - timedelta(days=7)
-    articles = fetcher.fetch_updates(lookback)
-    
-    if not articles:
-        logger.info("No articles found for startup.")
+    fetch_runner.start(lambda run: fetch_cycle(context, run, lookback, limit=4), reason="startup")
+
+
+async def post_job_loop(bot):
+    """BOT_ROLE=frontend: posts articles summarized by workers, then hands them back for indexing."""
+    while True:
+        try:
+            # The work queue is SQLite; keep its calls off the event loop
+            job = await asyncio.to_thread(
+                work_queue.claim, [JOB_POST_ARTICLE, JOB_POST_DIGEST], FRONTEND_ID, visibility=600
+            )
+            if job is None:
+                await asyncio.sleep(WORK_POLL_SECONDS)
+                continue
+
+            job_id, kind, payload, _ = job
+            if kind == JOB_POST_DIGEST:
+                await post_digest_job(bot, job_id, payload)
+                continue
+
+            article = article_from_payload(payload["article"])
+            processed_data = payload["processed"]
+            if not storage.is_new(article['link']):
+                await asyncio.to_thread(work_queue.complete, job_id, result="already posted")
+                continue
+
+            # The worker routed it; article['channels'] lists where it goes
+            if not await post_article_to_channels(bot, article, processed_data):
+                await asyncio.to_thread(work_queue.fail, job_id, "not delivered to any channel")
+                continue
+
+            storage.add_article(
+                article['link'],
+                article['title'],
+                processed_data['summary'],
+                processed_data.get('category'),
+                processed_data['hashtags'],
+                source=article.get('source')
+            )
+            metrics.count("articles_posted")
+            await asyncio.to_thread(
+                work_queue.complete, job_id, follow_up=(JOB_INDEX_ARTICLE, payload, article['link'])
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Post job loop error: {e}")
+            await asyncio.sleep(WORK_POLL_SECONDS)
+
+async def post_digest_job(bot, job_id, payload):
+    """BOT_ROLE=frontend: posts a digest summarized by a worker; its articles go back for indexing."""
+    items = [(article_from_payload(item["article"]), item["processed"]) for item in payload["items"]]
+    # A retried job skips the messages that already went out
+    items = [(article, processed_data) for article, processed_data in items if storage.is_new(article['link'])]
+
+    index_jobs = []
+
+    async def on_posted(article, processed_data):
+        storage.add_article(
+            article['link'],
+            article['title'],
+            processed_data['summary'],
+            processed_data.get('category'),
+            processed_data['hashtags'],
+            source=article.get('source')
+        )
+        metrics.count("articles_posted")
+        index_jobs.append((
+            JOB_INDEX_ARTICLE,
+            {"article": article_to_payload(article), "processed": processed_data},
+            article['link']
+        ))
+
+    error = await post_digest_to_channels(bot, items, on_posted)
+    if error:
+        # Index what did go out; the retry only posts the rest
+        for kind, index_payload, dedupe_key in index_jobs:
+            await asyncio.to_thread(work_queue.enqueue, kind, index_payload, dedupe_key=dedupe_key)
+        await asyncio.to_thread(work_queue.fail, job_id, error)
         return
-        
-    await process_and_send(context, articles, limit=4)
-    logger.info("Startup job finished.")
+    await asyncio.to_thread(work_queue.complete, job_id, follow_up=index_jobs)
 
+async def post_init(application: Application):
+    global post_job_task
+    await send_queue.start()
+    if LLM_WARMUP:
+        # Load the model now, so the first summary doesn't pay for it
+        llm.warm_up_in_background()
+    if metrics_server:
+        await metrics_server.start()
+    if work_queue:
+        ensure_default_keywords(storage)
+        post_job_task = asyncio.create_task(post_job_loop(application.bot))
 
-if __name__ == "__main__":
-    if not TELEGRAM_BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN is missing!")
-        exit(1)
+async def post_shutdown(application: Application):
+    if post_job_task:
+        post_job_task.cancel()
+        try:
+            await post_job_task
+        except asyncio.CancelledError:
+            pass
+    if metrics_server:
+        await metrics_server.stop()
+    await send_queue.stop()
+    llm.close()
 
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+def build_application():
+    """Builds the Application with all handlers and jobs registered."""
+    builder = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if TELEGRAM_BASE_URL:
+        # e.g. a local Bot API server, or benchmarks/fake_bot_api.py for testing
+        builder = builder.base_url(TELEGRAM_BASE_URL)
+    if BOT_MODE == "webhook":
+        # Updates arrive through our own webhook server instead of the Updater
+        builder = builder.updater(None)
+    application = builder.build()
 
     # Add Command Handlers
     application.add_handler(CommandHandler("status", status_command))
     application.add_handler(CommandHandler("force_fetch", force_fetch_command))
+    application.add_handler(CommandHandler("profile", profile_command))
     application.add_handler(CommandHandler("add_keyword", add_keyword_command))
     application.add_handler(CommandHandler("remove_keyword", remove_keyword_command))
     application.add_handler(CommandHandler("list_keywords", list_keywords_command))
-    application.add_handler(CommandHandler("share", share_command))
+    application.add_handler(CommandHandler("channels", channels_command))
+    application.add_handler(CommandHandler("add_channel", add_channel_command))
+    application.add_handler(CommandHandler("remove_channel", remove_channel_command))
     application.add_handler(CommandHandler("search", search_command))
-    application.add_handler(CommandHandler("ask", ask_command))
-    application.add_handler(CommandHandler("summarise", summarise_command))
-    application.add_handler(CommandHandler("summarize", summarise_command))
+    application.add_handler(CommandHandler("trends", trends_command))
+    application.add_handler(CommandHandler("cancel", cancel_command))
+    # LLM handlers don't block update processing, so /cancel or a newer request can
+    # arrive (and supersede them) while they wait for the model
+    application.add_handler(CommandHandler("share", share_command, block=False))
+    application.add_handler(CommandHandler("ask", ask_command, block=False))
+    application.add_handler(CommandHandler("summarise", summarise_command, block=False))
+    application.add_handler(CommandHandler("summarize", summarise_command, block=False))
     
     # Private Message Handler (for Summarizer)
     # Filters: Text AND Private Chat AND Not a Command
     application.add_handler(MessageHandler(
         filters.TEXT & filters.ChatType.PRIVATE & ~filters.COMMAND, 
-        handle_private_message
+        handle_private_message,
+        block=False
     ))
     
     # Add Callback Handler - Handles "remove" (channel) AND "share|..." (summarise)
@@ -704,14 +1365,79 @@ if __name__ == "__main__":
     # Add Error Handler
     application.add_error_handler(error_handler)
 
-    # Job Queue
-    job_queue = application.job_queue
-    
-    # Run startup job after 5 seconds
-    job_queue.run_once(startup_job, 5)
-    
-    # Run periodic job
-    job_queue.run_repeating(scheduled_job, interval=CHECK_INTERVAL_MINUTES * 60, first=60)
+    # Job Queue (in a split deployment the leader worker schedules fetches instead)
+    if BOT_ROLE != "frontend":
+        job_queue = application.job_queue
+        
+        # Run startup job after 5 seconds
+        job_queue.run_once(startup_job, 5)
+        
+        # Run periodic job
+        job_queue.run_repeating(scheduled_job, interval=CHECK_INTERVAL_MINUTES * 60, first=60)
+
+        # Vector store retention (it also runs at startup)
+        maintenance_interval = VECTOR_MAINTENANCE_HOURS * 3600
+        job_queue.run_repeating(vector_maintenance_job, interval=maintenance_interval, first=maintenance_interval)
+
+    return application
+
+async def run_webhook(application: Application):
+    """Runs the bot behind the embedded webhook server until SIGINT/SIGTERM."""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass  # Windows: fall back to KeyboardInterrupt
 
-    logger.info(f"Bot started. Checking every {CHECK_INTERVAL_MINUTES} minutes.")
-    application.run_polling()
+    server = WebhookServer(
+        application,
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        path=WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        max_concurrency=WEBHOOK_MAX_CONCURRENCY
+    )
+
+    await application.initialize()
+    await post_init(application)
+    await application.start()
+    await server.start()
+    try:
+        await application.bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=min(WEBHOOK_MAX_CONCURRENCY, 100),
+            allowed_updates=Update.ALL_TYPES
+        )
+        logger.info(f"Webhook registered at {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}")
+        await stop_event.wait()
+    finally:
+        await server.stop()
+        await application.stop()
+        await post_shutdown(application)
+        await application.shutdown()
+
+
+if __name__ == "__main__":
+    if not TELEGRAM_BOT_TOKEN:
+        logger.error("TELEGRAM_BOT_TOKEN is missing!")
+        exit(1)
+    if BOT_ROLE == "worker":
+        logger.error("BOT_ROLE=worker runs `python worker.py`, not bot.py.")
+        exit(1)
+
+    application = build_application()
+    logger.info(f"Bot started ({BOT_MODE}, role={BOT_ROLE}). Checking every {CHECK_INTERVAL_MINUTES} minutes.")
+
+    if BOT_MODE == "webhook":
+        if not WEBHOOK_URL:
+            logger.error("BOT_MODE=webhook requires WEBHOOK_URL (the public HTTPS base URL).")
+            exit(1)
+        try:
+            asyncio.run(run_webhook(application))
+        except KeyboardInterrupt:
+            pass
+    else:
+        application.run_polling()
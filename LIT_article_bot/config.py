@@ -1,4 +1,5 @@
 import os
+import secrets
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -6,20 +7,131 @@ load_dotenv()
 
 # API Keys
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Bot API endpoint override (local Bot API server or a fake for testing)
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL")  # e.g. http://127.0.0.1:8081/bot
 # AI Configuration
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "")  # empty = ollama's default (http://127.0.0.1:11434)
+# How long Ollama keeps the model loaded after a request (e.g. "30m", "-1" = forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# LLM backend: "ollama", or "stub" (deterministic local answers, for tests and benchmarks)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama").lower()
+LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "0.5"))  # seconds per stub call
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"  # load the model at startup
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))  # requests in flight to the backend
+# Per-class limits within LLM_MAX_CONCURRENCY (0 = default: interactive may use every slot,
+# batch all but one, so a user never waits behind a full backlog)
+LLM_INTERACTIVE_CONCURRENCY = int(os.getenv("LLM_INTERACTIVE_CONCURRENCY", "0"))
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "0"))
+LLM_AGING_SECONDS = float(os.getenv("LLM_AGING_SECONDS", "120"))  # batch requests waiting longer go first
+# Deadlines (seconds); a summary that misses its deadline falls back to an extractive summary
+LLM_SUMMARY_DEADLINE = float(os.getenv("LLM_SUMMARY_DEADLINE", "45"))
+LLM_DIGEST_DEADLINE = float(os.getenv("LLM_DIGEST_DEADLINE", "120"))
+LLM_ASK_DEADLINE = float(os.getenv("LLM_ASK_DEADLINE", "90"))
+# Summaries that would queue longer than this for the LLM use the extractive summarizer
+# (extractive.py) instead; 0 = always wait for the LLM
+LLM_QUEUE_SLO_SECONDS = float(os.getenv("LLM_QUEUE_SLO_SECONDS", "10"))
+# Sources (feed titles, comma-separated) that always get extractive summaries
+EXTRACTIVE_SOURCES = [s.strip().lower() for s in os.getenv("EXTRACTIVE_SOURCES", "").split(",") if s.strip()]
+EXTRACTIVE_SENTENCES = int(os.getenv("EXTRACTIVE_SENTENCES", "2"))
 # RAG Configuration
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "chroma_db")
+# Keyword (BM25) index kept alongside the vector store for hybrid retrieval
+LEXICAL_DB_PATH = os.getenv("LEXICAL_DB_PATH", os.path.join(CHROMA_DB_PATH, "lexical.db"))
+RAG_HYBRID = os.getenv("RAG_HYBRID", "true").lower() == "true"
+RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "20"))  # per retriever, before fusion
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "6"))  # chunks passed to the prompt
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+# Embeddings: encoded by a separate process pool (embedding_service.py) so the
+# model doesn't compete with the bot's event loop. EMBED_WORKERS=0 encodes in-process.
+EMBED_MODEL = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+# torch | torch-int8 | onnx | onnx-int8 (compare with benchmarks/embedding_backends.py)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+EMBED_ONNX_FILE = os.getenv("EMBED_ONNX_FILE") or None  # override the ONNX file inside the model repo
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_SERVICE_HOST = os.getenv("EMBED_SERVICE_HOST", "127.0.0.1")
+EMBED_SERVICE_PORT = int(os.getenv("EMBED_SERVICE_PORT", "6011"))
+EMBED_SERVICE_AUTHKEY = os.getenv("EMBED_SERVICE_AUTHKEY", "lit-embed").encode()
+EMBED_SERVICE_AUTOSTART = os.getenv("EMBED_SERVICE_AUTOSTART", "true").lower() == "true"
+# Optional cross-encoder reranker, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2" (empty = off)
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+# Nearest neighbours stored per article at index time ("Related from History")
+RELATED_ARTICLES_K = int(os.getenv("RELATED_ARTICLES_K", "5"))
+# Vector store shards (vector_shards.py): one Chroma collection per month of publication
+RAG_RECENT_SHARDS = int(os.getenv("RAG_RECENT_SHARDS", "3"))  # newest shards searched before widening
+# Widen to older shards while the n-th best hit is further than this (squared L2, so
+# 1.0 = cosine similarity 0.5 for normalized embeddings); 0 = widen only for too few hits
+RAG_WIDEN_DISTANCE = float(os.getenv("RAG_WIDEN_DISTANCE", "1.0"))
+VECTOR_HOT_MONTHS = int(os.getenv("VECTOR_HOT_MONTHS", "12"))  # older months are compacted into yearly shards
+VECTOR_RETENTION_MONTHS = int(os.getenv("VECTOR_RETENTION_MONTHS", "0"))  # drop older shards (0 = keep all)
+VECTOR_MAINTENANCE_HOURS = float(os.getenv("VECTOR_MAINTENANCE_HOURS", "24"))  # how often retention runs
+# Memory for loaded shard indexes in a local chroma_db/; least recently used are unloaded (0 = no limit)
+CHROMA_CACHE_MB = int(os.getenv("CHROMA_CACHE_MB", "0"))
 
 
-# Check if keys are present
-if not TELEGRAM_BOT_TOKEN:
+# Deployment role: "all" (one process, default), "frontend" (Telegram handlers and
+# channel posting) or "worker" (python worker.py: fetch/summarize/index, no Telegram)
+BOT_ROLE = os.getenv("BOT_ROLE", "all").lower()
+# Job queue + leader lease shared by the front-end and workers
+WORK_QUEUE_DB = os.getenv("WORK_QUEUE_DB", "work_queue.db")
+WORK_POLL_SECONDS = float(os.getenv("WORK_POLL_SECONDS", "2"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))  # jobs in flight per worker
+LEADER_LEASE_SECONDS = int(os.getenv("LEADER_LEASE_SECONDS", "30"))
+# Chroma server for the vector store when several processes share it (empty = local chroma_db/)
+CHROMA_HOST = os.getenv("CHROMA_HOST", "")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+
+# Check if keys are present (workers never talk to Telegram)
+if not TELEGRAM_BOT_TOKEN and BOT_ROLE != "worker":
     raise ValueError("No TELEGRAM_BOT_TOKEN found in environment variables.")
 
 
 # Bot Configuration
 CHECK_INTERVAL_MINUTES = int(os.getenv("CHECK_INTERVAL_MINUTES", "30"))
 CHANNEL_ID = os.getenv("CHANNEL_ID")
+# Digest mode: "off" (one post per article), "cycle" (one digest post per fetch cycle)
+# or "category" (one digest post per category per cycle). Each category is summarized
+# with a single batched Ollama prompt.
+DIGEST_MODE = os.getenv("DIGEST_MODE", "off").lower()
+DIGEST_MIN_ARTICLES = int(os.getenv("DIGEST_MIN_ARTICLES", "3"))  # fewer than this are posted individually
+DIGEST_MAX_ARTICLES = int(os.getenv("DIGEST_MAX_ARTICLES", "8"))  # per LLM prompt / digest post
+
+# Update delivery: "polling" (default) or "webhook" (embedded HTTP server)
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # public HTTPS base URL Telegram posts to
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+# Echoed back by Telegram on every call; a random one is generated per run if unset
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "16"))
+
+# Outbound rate limits (Telegram: ~30 msg/s overall, 1 msg/s per chat, 20 msg/min per group/channel)
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+SEND_PRIVATE_RATE = float(os.getenv("SEND_PRIVATE_RATE", "1"))
+SEND_GROUP_RATE_PER_MIN = float(os.getenv("SEND_GROUP_RATE_PER_MIN", "20"))
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "5"))
+# /ask, /summarise and private links edit their reply as the LLM output streams in,
+# at most once per STREAM_EDIT_INTERVAL seconds (edits count against the chat's rate limit)
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "true").lower() == "true"
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))
+# Per-user limits on /ask, /summarise and private links (admins are exempt)
+USER_REQUESTS_PER_MINUTE = float(os.getenv("USER_REQUESTS_PER_MINUTE", "6"))
+USER_REQUEST_BURST = int(os.getenv("USER_REQUEST_BURST", "3"))
+USER_MAX_CONCURRENT = int(os.getenv("USER_MAX_CONCURRENT", "2"))  # requests running at once
+
+# Prometheus metrics (GET /metrics); 0 disables. Each process on a host needs its own port.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# /profile output (cProfile .prof files and tracemalloc allocation reports)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# /summarise -> Share cache
+SHARE_CACHE_MAX_SIZE = int(os.getenv("SHARE_CACHE_MAX_SIZE", "500"))
+SHARE_CACHE_TTL_HOURS = float(os.getenv("SHARE_CACHE_TTL_HOURS", "48"))
+SHARE_CACHE_PERSIST = os.getenv("SHARE_CACHE_PERSIST", "true").lower() == "true"
 
 # Admin Management (Supports multiple IDs comma-separated)
 ADMIN_IDS = []
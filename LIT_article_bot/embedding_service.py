@@ -0,0 +1,286 @@
+"""
+Embedding service: a pool of worker processes that each hold a copy of the
+sentence-transformers model and serve batched encode requests over a local
+IPC channel (multiprocessing.connection, authenticated).
+
+Run standalone:
+    python embedding_service.py --workers 4
+
+The bot (and other tools) connect with EmbeddingClient, and start the service
+themselves if EMBED_SERVICE_AUTOSTART is on and nothing is listening yet.
+"""
+import argparse
+import atexit
+import logging
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import Client, Listener
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# Embedding backends:
+#   torch      - full-precision PyTorch (what Chroma's default function uses)
+#   torch-int8 - PyTorch with dynamic int8 quantization of Linear layers
+#   onnx       - ONNX Runtime export of the same model
+#   onnx-int8  - ONNX Runtime, pre-quantized int8 weights
+# The onnx backends need sentence-transformers>=3.2 with optimum[onnxruntime].
+BACKENDS = ["torch", "torch-int8", "onnx", "onnx-int8"]
+# Quantized file shipped in the sentence-transformers/all-MiniLM-L6-v2 repo (AVX2 works on any modern x86)
+DEFAULT_ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def load_embedding_model(model_name=DEFAULT_MODEL, backend="torch", onnx_file=None, threads=None):
+    """Loads a SentenceTransformer on CPU with the requested backend."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}' (choose from {', '.join(BACKENDS)})")
+
+    if threads:
+        # Keep workers from oversubscribing cores (torch defaults to all of them)
+        torch.set_num_threads(threads)
+
+    if backend == "onnx":
+        model_kwargs = {"file_name": onnx_file} if onnx_file else None
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+    if backend == "onnx-int8":
+        model_kwargs = {"file_name": onnx_file or DEFAULT_ONNX_INT8_FILE}
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    model = SentenceTransformer(model_name, device="cpu")
+    if backend == "torch-int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def encode_texts(model, texts):
+    # Same call Chroma's SentenceTransformerEmbeddingFunction makes, so vectors stay compatible
+    return model.encode(list(texts), convert_to_numpy=True, normalize_embeddings=False).tolist()
+
+
+# --- Worker process side ---
+_model = None
+
+
+def _init_worker(model_name, backend, onnx_file, threads):
+    """Loads the model once per worker process."""
+    global _model
+    _model = load_embedding_model(model_name, backend, onnx_file, threads)
+
+
+def _encode_batch(texts):
+    return encode_texts(_model, texts)
+
+
+# --- Service side ---
+
+class EmbeddingServer:
+    def __init__(self, model_name=DEFAULT_MODEL, workers=2, batch_size=64,
+                 host="127.0.0.1", port=6011, authkey=b"lit-embed", threads_per_worker=None,
+                 backend="torch", onnx_file=None):
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.address = (host, port)
+        self.authkey = authkey
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.pool = None
+
+    def start_pool(self):
+        # spawn: workers must not inherit torch/thread state from the parent
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.backend, self.onnx_file, self.threads_per_worker)
+        )
+        # Warm every worker so the first real request doesn't pay the model load
+        start = time.time()
+        list(self.pool.map(_encode_batch, [["warm up"]] * self.workers))
+        logger.info(
+            f"Embedding pool ready: {self.workers} workers x {self.threads_per_worker} threads "
+            f"({self.model_name}, {self.backend}) in {time.time() - start:.1f}s"
+        )
+
+    def encode(self, texts):
+        """Splits a request into batches and spreads them across the workers."""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        futures = [self.pool.submit(_encode_batch, batch) for batch in batches]
+        embeddings = []
+        for future in futures:
+            embeddings.extend(future.result())
+        return embeddings
+
+    def serve_forever(self):
+        # Turn SIGTERM (sent by launch_service's atexit hook) into a clean
+        # exit so the pool workers are shut down instead of orphaned
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        self.start_pool()
+        try:
+            with Listener(self.address, authkey=self.authkey) as listener:
+                logger.info(f"Embedding service listening on {self.address[0]}:{self.address[1]}")
+                while True:
+                    try:
+                        conn = listener.accept()
+                    except Exception as e:
+                        # Failed handshake (wrong authkey, port scanner, ...)
+                        logger.warning(f"Rejected connection: {e}")
+                        continue
+                    threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _handle(self, conn):
+        """One thread per client connection; requests are ('encode', texts) or ('ping',)."""
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                try:
+                    if request[0] == "encode":
+                        conn.send(("ok", self.encode(request[1])))
+                    elif request[0] == "ping":
+                        conn.send(("ok", {"model": self.model_name, "backend": self.backend, "workers": self.workers}))
+                    else:
+                        conn.send(("error", f"Unknown request: {request[0]}"))
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    logger.error(f"Encode request failed: {e}")
+                    conn.send(("error", str(e)))
+
+
+# --- Client side ---
+
+class EmbeddingServiceError(Exception):
+    pass
+
+
+class EmbeddingClient:
+    """
+    Thread-safe client: each calling thread keeps its own connection, so
+    concurrent /ask queries and indexing don't serialize on one socket.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6011, authkey=b"lit-embed"):
+        self.address = (host, port)
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, request):
+        # One reconnect attempt covers a restarted service
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send(request)
+                status, payload = conn.recv()
+                break
+            except (EOFError, OSError) as e:
+                self._local.conn = None
+                if attempt == 1:
+                    raise EmbeddingServiceError(f"Embedding service unreachable at {self.address}: {e}")
+
+        if status != "ok":
+            raise EmbeddingServiceError(payload)
+        return payload
+
+    def encode(self, texts):
+        if not texts:
+            return []
+        return self._request(("encode", list(texts)))
+
+    def ping(self):
+        try:
+            return self._request(("ping",))
+        except EmbeddingServiceError:
+            return None
+
+
+def launch_service(model_name, workers, batch_size, host, port, authkey, timeout=180,
+                   backend="torch", onnx_file=None):
+    """
+    Starts embedding_service.py as a child process and waits until it answers.
+    The child is terminated when this process exits.
+    """
+    env = dict(os.environ, EMBED_SERVICE_AUTHKEY=authkey.decode())
+    command = [
+        sys.executable, os.path.abspath(__file__),
+        "--model", model_name,
+        "--backend", backend,
+        "--workers", str(workers),
+        "--batch-size", str(batch_size),
+        "--host", host,
+        "--port", str(port),
+    ]
+    if onnx_file:
+        command += ["--onnx-file", onnx_file]
+    process = subprocess.Popen(command, env=env)
+    atexit.register(process.terminate)
+
+    client = EmbeddingClient(host, port, authkey)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise EmbeddingServiceError(f"Embedding service exited with code {process.returncode}")
+        if client.ping():
+            return process
+        time.sleep(0.5)
+
+    process.terminate()
+    raise EmbeddingServiceError(f"Embedding service did not start within {timeout}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process-pool embedding service")
+    parser.add_argument("--model", default=os.getenv("EMBED_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--backend", choices=BACKENDS, default=os.getenv("EMBED_BACKEND", "torch"))
+    parser.add_argument("--onnx-file", default=os.getenv("EMBED_ONNX_FILE") or None)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EMBED_WORKERS", "2")))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("EMBED_BATCH_SIZE", "64")))
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--host", default=os.getenv("EMBED_SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("EMBED_SERVICE_PORT", "6011")))
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+
+    server = EmbeddingServer(
+        model_name=args.model,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        host=args.host,
+        port=args.port,
+        authkey=os.getenv("EMBED_SERVICE_AUTHKEY", "lit-embed").encode(),
+        threads_per_worker=args.threads_per_worker,
+        backend=args.backend,
+        onnx_file=args.onnx_file
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
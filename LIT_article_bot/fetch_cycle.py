@@ -0,0 +1,98 @@
+import asyncio
+import itertools
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class CycleRun:
+    """State of one fetch cycle, updated as it progresses (shown in /status and /force_fetch)."""
+
+    def __init__(self, run_id, reason):
+        self.run_id = run_id
+        self.reason = reason
+        self.status = "queued"  # queued -> running -> done | failed
+        self.stage = "waiting"
+        self.started_at = None
+        self.finished_at = None
+        self.found = 0
+        self.checked = 0
+        self.posted = 0
+        self.queued = 0  # split deployments: handed to workers instead of posted here
+        self.error = None
+        self.task = None
+
+    def set_stage(self, stage):
+        self.stage = stage
+        logger.info(f"Fetch run #{self.run_id}: {stage}")
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def duration(self):
+        if not self.started_at:
+            return 0.0
+        return ((self.finished_at or datetime.now()) - self.started_at).total_seconds()
+
+    def summary(self):
+        text = f"Run #{self.run_id} ({self.reason}): {self.status}"
+        if self.status == "running":
+            text += f", {self.stage}"
+        text += f" | {self.found} found, {self.checked} checked, {self.posted} posted"
+        if self.queued:
+            text += f", {self.queued} queued"
+        if self.started_at:
+            text += f" | {self.duration():.0f}s"
+        if self.error:
+            text += f" | error: {self.error}"
+        return text
+
+
+class FetchCycleRunner:
+    """
+    Runs fetch cycles as background tasks, one at a time.
+
+    start() returns immediately. If a cycle is already queued or running,
+    the caller gets that run instead of a second one, so the repeating job,
+    the startup job and /force_fetch can't overlap (and can't both pass
+    is_new for the same link before either stores it).
+    """
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.current = None
+        self.last = None
+        self._ids = itertools.count(1)
+
+    def start(self, cycle, reason):
+        """
+        cycle is an async callable taking the CycleRun.
+        Returns (run, started) where started is False if a run was already active.
+        """
+        if self.current and not self.current.done:
+            logger.info(f"Fetch run #{self.current.run_id} still active; not starting another ({reason}).")
+            return self.current, False
+
+        run = CycleRun(next(self._ids), reason)
+        self.current = run
+        run.task = asyncio.create_task(self._execute(run, cycle))
+        return run, True
+
+    async def _execute(self, run, cycle):
+        async with self.lock:
+            run.status = "running"
+            run.started_at = datetime.now()
+            try:
+                await cycle(run)
+                run.status = "done"
+                run.set_stage("finished")
+            except Exception as e:
+                run.status = "failed"
+                run.error = str(e)
+                logger.error(f"Fetch run #{run.run_id} failed: {e}")
+            finally:
+                run.finished_at = datetime.now()
+                self.last = run
+        return run
@@ -3,8 +3,11 @@ import logging
 import requests
 from datetime import datetime, timedelta
 from dateutil import parser as date_parser
+from urllib.parse import urlparse
 import time
 
+from metrics import timed, count
+
 logger = logging.getLogger(__name__)
 
 class RSSFetcher:
@@ -25,12 +28,13 @@ class RSSFetcher:
         # 1. Fetch from RSS Feeds
         for source in self.sources:
             try:
-                # Use requests to fetch the feed content
-                response = requests.get(source, headers=self.headers, timeout=15)
-                response.raise_for_status()
-                
-                # Parse the content
-                feed = feedparser.parse(response.content)
+                with timed("feed_fetch", urlparse(source).netloc):
+                    # Use requests to fetch the feed content
+                    response = requests.get(source, headers=self.headers, timeout=15)
+                    response.raise_for_status()
+                    
+                    # Parse the content
+                    feed = feedparser.parse(response.content)
                 
                 # Log feed title for debugging
                 logger.debug(f"Fetched feed: {feed.feed.get('title', 'Unknown Title')}")
@@ -74,7 +78,8 @@ class RSSFetcher:
             
             if scraper:
                 try:
-                    scraped_articles = scraper.fetch()
+                    with timed("scraper", name):
+                        scraped_articles = scraper.fetch()
                     for art in scraped_articles:
                         if last_check_time and art['published'] <= last_check_time:
                             continue
@@ -84,6 +89,7 @@ class RSSFetcher:
                 
         # Sort by published time (newest first)
         articles.sort(key=lambda x: x['published'], reverse=True)
+        count("articles_fetched", len(articles))
         return articles
 
     def _get_published_time(self, entry):
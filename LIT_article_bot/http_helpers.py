@@ -0,0 +1,103 @@
+"""
+Minimal HTTP/1.1 request reading and response writing for the embedded
+servers (webhook, /metrics) and the fake Bot API. Standard library only,
+so low-level modules can serve HTTP without importing python-telegram-bot.
+"""
+import asyncio
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADERS = 100
+MAX_HEADER_BYTES = 16 * 1024
+# A client gets this long to send each request; idle keep-alive connections are closed after it too
+READ_TIMEOUT_SECONDS = 30
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+    405: "Method Not Allowed", 408: "Request Timeout", 413: "Payload Too Large",
+    431: "Request Header Fields Too Large", 503: "Service Unavailable",
+}
+
+
+class HttpRequest:
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers  # lower-cased names
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        return self.headers.get("connection", "").lower() != "close"
+
+
+class RequestError(ValueError):
+    """A request that can't be served; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader, max_body=MAX_BODY_BYTES, timeout=READ_TIMEOUT_SECONDS,
+                       max_headers=MAX_HEADERS, max_header_bytes=MAX_HEADER_BYTES):
+    """
+    Reads one request. Returns None on EOF or when no request starts within
+    `timeout`; raises RequestError (a ValueError) on a malformed, oversized
+    or too slow request.
+    """
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout)
+    except asyncio.TimeoutError:
+        return None
+    if not request_line:
+        return None
+    try:
+        return await asyncio.wait_for(
+            _read_rest(reader, request_line, max_body, max_headers, max_header_bytes), timeout
+        )
+    except asyncio.TimeoutError:
+        raise RequestError("Request timed out", 408)
+
+
+async def _read_rest(reader, request_line, max_body, max_headers, max_header_bytes):
+    try:
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise RequestError("Malformed request line")
+
+    headers = {}
+    header_lines = header_bytes = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        header_lines += 1
+        header_bytes += len(line)
+        if header_lines > max_headers or header_bytes > max_header_bytes:
+            raise RequestError("Request headers too large", 431)
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise RequestError("Malformed Content-Length")
+    if length < 0:
+        raise RequestError("Malformed Content-Length")
+    if length > max_body:
+        raise RequestError("Payload too large", 413)
+    body = await reader.readexactly(length) if length else b""
+    return HttpRequest(method.upper(), path, headers, body)
+
+
+async def write_response(writer, status, body=b"", content_type="application/json", keep_alive=True):
+    if isinstance(body, str):
+        body = body.encode()
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode() + body)
+    await writer.drain()
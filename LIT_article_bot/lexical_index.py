@@ -0,0 +1,172 @@
+import sqlite3
+import logging
+import re
+import threading
+
+from metrics import timed_call
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no signal for keyword lookup. Everything else
+# (statute numbers, acronyms like PDPA, case names) is kept as-is.
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for",
+    "from", "has", "have", "how", "in", "is", "it", "latest", "of", "on", "or",
+    "say", "says", "the", "this", "to", "was", "what", "when", "where", "which",
+    "who", "why", "with", "about", "any", "there", "new", "news",
+}
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9\-\.]*[A-Za-z0-9]|[A-Za-z0-9]")
+
+# Metadata columns mirrored from Chroma so filters apply to both retrievers
+FILTER_COLUMNS = ["source", "category", "published_ts"]
+
+
+class LexicalIndex:
+    """
+    SQLite FTS5 index of article chunks, kept next to the Chroma collection.
+    Uses the same chunk ids as Chroma so results can be fused by id.
+    Safe to call from several threads (/ask searches and indexing run in
+    asyncio.to_thread): every use of the shared connection holds a lock.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        try:
+            with self._lock:
+                self._create_table()
+        except sqlite3.Error as e:
+            logger.error(f"Lexical index initialization error: {e}")
+
+    def _create_table(self):
+        # --- Schema Migration: FTS5 tables can't be altered, so rebuild ---
+        cursor = self.conn.execute("PRAGMA table_info(chunks)")
+        columns = [info[1] for info in cursor.fetchall()]
+        if columns and any(col not in columns for col in FILTER_COLUMNS):
+            logger.info("Migrating lexical index: rebuilding with metadata columns...")
+            with self.conn:
+                self.conn.execute("DROP TABLE chunks")
+
+        with self.conn:
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+                    chunk_id UNINDEXED,
+                    link UNINDEXED,
+                    source UNINDEXED,
+                    category UNINDEXED,
+                    published_ts UNINDEXED,
+                    title,
+                    content,
+                    tokenize = 'porter unicode61'
+                )
+            """)
+
+    @timed_call("sqlite", "lexical_upsert")
+    def upsert(self, ids, documents, metadatas):
+        """Replaces the given chunks (same signature as Chroma upsert)."""
+        try:
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "DELETE FROM chunks WHERE chunk_id = ?",
+                    [(chunk_id,) for chunk_id in ids]
+                )
+                self.conn.executemany(
+                    """
+                    INSERT INTO chunks (chunk_id, link, source, category, published_ts, title, content)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            chunk_id, meta.get('link'), meta.get('source'), meta.get('category'),
+                            meta.get('published_ts'), meta.get('title', ''), doc
+                        )
+                        for chunk_id, doc, meta in zip(ids, documents, metadatas)
+                    ]
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Lexical index upsert failed: {e}")
+
+    @timed_call("sqlite", "lexical_search")
+    def search(self, query, n_results=10, filters=None):
+        """
+        Returns [(chunk_id, bm25_score)] best first (lower bm25 is better).
+        filters uses the same keys as RagEngine: since, until, sources, category.
+        """
+        match = self._to_match_expression(query)
+        if not match:
+            return []
+
+        clauses = ["chunks MATCH ?"]
+        params = [match]
+        filters = filters or {}
+        if filters.get('since') is not None:
+            clauses.append("published_ts >= ?")
+            params.append(filters['since'])
+        if filters.get('until') is not None:
+            clauses.append("published_ts < ?")
+            params.append(filters['until'])
+        if filters.get('sources'):
+            clauses.append(f"source IN ({', '.join('?' for _ in filters['sources'])})")
+            params.extend(filters['sources'])
+        if filters.get('category'):
+            clauses.append("category = ?")
+            params.append(filters['category'])
+        params.append(n_results)
+
+        try:
+            with self._lock:
+                cursor = self.conn.execute(
+                    f"""
+                    SELECT chunk_id, bm25(chunks, 0.0, 0.0, 0.0, 0.0, 0.0, 2.0, 1.0) AS score
+                    FROM chunks
+                    WHERE {' AND '.join(clauses)}
+                    ORDER BY score
+                    LIMIT ?
+                    """,
+                    params
+                )
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Lexical search failed for '{query}': {e}")
+            return []
+
+    def list_sources(self):
+        """Distinct source names, used to resolve short names like 'PDPC'."""
+        try:
+            with self._lock:
+                cursor = self.conn.execute("SELECT DISTINCT source FROM chunks WHERE source IS NOT NULL")
+                return [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Error listing sources: {e}")
+            return []
+
+    def count(self):
+        with self._lock:
+            cursor = self.conn.execute("SELECT COUNT(*) FROM chunks")
+            return cursor.fetchone()[0]
+
+    def delete_older_than(self, cutoff_ts):
+        """Removes dated chunks published before cutoff_ts (their vectors were dropped by retention)."""
+        try:
+            with self._lock, self.conn:
+                cursor = self.conn.execute(
+                    "DELETE FROM chunks WHERE published_ts > 0 AND published_ts < ?", (cutoff_ts,)
+                )
+            logger.info(f"Removed {cursor.rowcount} chunks older than the retention period from the lexical index")
+        except sqlite3.Error as e:
+            logger.error(f"Lexical index cleanup failed: {e}")
+
+    def _to_match_expression(self, query):
+        # Quote every term so FTS5 syntax characters in user input
+        # (e.g. "s.13", "AI-generated") are treated as plain text.
+        terms = [t for t in TOKEN_PATTERN.findall(query) if t.lower() not in STOPWORDS]
+        return " OR ".join(f'"{t}"' for t in terms)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,268 @@
+"""
+Shared LLM client for article summaries, digests and /ask.
+
+Every LLM request goes through one LLMClient (get_client()), which:
+    - reuses one Ollama client, so one pooled HTTP connection,
+    - loads the model at startup (warm_up) and keeps it loaded (OLLAMA_KEEP_ALIVE),
+    - puts a deadline on each request. A request that misses its deadline
+      raises LLMTimeout, and its generation is stopped. Callers fall back:
+      the processor uses the cleaned feed summary.
+    - queues requests in an LLMScheduler (llm_scheduler.py): interactive
+      before batch, with per-class concurrency limits.
+
+LLM_BACKEND=stub swaps Ollama for a deterministic local backend, so tests
+and benchmarks run without a model.
+"""
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from config import (
+    OLLAMA_MODEL, OLLAMA_HOST, OLLAMA_KEEP_ALIVE, LLM_BACKEND, LLM_STUB_LATENCY, LLM_MAX_CONCURRENCY,
+    LLM_INTERACTIVE_CONCURRENCY, LLM_BATCH_CONCURRENCY, LLM_AGING_SECONDS
+)
+from llm_scheduler import LLMScheduler, LLMCancelled, PRIORITY_INTERACTIVE, PRIORITY_BATCH, current_request
+from metrics import STAGE_SECONDS, timed, count
+
+logger = logging.getLogger(__name__)
+
+
+class LLMTimeout(Exception):
+    """The request missed its deadline."""
+
+
+class LLMBusy(LLMTimeout):
+    """The request would have queued longer than the caller's queue_timeout."""
+
+
+class OllamaBackend:
+    name = "ollama"
+
+    def __init__(self, host=OLLAMA_HOST):
+        from ollama import Client
+        # One client = one connection pool, reused by every request
+        self.client = Client(host=host or None)
+
+    def load(self, model, keep_alive):
+        # A request without a prompt just loads the model
+        self.client.generate(model=model, keep_alive=keep_alive)
+
+    def chat(self, model, messages, options, keep_alive, stop, on_text=None):
+        # Streamed, so an expired or cancelled request can stop generation part-way
+        parts = []
+        stream = self.client.chat(
+            model=model, messages=messages, options=options, keep_alive=keep_alive, stream=True
+        )
+        try:
+            for chunk in stream:
+                if stop.is_set():
+                    break
+                parts.append(chunk['message']['content'])
+                if on_text:
+                    on_text("".join(parts))
+        finally:
+            # Closing the stream drops the connection, which stops generation in Ollama
+            stream.close()
+        return "".join(parts)
+
+
+class StubBackend:
+    """Deterministic replies after `latency` seconds, built from the prompt itself."""
+    name = "stub"
+
+    def __init__(self, latency=LLM_STUB_LATENCY):
+        self.latency = latency
+
+    def load(self, model, keep_alive):
+        pass
+
+    def chat(self, model, messages, options, keep_alive, stop, on_text=None):
+        # Half the latency before the first word, the rest spread over the words
+        if stop.wait(self.latency / 2):
+            return ""
+        reply = self._reply(messages[-1]['content'])
+        if on_text:
+            words = reply.split(" ")
+            for i in range(1, len(words) + 1):
+                on_text(" ".join(words[:i]))
+                if stop.wait(self.latency / 2 / len(words)):
+                    break
+        elif stop.wait(self.latency / 2):
+            return ""
+        return reply
+
+    @staticmethod
+    def _reply(prompt):
+        # Digest prompts: one numbered line per article
+        numbered = re.findall(r'^\s*(\d+)\. Title: (.+)$', prompt, re.MULTILINE)
+        if numbered:
+            return "\n".join(f"{n}. {title.strip()}." for n, title in numbered)
+
+        # Summaries and /ask: the first sentence of the content or context
+        for marker in ("Content:", "Context:"):
+            if marker in prompt:
+                body = prompt.split(marker, 1)[1].strip()
+                return body.split(". ", 1)[0].split("\n")[-1].strip()[:300] + "."
+        return prompt.strip().split("\n", 1)[0][:300]
+
+
+def create_backend(name=LLM_BACKEND):
+    if name == "stub":
+        return StubBackend()
+    if name != "ollama":
+        logger.warning(f"Unknown LLM_BACKEND '{name}'; using ollama.")
+    return OllamaBackend()
+
+
+class LLMClient:
+    def __init__(self, backend=None, model=OLLAMA_MODEL, keep_alive=OLLAMA_KEEP_ALIVE,
+                 max_concurrency=LLM_MAX_CONCURRENCY):
+        self.backend = backend or create_backend()
+        self.model = model
+        self.keep_alive = keep_alive
+        # Decides which request runs next (interactive before batch, with aging)
+        self.scheduler = LLMScheduler(
+            total=max_concurrency,
+            limits={
+                PRIORITY_INTERACTIVE: min(LLM_INTERACTIVE_CONCURRENCY or max_concurrency, max_concurrency),
+                PRIORITY_BATCH: min(LLM_BATCH_CONCURRENCY or max(1, max_concurrency - 1), max_concurrency),
+            },
+            aging_seconds=LLM_AGING_SECONDS
+        )
+        # Requests run here, so a caller can stop waiting at its deadline
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self.warm = False
+        self.stats = {"calls": 0, "timeouts": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """Loads the model into memory (blocking). Returns True if it loaded."""
+        start = time.monotonic()
+        try:
+            with timed("ollama_load", self.model):
+                self.backend.load(self.model, self.keep_alive)
+            self.warm = True
+            logger.info(f"LLM {self.model} ({self.backend.name}) loaded in {time.monotonic() - start:.1f}s")
+        except Exception as e:
+            logger.warning(f"LLM warm-up failed ({self.model}): {e}")
+        return self.warm
+
+    def warm_up_in_background(self):
+        threading.Thread(target=self.warm_up, name="llm-warmup", daemon=True).start()
+
+    def _run(self, messages, options, stop, on_text, label):
+        if stop.is_set():
+            return ""
+        start = time.monotonic()
+        first = []
+
+        def text_so_far(text):
+            if not first:
+                first.append(True)
+                STAGE_SECONDS.observe(time.monotonic() - start, stage="llm_first_token", target=label)
+            on_text(text)
+
+        return self.backend.chat(self.model, messages, options, self.keep_alive, stop,
+                                 text_so_far if on_text else None)
+
+    def chat(self, prompt, deadline=None, options=None, label="chat", priority=None, cancelled=None,
+             queue_timeout=None, on_text=None):
+        """
+        Returns the model's reply to a single-turn prompt. Raises LLMTimeout
+        once `deadline` seconds have passed (queueing included), LLMBusy if it
+        would wait for a slot longer than `queue_timeout`, LLMCancelled if
+        `cancelled` is set first, or the backend's error.
+
+        on_text(text so far) is called from a worker thread as the reply streams in.
+        priority/cancelled default to the surrounding llm_request() context.
+        """
+        context_priority, context_cancelled = current_request()
+        priority = priority or context_priority
+        cancelled = cancelled or context_cancelled or threading.Event()
+        messages = [{'role': 'user', 'content': prompt}]
+        start = time.monotonic()
+        with self._lock:
+            self.stats["calls"] += 1
+
+        if queue_timeout is not None:
+            # Don't join a queue that has recently been slower than the caller will wait
+            expected = self.scheduler.expected_wait(priority)
+            if expected > queue_timeout:
+                count("llm_queue_slo_exceeded")
+                raise LLMBusy(f"{label} request skipped: LLM queue wait ~{expected:.0f}s")
+        wait_limit = deadline
+        if queue_timeout is not None:
+            wait_limit = queue_timeout if deadline is None else min(deadline, queue_timeout)
+
+        try:
+            ticket = self.scheduler.acquire(priority, cancelled, timeout=wait_limit)
+        except TimeoutError as e:
+            if wait_limit != deadline:
+                count("llm_queue_slo_exceeded")
+                raise LLMBusy(f"{label} request waited over {queue_timeout:g}s for the LLM ({e})")
+            self._timed_out(label, deadline)
+            raise LLMTimeout(f"{label} request exceeded its {deadline:g}s deadline ({e})")
+
+        # Separate from `cancelled`: a missed deadline stops this generation, not the user's request
+        stop = threading.Event()
+        with timed("ollama_chat", label):
+            try:
+                future = self.executor.submit(self._run, messages, options, stop, on_text, label)
+            except RuntimeError:
+                # Executor shut down (process exiting)
+                self.scheduler.release(ticket)
+                raise
+            # The slot frees when the backend is actually done, even if we stop waiting earlier
+            future.add_done_callback(lambda _: self.scheduler.release(ticket))
+            while True:
+                wait = 0.25
+                if deadline is not None:
+                    wait = min(wait, max(0.0, start + deadline - time.monotonic()))
+                try:
+                    reply = future.result(timeout=wait)
+                    break
+                except FutureTimeout:
+                    if cancelled.is_set():
+                        stop.set()
+                        count("llm_requests_cancelled")
+                        raise LLMCancelled(f"{label} request abandoned")
+                    if deadline is not None and time.monotonic() >= start + deadline:
+                        stop.set()
+                        self._timed_out(label, deadline)
+                        raise LLMTimeout(f"{label} request exceeded its {deadline:g}s deadline")
+                except Exception:
+                    with self._lock:
+                        self.stats["errors"] += 1
+                    raise
+
+        self.warm = True
+        return reply.strip()
+
+    def _timed_out(self, label, deadline):
+        with self._lock:
+            self.stats["timeouts"] += 1
+        count("llm_deadline_exceeded")
+
+    def summary(self):
+        """One line for /status."""
+        state = "warm" if self.warm else "cold"
+        return (f"{self.model} via {self.backend.name} ({state}) | {self.stats['calls']} calls, "
+                f"{self.stats['timeouts']} timeouts, {self.stats['errors']} errors | {self.scheduler.summary()}")
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide LLMClient, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
@@ -0,0 +1,150 @@
+"""
+Priority scheduler in front of every LLM call.
+
+Interactive requests (/ask, /summarise, DM links, /share) go ahead of
+background work (fetch-cycle summaries, digests). Each class has its own
+concurrency limit inside an overall limit. A batch request that has waited
+longer than aging_seconds is treated as interactive, so background work
+isn't starved during busy chat periods. A waiting request whose `cancelled`
+event is set (the user gave up or sent a newer request) leaves the queue
+without running.
+
+The priority and cancellation of the current request travel in a context
+variable (llm_request), which asyncio.to_thread copies into worker threads,
+so the code between a handler and LLMClient.chat doesn't need to pass them on.
+"""
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import STAGE_SECONDS, count
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+
+# (priority, cancelled event or None) of the LLM request being made
+_current_request = contextvars.ContextVar("llm_request", default=(PRIORITY_BATCH, None))
+
+
+class LLMCancelled(Exception):
+    """The request was abandoned before it finished."""
+
+
+@contextmanager
+def llm_request(priority=PRIORITY_INTERACTIVE, cancelled=None):
+    """LLM calls made inside (including from asyncio.to_thread) use this priority and cancel event."""
+    token = _current_request.set((priority, cancelled))
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+def current_request():
+    return _current_request.get()
+
+
+class _Ticket:
+    def __init__(self, priority, seq):
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = time.monotonic()
+
+
+class LLMScheduler:
+    def __init__(self, total=2, limits=None, aging_seconds=60.0):
+        self.total = total
+        self.limits = limits or {PRIORITY_INTERACTIVE: total, PRIORITY_BATCH: max(1, total - 1)}
+        self.aging_seconds = aging_seconds
+        self.waiting = []
+        self.running = {priority: 0 for priority in self.limits}
+        self.stats = {"granted": 0, "cancelled": 0, "expired": 0, "promoted": 0}
+        # Moving average of recent queue waits per class, for expected_wait()
+        self.recent_wait = {priority: 0.0 for priority in self.limits}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _rank(self, ticket, now):
+        if ticket.priority == PRIORITY_INTERACTIVE:
+            return 0
+        return 0 if now - ticket.enqueued >= self.aging_seconds else 1
+
+    def _next(self, now):
+        """The waiting ticket that should run next, if a slot is free for it."""
+        if sum(self.running.values()) >= self.total:
+            return None
+        for ticket in sorted(self.waiting, key=lambda t: (self._rank(t, now), t.enqueued, t.seq)):
+            if self.running[ticket.priority] < self.limits[ticket.priority]:
+                return ticket
+        return None
+
+    def acquire(self, priority=PRIORITY_BATCH, cancelled=None, timeout=None):
+        """
+        Blocks until the request may run. Returns a ticket to pass to release().
+        Raises LLMCancelled if `cancelled` is set first, TimeoutError after `timeout`.
+        """
+        ticket = _Ticket(priority, next(self._seq))
+        deadline = None if timeout is None else ticket.enqueued + timeout
+        with self._cond:
+            self.waiting.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if cancelled is not None and cancelled.is_set():
+                        self.stats["cancelled"] += 1
+                        count("llm_requests_cancelled")
+                        raise LLMCancelled("abandoned while queued")
+                    if self._next(now) is ticket:
+                        break
+                    if deadline is not None and now >= deadline:
+                        self.stats["expired"] += 1
+                        raise TimeoutError(f"waited {now - ticket.enqueued:.1f}s for an LLM slot")
+                    # Wake up now and then to notice cancellation and aging
+                    wait = 0.25 if deadline is None else min(0.25, deadline - now)
+                    self._cond.wait(max(wait, 0.01))
+            finally:
+                self.waiting.remove(ticket)
+                # The head of the queue may have changed for the others
+                self._cond.notify_all()
+
+            self.running[priority] += 1
+            self.stats["granted"] += 1
+            waited = time.monotonic() - ticket.enqueued
+            if priority == PRIORITY_BATCH and waited >= self.aging_seconds:
+                self.stats["promoted"] += 1
+            self.recent_wait[priority] = 0.8 * self.recent_wait[priority] + 0.2 * waited
+        STAGE_SECONDS.observe(waited, stage="llm_queue_wait", target=priority)
+        return ticket
+
+    def release(self, ticket):
+        with self._cond:
+            self.running[ticket.priority] -= 1
+            self._cond.notify_all()
+
+    def expected_wait(self, priority):
+        """
+        Roughly how long a new request of this class would queue: the recent
+        average wait, or 0 if nothing of this class is waiting right now.
+        """
+        with self._cond:
+            if not any(t.priority == priority for t in self.waiting):
+                return 0.0
+            return self.recent_wait[priority]
+
+    def depth(self, priority=None):
+        with self._cond:
+            return sum(1 for t in self.waiting if priority is None or t.priority == priority)
+
+    def summary(self):
+        """One line for /status."""
+        with self._cond:
+            waiting = {p: sum(1 for t in self.waiting if t.priority == p) for p in self.limits}
+            running = dict(self.running)
+        return (f"interactive {running[PRIORITY_INTERACTIVE]} running/{waiting[PRIORITY_INTERACTIVE]} waiting, "
+                f"batch {running[PRIORITY_BATCH]}/{waiting[PRIORITY_BATCH]}, "
+                f"{self.stats['promoted']} promoted, {self.stats['cancelled']} cancelled")
@@ -0,0 +1,231 @@
+"""
+In-process latency histograms and counters, exposed in Prometheus text
+format by MetricsServer (GET /metrics) and summarized in /status.
+
+Instrument code with:
+    with timed("ollama_chat", "summary"):
+        ...
+or decorate functions with @timed_call("sqlite", "is_new"). Every timing
+lands in litbot_stage_seconds{stage, target}; exceptions are also counted
+in litbot_stage_errors_total. Pipeline events go through count().
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from http_helpers import read_request, write_response
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # label values tuple -> float
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callable at scrape time (queue depths, cache sizes)."""
+
+    def __init__(self, name, help_text, fn):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        REGISTRY.append(self)
+
+    def render(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            logger.warning(f"Gauge {self.name} failed: {e}")
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values tuple -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, series):
+                    cumulative += n
+                    labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {series[-2]}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+    def quantile(self, q, series):
+        """Upper bucket bound containing quantile q of a series (an estimate, like Prometheus)."""
+        total = series[-1]
+        if not total:
+            return 0.0
+        cumulative = 0
+        for bound, n in zip(self.buckets, series):
+            cumulative += n
+            if cumulative >= q * total:
+                return bound
+        return float("inf")
+
+
+STAGE_SECONDS = Histogram("litbot_stage_seconds", "Time spent per pipeline stage.", ("stage", "target"))
+STAGE_ERRORS = Counter("litbot_stage_errors_total", "Stage calls that raised.", ("stage", "target"))
+EVENTS = Counter("litbot_events_total", "Pipeline events (articles fetched, posted, ...).", ("event",))
+
+
+@contextmanager
+def timed(stage, target=""):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage, target=target)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, target=target)
+
+
+def timed_call(stage, target=""):
+    """Decorator form of timed() for sync and async functions."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(stage, target):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage, target):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(event, amount=1):
+    EVENTS.inc(amount, event=event)
+
+
+def render():
+    """All registered metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def summary(top=5):
+    """Short per-stage lines for /status, slowest total time first."""
+    merged = {}
+    with STAGE_SECONDS._lock:
+        for (stage, _), series in STAGE_SECONDS.series.items():
+            acc = merged.setdefault(stage, [0] * len(series))
+            for i, value in enumerate(series):
+                acc[i] += value
+
+    lines = []
+    for stage, series in sorted(merged.items(), key=lambda item: item[1][-2], reverse=True)[:top]:
+        calls, total = series[-1], series[-2]
+        p95 = STAGE_SECONDS.quantile(0.95, series)
+        lines.append(f"{stage}: {calls} calls, avg {total / calls:.2f}s, p95 ≤{p95}s")
+    return lines
+
+
+class MetricsServer:
+    """Serves GET /metrics for Prometheus. Bind it to localhost unless the scraper is remote."""
+
+    def __init__(self, host="127.0.0.1", port=9108):
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        try:
+            self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+            logger.info(f"Metrics on http://{self.host}:{self.port}/metrics")
+            return True
+        except OSError as e:
+            # e.g. a second worker on the same host; give each process its own METRICS_PORT
+            logger.warning(f"Metrics server not started on {self.host}:{self.port}: {e}")
+            return False
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle_client(self, reader, writer):
+        try:
+            request = await read_request(reader)
+            if request is None:
+                return
+            if request.path.split("?", 1)[0] == "/metrics" and request.method == "GET":
+                await write_response(writer, 200, render(), content_type="text/plain; version=0.0.4",
+                                     keep_alive=False)
+            else:
+                await write_response(writer, 404, "not found\n", content_type="text/plain", keep_alive=False)
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
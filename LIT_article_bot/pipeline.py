@@ -0,0 +1,147 @@
+"""
+Article pipeline helpers shared by the bot (bot.py) and fetch workers (worker.py).
+Nothing here talks to Telegram, so workers can run without a bot token.
+"""
+import html
+from datetime import datetime
+
+from config import DEFAULT_KEYWORDS
+from processor import ChannelRouter, MAIN_CHANNEL
+from rag_engine import to_timestamp
+
+
+def ensure_default_keywords(storage):
+    """Seeds the keyword table on first run."""
+    if not storage.get_keywords():
+        for k in DEFAULT_KEYWORDS:
+            storage.add_keyword(k)
+        return True
+    return False
+
+
+def channel_router(storage):
+    """Router over the current keywords of the main channel and every topic channel."""
+    return ChannelRouter(storage.get_subscriptions(MAIN_CHANNEL))
+
+
+def format_article_message(article, processed_data, note=None):
+    """Channel post HTML for a processed article. `note` marks manual shares."""
+    # Escape title to prevent HTML errors
+    safe_title = html.escape(article['title'])
+    category_tag = f"<b>[{processed_data.get('category', 'Tech Law')}]</b>"
+
+    message = f"{category_tag}\n" \
+              f"<b>{safe_title}</b>\n\n" \
+              f"{processed_data['summary']}\n\n" \
+              f"Source: {article['source']}\n" \
+              f"{processed_data['hashtags']}\n"
+    if note:
+        message += f"\n<i>({note})</i>\n"
+    message += f"\n<a href='{article['link']}'>Read Full Article</a>"
+    return message
+
+
+def group_for_digest(processor, articles, keywords, max_articles):
+    """
+    Groups articles by category (newest first within each) in chunks of at
+    most max_articles; each chunk becomes one batched Ollama prompt.
+    """
+    groups = {}
+    for article in articles:
+        category, _ = processor.categorize(article, keywords)
+        groups.setdefault(category, []).append(article)
+
+    chunks = []
+    for category in sorted(groups):
+        group = groups[category]
+        for i in range(0, len(group), max_articles):
+            chunks.append(group[i:i + max_articles])
+    return chunks
+
+
+def _digest_item(article, processed_data):
+    safe_title = html.escape(article['title'])
+    return f"• <a href='{article['link']}'>{safe_title}</a> (<i>{html.escape(article['source'])}</i>)\n" \
+           f"{processed_data['summary']}\n"
+
+
+def format_digest_messages(items, mode, max_chars=3800):
+    """
+    Digest posts for [(article, processed_data), ...]: one message per
+    category in "category" mode, otherwise one message for the whole cycle.
+    Messages are split to stay under Telegram's 4096-character limit.
+    Returns [(message HTML, items in that message), ...].
+    """
+    by_category = {}
+    for article, processed_data in items:
+        by_category.setdefault(processed_data.get('category') or "General Tech Law", []).append(
+            (article, processed_data)
+        )
+
+    if mode == "category":
+        posts = [(f"📰 <b>Digest: {html.escape(category)}</b>", {category: group})
+                 for category, group in sorted(by_category.items())]
+    else:
+        posts = [("📰 <b>Digest</b>", dict(sorted(by_category.items())))]
+
+    messages = []
+    for header, sections in posts:
+        n = sum(len(group) for group in sections.values())
+        hashtags = []
+        for group in sections.values():
+            for _, processed_data in group:
+                for tag in processed_data['hashtags'].split():
+                    if tag not in hashtags:
+                        hashtags.append(tag)
+        footer = "\n" + " ".join(hashtags[:8])
+
+        message = f"{header} ({n} article{'s' if n != 1 else ''})\n"
+        included = []
+        for category, group in sections.items():
+            section = f"\n<b>[{html.escape(category)}]</b>\n" if mode != "category" else "\n"
+            for article, processed_data in group:
+                item = _digest_item(article, processed_data)
+                if len(message) + len(section) + len(item) + len(footer) > max_chars:
+                    messages.append((message + footer, included))
+                    message = f"{header} (cont.)\n"
+                    included = []
+                    section = f"\n<b>[{html.escape(category)}]</b>\n" if mode != "category" else "\n"
+                message += section + item
+                included.append((article, processed_data))
+                section = ""
+        messages.append((message + footer, included))
+    return messages
+
+
+def index_text(article):
+    """Text embedded for /ask."""
+    return f"{article['title']}\n\n{article['summary']}"
+
+
+def rag_metadata(article_data, processed_data):
+    """Chunk metadata for the vector store (source/date/category power /ask filters)."""
+    return {
+        'source': article_data['source'],
+        'title': article_data['title'],
+        'link': article_data['link'],
+        'published_str': str(article_data['published']),
+        'published_ts': to_timestamp(article_data['published']),
+        'category': processed_data.get('category') or "General Tech Law"
+    }
+
+
+def article_to_payload(article):
+    """JSON-safe copy of a fetched article for the work queue."""
+    payload = dict(article)
+    if isinstance(payload.get('published'), datetime):
+        payload['published'] = payload['published'].isoformat()
+    return payload
+
+
+def article_from_payload(payload):
+    article = dict(payload)
+    try:
+        article['published'] = datetime.fromisoformat(article['published'])
+    except (KeyError, TypeError, ValueError):
+        pass
+    return article
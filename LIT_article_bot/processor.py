@@ -1,6 +1,10 @@
 import logging
 import re
 
+from metrics import timed_call, count
+from llm_scheduler import LLMCancelled
+import extractive
+
 logger = logging.getLogger(__name__)
 
 # Category Mapping
@@ -16,10 +20,77 @@ CATEGORY_MAP = {
     "Tech Policy": ["Regulation", "Tech Policy", "Antitrust", "Emerging Tech"]
 }
 
+MAIN_CHANNEL = "main"  # CHANNEL_ID; its keywords are the `keywords` table
+
+
+class ChannelRouter:
+    """
+    Matches an article against every channel's keywords in one compiled pass.
+
+    subscriptions is {channel name: [keywords]} (Storage.get_subscriptions).
+    Same word-boundary, case-insensitive semantics as is_relevant, but one
+    regex over the text instead of one search per keyword per channel.
+    """
+
+    def __init__(self, subscriptions):
+        self.channels = {}  # lowercased keyword -> channel names
+        self.keywords = []  # every keyword once, original spelling (hashtags)
+        for channel, keywords in subscriptions.items():
+            for keyword in keywords:
+                key = keyword.lower()
+                if key not in self.channels:
+                    self.channels[key] = []
+                    self.keywords.append(keyword)
+                if channel not in self.channels[key]:
+                    self.channels[key].append(channel)
+        self.order = list(subscriptions)
+
+        # Longest first, so at each position the lookahead captures the longest keyword;
+        # shorter keywords starting at the same position are its word-boundary prefixes.
+        ordered = sorted(self.channels, key=len, reverse=True)
+        self.pattern = None
+        if ordered:
+            self.pattern = re.compile(r'\b(?=(' + "|".join(re.escape(k) for k in ordered) + r')\b)')
+        self.prefixes = {
+            k: [p for p in ordered if len(p) < len(k) and re.match(re.escape(p) + r'\b', k)]
+            for k in ordered
+        }
+
+    @timed_call("is_relevant")
+    def route(self, article):
+        """Names of the channels the article is relevant to (empty if none)."""
+        if self.pattern is None:
+            return []
+        text = (article['title'] + " " + article['summary']).lower()
+
+        matched = set()
+        for match in self.pattern.finditer(text):
+            keyword = match.group(1)
+            matched.add(keyword)
+            matched.update(self.prefixes[keyword])
+
+        channels = set()
+        for keyword in matched:
+            channels.update(self.channels[keyword])
+        if channels:
+            logger.info(f"Routed to {', '.join(sorted(channels))}: {article['title']}")
+            count("articles_relevant")
+        return [channel for channel in self.order if channel in channels]
+
+
 class ArticleProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, llm=None):
+        self._llm = llm
 
+    @property
+    def llm(self):
+        # The shared client by default; created on first use so importing stays cheap
+        if self._llm is None:
+            from llm_client import get_client
+            self._llm = get_client()
+        return self._llm
+
+    @timed_call("is_relevant")
     def is_relevant(self, article, keywords):
         """
         Checks if the article is relevant based on dynamic keywords.
@@ -31,72 +102,125 @@ class ArticleProcessor:
             pattern = re.compile(r'\b' + re.escape(keyword.lower()) + r'\b')
             if pattern.search(text):
                 logger.info(f"Match found for keyword '{keyword}': {article['title']}")
+                count("articles_relevant")
                 return True
         return False
 
-    def process_article(self, article, keywords):
+    def categorize(self, article, keywords):
+        """
+        Returns (category, hashtags) for an article. Cheap (no LLM), so digest
+        mode can group articles by category before summarizing them.
+        """
+        text = (article['title'] + " " + article['summary']).lower()
+
+        # 1. Determine Category
+        category = "General Tech Law"
+        matched_keywords = []
+
+        for cat, cat_keys in CATEGORY_MAP.items():
+            for k in cat_keys:
+                if re.search(r'\b' + re.escape(k.lower()) + r'\b', text):
+                    category = cat
+                    break
+
+        # 2. Generate Hashtags
+        # Find all matching keywords from the dynamic list
+        for k in keywords:
+            if re.search(r'\b' + re.escape(k.lower()) + r'\b', text):
+                matched_keywords.append(k.replace(" ", ""))
+
+        # Add category tag if unique
+        cat_tag = category.replace(" ", "").replace("&", "")
+        if cat_tag not in matched_keywords:
+            matched_keywords.append(cat_tag)
+
+        hashtags = " ".join([f"#{t}" for t in set(matched_keywords[:5])]) # Limit to 5 tags
+        return category, hashtags
+
+    def clean_summary(self, article):
+        """Feed summary with tags stripped and HTML-escaped; the fallback when Ollama fails."""
+        import html
+
+        original_summary = article.get('summary', 'No summary available.')
+        original_summary = re.sub(r'<[^>]+>', '', original_summary)
+        return html.escape(original_summary)
+
+    @timed_call("extractive_summary")
+    def extractive_summary(self, article, max_sentences=None, max_chars=400):
+        """The article's most central sentences (HTML-escaped), or "" if none are usable."""
+        import html
+        from config import EXTRACTIVE_SENTENCES
+
+        summary = extractive.summarize(
+            article.get('summary', ''),
+            max_sentences=max_sentences or EXTRACTIVE_SENTENCES,
+            max_chars=max_chars,
+            title=article.get('title')
+        )
+        return html.escape(summary)
+
+    def fallback_summary(self, article, reason):
+        """
+        Summary used instead of the LLM's (reason: "source", "busy" or "failed"):
+        extractive if the text has usable sentences, else the cleaned feed summary.
+        """
+        summary = self.extractive_summary(article)
+        if summary:
+            count(f"summary_extractive_{reason}")
+            return f"📝 <b>Summary:</b> {summary}"
+        return self.clean_summary(article)
+
+    def process_article(self, article, keywords, on_text=None):
         """
         Processes article using dynamic keywords for hashtag generation.
+        on_text(summary so far) is called as the AI summary streams in.
         """
         try:
-            text = (article['title'] + " " + article['summary']).lower()
-            
-            # 1. Determine Category
-            category = "General Tech Law"
-            matched_keywords = []
-
-            for cat, cat_keys in CATEGORY_MAP.items():
-                for k in cat_keys:
-                    if re.search(r'\b' + re.escape(k.lower()) + r'\b', text):
-                        category = cat
-                        break
-            
-            # 2. Generate Hashtags
-            # Find all matching keywords from the dynamic list
-            for k in keywords:
-                if re.search(r'\b' + re.escape(k.lower()) + r'\b', text):
-                    matched_keywords.append(k.replace(" ", ""))
-            
-            # Add category tag if unique
-            cat_tag = category.replace(" ", "").replace("&", "")
-            if cat_tag not in matched_keywords:
-                matched_keywords.append(cat_tag)
-                
-            hashtags = " ".join([f"#{t}" for t in set(matched_keywords[:5])]) # Limit to 5 tags
+            category, hashtags = self.categorize(article, keywords)
             
             # 3. Clean & Summarize
             import html
-            import ollama
-            from config import OLLAMA_MODEL
+            from config import LLM_SUMMARY_DEADLINE, LLM_QUEUE_SLO_SECONDS, EXTRACTIVE_SOURCES
+            from llm_client import LLMBusy
 
             # Basic clean of original summary for fallback
-            original_summary = article.get('summary', 'No summary available.')
-            original_summary = re.sub(r'<[^>]+>', '', original_summary)
-            original_summary = html.escape(original_summary)
+            original_summary = self.clean_summary(article)
 
             summary_text = original_summary
 
-            try:
-                # Attempt AI Summarization
-                prompt = (
-                    f"Summarize the following tech/law article in 1-2 concise, high-impact sentences. "
-                    f"Focus on the legal or technical implication. Do not use 'Here is a summary'. "
-                    f"Title: {article['title']}\n"
-                    f"Content: {original_summary}"
-                )
-                
-                logger.info(f"Generating AI summary for: {article['title']}")
-                response = ollama.chat(model=OLLAMA_MODEL, messages=[
-                    {'role': 'user', 'content': prompt},
-                ])
-                
-                ai_summary = response['message']['content'].strip()
-                if ai_summary:
-                    summary_text = f"✨ <b>AI Summary:</b> {html.escape(ai_summary)}"
-                
-            except Exception as e:
-                logger.warning(f"Ollama summarization failed (using fallback): {e}")
-                # Fallback is already set to original_summary
+            if article.get('source', '').lower() in EXTRACTIVE_SOURCES:
+                # Low-priority source: not worth an LLM slot
+                summary_text = self.fallback_summary(article, "source")
+            else:
+                try:
+                    # Attempt AI Summarization
+                    prompt = (
+                        f"Summarize the following tech/law article in 1-2 concise, high-impact sentences. "
+                        f"Focus on the legal or technical implication. Do not use 'Here is a summary'. "
+                        f"Title: {article['title']}\n"
+                        f"Content: {original_summary}"
+                    )
+
+                    logger.info(f"Generating AI summary for: {article['title']}")
+                    # Past the queue SLO or the deadline we post an extractive summary instead of waiting
+                    ai_summary = self.llm.chat(
+                        prompt, deadline=LLM_SUMMARY_DEADLINE, label="summary",
+                        queue_timeout=LLM_QUEUE_SLO_SECONDS or None, on_text=on_text
+                    )
+                    if ai_summary:
+                        summary_text = f"✨ <b>AI Summary:</b> {html.escape(ai_summary)}"
+
+                except LLMCancelled:
+                    # Nobody is waiting for this one; don't produce a fallback either
+                    raise
+                except LLMBusy as e:
+                    logger.info(f"LLM busy, using extractive summary: {e}")
+                    count("summary_fallbacks")
+                    summary_text = self.fallback_summary(article, "busy")
+                except Exception as e:
+                    logger.warning(f"Ollama summarization failed (using fallback): {e}")
+                    count("summary_fallbacks")
+                    summary_text = self.fallback_summary(article, "failed")
             
             # Truncate if too long (backup safety)
             if len(summary_text) > 800:
@@ -108,6 +232,52 @@ class ArticleProcessor:
                 "hashtags": hashtags
             }
             
+        except LLMCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error processing article: {e}")
             return None
+
+    def process_batch(self, articles, keywords):
+        """
+        Digest mode: summarizes a group of articles with one LLM call.
+        Returns one processed_data dict per article, in order. Articles the
+        model skipped, or every article if the LLM is busy or fails, get an
+        extractive one-sentence summary.
+        """
+        import html
+        from config import LLM_DIGEST_DEADLINE, LLM_QUEUE_SLO_SECONDS
+
+        results = []
+        numbered = []
+        for i, article in enumerate(articles, 1):
+            category, hashtags = self.categorize(article, keywords)
+            fallback = self.extractive_summary(article, max_sentences=1, max_chars=300) or self.clean_summary(article)
+            if len(fallback) > 300:
+                fallback = fallback[:300] + "..."
+            results.append({"category": category, "summary": fallback, "hashtags": hashtags})
+            numbered.append(f"{i}. Title: {article['title']}\n   Content: {self.clean_summary(article)[:1500]}")
+
+        try:
+            prompt = (
+                f"Summarize each of the following {len(articles)} tech/law articles in one concise, "
+                f"high-impact sentence focused on the legal or technical implication. "
+                f"Answer with exactly {len(articles)} lines, each starting with the article number "
+                f"and a period (e.g. '1. ...'). Do not add anything else.\n\n" + "\n\n".join(numbered)
+            )
+
+            logger.info(f"Generating digest summary for {len(articles)} articles")
+            reply = self.llm.chat(prompt, deadline=LLM_DIGEST_DEADLINE, label="digest",
+                                  queue_timeout=LLM_QUEUE_SLO_SECONDS or None)
+
+            for line in reply.splitlines():
+                match = re.match(r'\s*(\d+)[.):]\s*(.+)', line)
+                if match and 1 <= int(match.group(1)) <= len(articles):
+                    ai_summary = match.group(2).strip()[:400]
+                    results[int(match.group(1)) - 1]["summary"] = f"✨ {html.escape(ai_summary)}"
+
+        except Exception as e:
+            logger.warning(f"Ollama digest summarization failed (using fallback): {e}")
+            count("summary_fallbacks", len(articles))
+
+        return results
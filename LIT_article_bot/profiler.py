@@ -0,0 +1,212 @@
+"""
+On-demand profiling for /profile.
+
+A session runs cProfile on the event loop thread plus tracemalloc, for either
+the next fetch cycle or a fixed window. Blocking work sent to threads is
+included by passing the callable through profiler.wrap() before to_thread;
+when no session is active, wrap() returns the callable unchanged and the
+cycle hook is a single attribute check, so profiling costs nothing when off.
+
+Results are written to PROFILE_DIR: <label>.prof (load with pstats or
+snakeviz) and <label>.alloc.txt (allocation sites), and summarized for the admin.
+"""
+import asyncio
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from config import PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+TRACEMALLOC_FRAMES = 10
+
+
+class ProfileReport:
+    def __init__(self, label, duration, functions, own_time, allocations, stats_file, alloc_file):
+        self.label = label
+        self.duration = duration
+        self.functions = functions      # lines, by cumulative time
+        self.own_time = own_time        # lines, by time spent in the function itself
+        self.allocations = allocations  # lines, by size
+        self.stats_file = stats_file
+        self.alloc_file = alloc_file
+
+    def summary(self, max_chars=3500):
+        text = (
+            f"Profile {self.label} ({self.duration:.1f}s)\n\n"
+            f"Top cumulative time:\n" + "\n".join(self.functions) + "\n\n"
+            "Top own time:\n" + "\n".join(self.own_time) + "\n\n"
+            "Top allocation sites:\n" + "\n".join(self.allocations) + "\n\n"
+            f"Saved: {self.stats_file}, {self.alloc_file}"
+        )
+        # Telegram messages are capped at 4096 characters
+        return text if len(text) <= max_chars else text[:max_chars] + "\n…"
+
+
+def _short_path(filename):
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def _format_function(func, row):
+    filename, line, name = func
+    _, ncalls, tottime, cumtime, _ = row
+    where = name if filename == "~" else f"{name} ({_short_path(filename)}:{line})"
+    return f"{cumtime:7.3f}s cum {tottime:7.3f}s own {ncalls:>7} calls  {where}"
+
+
+class ProfileSession:
+    def __init__(self, label, top_n=15, out_dir=PROFILE_DIR):
+        self.label = label
+        self.top_n = top_n
+        self.out_dir = out_dir
+        self.profile = cProfile.Profile()
+        self.thread_profiles = []
+        self._lock = threading.Lock()
+        self._owns_tracemalloc = False
+        self.started = 0.0
+
+    def start(self):
+        self.started = time.monotonic()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        self.profile.enable()
+        logger.info(f"Profiling started: {self.label}")
+
+    def wrap(self, func):
+        """Runs func (in a worker thread) under its own profiler, merged into this session."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one profiler per interpreter; the session's one sees this thread too
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    self.thread_profiles.append(profile)
+        return wrapper
+
+    def stop(self):
+        """Stops profiling, writes the files and returns a ProfileReport."""
+        self.profile.disable()
+        duration = time.monotonic() - self.started
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        stats = pstats.Stats(self.profile)
+        with self._lock:
+            for profile in self.thread_profiles:
+                stats.add(profile)
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"{self.label}-{datetime.now():%Y%m%d-%H%M%S}")
+        stats_file = base + ".prof"
+        alloc_file = base + ".alloc.txt"
+        stats.dump_stats(stats_file)
+
+        alloc_stats = snapshot.statistics("lineno")
+        with open(alloc_file, "w") as f:
+            for stat in alloc_stats[:200]:
+                f.write(f"{stat}\n")
+                for line in stat.traceback.format()[-TRACEMALLOC_FRAMES * 2:]:
+                    f.write(f"    {line}\n")
+
+        rows = stats.stats.items()
+        by_cumulative = sorted(rows, key=lambda item: item[1][3], reverse=True)[:self.top_n]
+        by_own = sorted(rows, key=lambda item: item[1][2], reverse=True)[:self.top_n]
+        allocations = []
+        for stat in alloc_stats[:self.top_n]:
+            frame = stat.traceback[0]
+            allocations.append(
+                f"{stat.size / 1024:9.1f} KiB {stat.count:>7} blocks  {_short_path(frame.filename)}:{frame.lineno}"
+            )
+
+        logger.info(f"Profiling finished: {self.label} ({duration:.1f}s) -> {stats_file}")
+        return ProfileReport(
+            self.label,
+            duration,
+            [_format_function(func, row) for func, row in by_cumulative],
+            [_format_function(func, row) for func, row in by_own],
+            allocations,
+            stats_file,
+            alloc_file
+        )
+
+
+class Profiler:
+    """One profiling session at a time: armed for the next cycle, or running a window."""
+
+    def __init__(self):
+        self.session = None
+        self.armed = None  # (top_n, on_report) waiting for the next fetch cycle
+
+    @property
+    def busy(self):
+        return self.session is not None or self.armed is not None
+
+    def wrap(self, func):
+        session = self.session
+        return func if session is None else session.wrap(func)
+
+    def arm_next_cycle(self, on_report, top_n=15):
+        """on_report is an async callable taking the ProfileReport."""
+        if self.busy:
+            raise RuntimeError("A profiling session is already active or armed")
+        self.armed = (top_n, on_report)
+
+    async def profile_window(self, seconds, top_n=15):
+        """Profiles everything on the event loop (handlers, jobs) for `seconds`."""
+        if self.busy:
+            raise RuntimeError("A profiling session is already active or armed")
+        self.session = ProfileSession(f"window-{int(seconds)}s", top_n)
+        self.session.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            session, self.session = self.session, None
+            # disable() has to run on the thread that enabled the profiler
+            report = session.stop()
+        return report
+
+    @asynccontextmanager
+    async def cycle(self, label="cycle"):
+        """Wrap a fetch cycle; profiles it if /profile next_cycle armed a session."""
+        if self.armed is None or self.session is not None:
+            yield
+            return
+
+        top_n, on_report = self.armed
+        self.armed = None
+        self.session = ProfileSession(label, top_n)
+        self.session.start()
+        try:
+            yield
+        finally:
+            session, self.session = self.session, None
+            report = session.stop()
+            try:
+                await on_report(report)
+            except Exception as e:
+                logger.error(f"Failed to deliver profile report: {e}")
+
+
+profiler = Profiler()
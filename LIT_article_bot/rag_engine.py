@@ -1,72 +1,581 @@
 import chromadb
-from chromadb.utils import embedding_functions
 import logging
 import os
-from config import CHROMA_DB_PATH, OLLAMA_MODEL
-from ollama import Client
+import re
+from datetime import datetime, timedelta
+from dateutil import parser as date_parser
+from config import (
+    CHROMA_DB_PATH, CHROMA_HOST, CHROMA_PORT, LLM_ASK_DEADLINE, LEXICAL_DB_PATH,
+    RAG_HYBRID, RAG_CANDIDATES, RAG_TOP_K, RAG_RRF_K, RERANKER_MODEL,
+    EMBED_MODEL, EMBED_BACKEND, EMBED_ONNX_FILE, EMBED_WORKERS, EMBED_BATCH_SIZE,
+    EMBED_SERVICE_HOST, EMBED_SERVICE_PORT, EMBED_SERVICE_AUTHKEY, EMBED_SERVICE_AUTOSTART,
+    RELATED_ARTICLES_K, RAG_RECENT_SHARDS, RAG_WIDEN_DISTANCE, VECTOR_HOT_MONTHS, VECTOR_RETENTION_MONTHS,
+    CHROMA_CACHE_MB
+)
+from embedding_service import EmbeddingClient, launch_service, load_embedding_model, encode_texts
+from lexical_index import LexicalIndex
+from metrics import timed
+from processor import CATEGORY_MAP
+from llm_client import get_client, LLMTimeout
+from llm_scheduler import LLMCancelled
+from vector_shards import VectorShards, collection_names
 
 logger = logging.getLogger(__name__)
 
+# Bump when chunk metadata gains fields that need backfilling
+METADATA_VERSION = 2
+
+# The single collection used before the vector store was split by month
+LEGACY_COLLECTION = "articles"
+
+# /ask scope options, e.g. since:2024-06 source:PDPC cat:"Data Privacy"
+# (Telegram clients often turn straight quotes into curly ones)
+FILTER_PATTERN = re.compile(r'\b(since|until|source|src|cat|category):("[^"]*"|“[^”]*”|\S+)', re.IGNORECASE)
+
+
+def parse_date_option(value, now=None):
+    """
+    Parses '2024', '2024-06', '2024-06-15' or a relative '30d' / '8w'.
+    Returns a datetime, or None if it can't be read.
+    """
+    now = now or datetime.now()
+    relative = re.fullmatch(r'(\d+)([dw])', value.lower())
+    if relative:
+        amount, unit = int(relative.group(1)), relative.group(2)
+        return now - timedelta(days=amount * (7 if unit == 'w' else 1))
+    try:
+        if re.fullmatch(r'\d{4}', value):
+            return datetime(int(value), 1, 1)
+        if re.fullmatch(r'\d{4}-\d{1,2}', value):
+            year, month = value.split('-')
+            return datetime(int(year), int(month), 1)
+        return date_parser.parse(value)
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse_query_filters(text):
+    """
+    Splits scope options out of an /ask question.
+    Returns (question, filters) where filters may contain
+    'since'/'until' (unix timestamps), 'source' and 'category' (raw strings).
+    """
+    filters = {}
+    for key, value in FILTER_PATTERN.findall(text):
+        key = key.lower()
+        value = value.strip('"“”')
+        if key in ("since", "until"):
+            parsed = parse_date_option(value)
+            if parsed:
+                filters[key] = int(parsed.timestamp())
+        elif key in ("source", "src"):
+            filters['source'] = value
+        else:
+            filters['category'] = value
+
+    question = FILTER_PATTERN.sub("", text)
+    question = re.sub(r'\s+', ' ', question).strip()
+    return question, filters
+
+
+def to_timestamp(published):
+    """Numeric publish time for range filters (accepts datetime or its str())."""
+    if isinstance(published, datetime):
+        return int(published.timestamp())
+    try:
+        return int(date_parser.parse(str(published)).timestamp())
+    except (ValueError, OverflowError):
+        return 0
+
+
+class ServiceEmbeddingFunction(chromadb.EmbeddingFunction):
+    """Chroma embedding function backed by the process-pool embedding service."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __call__(self, input):
+        return self.client.encode(list(input))
+
+
+class LocalEmbeddingFunction(chromadb.EmbeddingFunction):
+    """Chroma embedding function encoding in this process with the configured EMBED_BACKEND."""
+
+    def __init__(self, model_name, backend="torch", onnx_file=None):
+        self.model = load_embedding_model(model_name, backend, onnx_file)
+
+    def __call__(self, input):
+        return encode_texts(self.model, input)
+
+
+def create_embedding_function():
+    """
+    Uses the embedding service when EMBED_WORKERS > 0 (starting it if needed),
+    otherwise encodes in-process like before.
+    """
+    if EMBED_WORKERS > 0:
+        client = EmbeddingClient(EMBED_SERVICE_HOST, EMBED_SERVICE_PORT, EMBED_SERVICE_AUTHKEY)
+        try:
+            if not client.ping():
+                if not EMBED_SERVICE_AUTOSTART:
+                    raise RuntimeError("service not running and EMBED_SERVICE_AUTOSTART is off")
+                logger.info(f"Starting embedding service with {EMBED_WORKERS} workers...")
+                launch_service(
+                    EMBED_MODEL, EMBED_WORKERS, EMBED_BATCH_SIZE,
+                    EMBED_SERVICE_HOST, EMBED_SERVICE_PORT, EMBED_SERVICE_AUTHKEY,
+                    backend=EMBED_BACKEND, onnx_file=EMBED_ONNX_FILE
+                )
+            return ServiceEmbeddingFunction(client)
+        except Exception as e:
+            logger.error(f"Embedding service unavailable (encoding in-process): {e}")
+
+    return LocalEmbeddingFunction(EMBED_MODEL, EMBED_BACKEND, EMBED_ONNX_FILE)
+
+
 class RagEngine:
-    def __init__(self):
-        self.client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-        self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-        
-        self.collection = self.client.get_or_create_collection(
-            name="articles",
-            embedding_function=self.embedding_fn
+    def __init__(self, related_store=None):
+        """
+        related_store (a Storage) receives each indexed article's nearest
+        neighbours (Storage.add_related); None skips the related-article graph.
+        """
+        self.related_store = related_store
+        if CHROMA_HOST:
+            # Shared server: a local PersistentClient is not safe across processes
+            self.client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+        elif CHROMA_CACHE_MB > 0:
+            from chromadb.config import Settings
+            # Unload the least recently queried shards' indexes beyond the budget
+            self.client = chromadb.PersistentClient(path=CHROMA_DB_PATH, settings=Settings(
+                chroma_segment_cache_policy="LRU",
+                chroma_memory_limit_bytes=CHROMA_CACHE_MB * 1024 * 1024
+            ))
+        else:
+            self.client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+        self.embedding_fn = create_embedding_function()
+        self.llm = get_client()
+
+        # Keyword index for exact terms (statute numbers, case names, acronyms)
+        self.lexical = LexicalIndex(LEXICAL_DB_PATH) if RAG_HYBRID else None
+
+        # One collection per month of publication, searched newest first
+        self.shards = VectorShards(
+            self.client,
+            self.embedding_fn,
+            hot_months=VECTOR_HOT_MONTHS,
+            retention_months=VECTOR_RETENTION_MONTHS,
+            recent_shards=RAG_RECENT_SHARDS,
+            widen_distance=RAG_WIDEN_DISTANCE,
+            metadata={'metadata_version': METADATA_VERSION},
+            on_drop=self.lexical.delete_older_than if self.lexical else None
         )
-        self.ollama = Client()
+        self._split_legacy_collection()
+        self.maintain()
+
+        if self.lexical:
+            self._bootstrap_lexical()
+
+        # Optional reranker (loaded once, only if configured)
+        self.reranker = None
+        if RERANKER_MODEL:
+            try:
+                from sentence_transformers import CrossEncoder
+                self.reranker = CrossEncoder(RERANKER_MODEL)
+            except Exception as e:
+                logger.warning(f"Could not load reranker {RERANKER_MODEL} (continuing without): {e}")
+
+    def _migrate_metadata(self, collection):
+        """Adds numeric 'published_ts' and 'category' to chunks indexed before filtering existed."""
+        try:
+            collection_meta = collection.metadata or {}
+            if collection_meta.get('metadata_version', 1) >= METADATA_VERSION:
+                return
+
+            if collection.count() > 0:
+                logger.info("Migrating vector store metadata (published_ts, category)...")
+                batch_size = 500
+                offset = 0
+                while True:
+                    batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+                    if not batch['ids']:
+                        break
+
+                    metadatas = []
+                    for meta in batch['metadatas']:
+                        meta = dict(meta)
+                        meta.setdefault('published_ts', to_timestamp(meta.get('published_str', '')))
+                        meta.setdefault('category', "General Tech Law")
+                        metadatas.append(meta)
+                    collection.update(ids=batch['ids'], metadatas=metadatas)
+                    offset += len(batch['ids'])
+                logger.info(f"Metadata migration complete for {offset} chunks.")
+
+            collection.modify(metadata={**collection_meta, 'metadata_version': METADATA_VERSION})
+        except Exception as e:
+            logger.error(f"Metadata migration failed: {e}")
+
+    def _split_legacy_collection(self):
+        """
+        Moves the chunks of the single pre-sharding collection into the monthly
+        shards, embeddings included, then deletes it. Each batch is deleted
+        after it's copied, so an interrupted split resumes on the next start.
+        """
+        try:
+            if LEGACY_COLLECTION not in collection_names(self.client):
+                return
+            legacy = self.client.get_collection(name=LEGACY_COLLECTION, embedding_function=self.embedding_fn)
+            # Shards are chosen by published_ts, which very old chunks don't have yet
+            self._migrate_metadata(legacy)
+
+            logger.info(f"Splitting the vector store into monthly shards ({legacy.count()} chunks)...")
+            moved = 0
+            while True:
+                batch = legacy.get(include=["documents", "metadatas", "embeddings"], limit=500)
+                if not batch['ids']:
+                    break
+                self.shards.upsert(
+                    ids=batch['ids'],
+                    documents=batch['documents'],
+                    metadatas=batch['metadatas'],
+                    embeddings=batch['embeddings']
+                )
+                legacy.delete(ids=batch['ids'])
+                moved += len(batch['ids'])
+            self.client.delete_collection(name=LEGACY_COLLECTION)
+            # Chunks past the retention period weren't moved; the lexical index still has them
+            cutoff = self.shards.retention_cutoff()
+            if self.lexical and cutoff is not None:
+                self.lexical.delete_older_than(cutoff)
+            logger.info(f"Vector store split complete: {moved} chunks in {len(self.shards.names(refresh=True))} shards.")
+        except Exception as e:
+            logger.error(f"Vector store split failed (will retry on next start): {e}")
+
+    def resolve_filters(self, filters):
+        """
+        Turns user-facing filter values into exact metadata values:
+        'PDPC' -> ['PDPC Singapore'], 'data privacy' -> 'Data Privacy'.
+        """
+        resolved = {k: filters[k] for k in ('since', 'until') if k in filters}
+
+        if filters.get('source'):
+            wanted = filters['source'].lower()
+            known = self.lexical.list_sources() if self.lexical else []
+            matches = [s for s in known if wanted in s.lower()]
+            resolved['sources'] = matches or [filters['source']]
+
+        if filters.get('category'):
+            wanted = filters['category'].lower()
+            categories = list(CATEGORY_MAP.keys()) + ["General Tech Law"]
+            resolved['category'] = next((c for c in categories if c.lower() == wanted), filters['category'])
+
+        return resolved
+
+    def _build_where(self, filters):
+        """Chroma 'where' clause from resolved filters (None if unfiltered)."""
+        conditions = []
+        if filters.get('since') is not None:
+            conditions.append({'published_ts': {'$gte': filters['since']}})
+        if filters.get('until') is not None:
+            conditions.append({'published_ts': {'$lt': filters['until']}})
+        if filters.get('sources'):
+            conditions.append({'source': {'$in': filters['sources']}})
+        if filters.get('category'):
+            conditions.append({'category': filters['category']})
+
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {'$and': conditions}
+
+    def _bootstrap_lexical(self):
+        """Fills the keyword index from Chroma for chunks indexed before hybrid search existed."""
+        try:
+            if self.lexical.count() > 0 or self.shards.count() == 0:
+                return
+
+            logger.info("Building lexical index from existing vector store...")
+            indexed = 0
+            for batch in self.shards.iter_batches(include=["documents", "metadatas"]):
+                self.lexical.upsert(batch['ids'], batch['documents'], batch['metadatas'])
+                indexed += len(batch['ids'])
+            logger.info(f"Lexical index built with {indexed} chunks.")
+        except Exception as e:
+            logger.error(f"Lexical index bootstrap failed: {e}")
+
+    def maintain(self):
+        """Vector store retention (compaction and drops). Runs at startup and from a periodic job."""
+        try:
+            with timed("vector_maintenance"):
+                self.shards.apply_retention()
+        except Exception as e:
+            logger.error(f"Vector store maintenance failed: {e}")
+
+    def _lexical_upsert(self, stored, ids, documents, metadatas):
+        """Mirrors into the lexical index only the chunks the vector store kept (not those past retention)."""
+        if not self.lexical:
+            return
+        if len(stored) < len(ids):
+            keep = set(stored)
+            rows = [(i, doc, meta) for i, doc, meta in zip(ids, documents, metadatas) if i in keep]
+            if not rows:
+                return
+            ids, documents, metadatas = (list(column) for column in zip(*rows))
+        self.lexical.upsert(ids, documents, metadatas)
+
+    def _chunk_article(self, text, metadata):
+        """Splits one article into (ids, chunks, metadatas)."""
+        metadata = dict(metadata)
+        metadata.setdefault('published_ts', to_timestamp(metadata.get('published_str', '')))
+        metadata['category'] = metadata.get('category') or "General Tech Law"
+
+        # Simple chunking (checking size)
+        # 1000 chars overlap 100
+        chunk_size = 1000
+        overlap = 100
+
+        chunks = []
+        ids = []
+        metadatas = []
+
+        if not text:
+            return ids, chunks, metadatas
+
+        for i in range(0, len(text), chunk_size - overlap):
+            chunk = text[i:i + chunk_size]
+            if len(chunk) < 50: continue # Skip tiny chunks
+
+            chunks.append(chunk)
+            ids.append(f"{metadata['link']}_{i}")
+            metadatas.append(metadata)
+
+        return ids, chunks, metadatas
+
+    def _embed(self, texts):
+        """Embeds texts explicitly (rather than inside Chroma) so embedding time is measured on its own."""
+        with timed("embedding"):
+            return self.embedding_fn(texts)
 
     def index_article(self, text, metadata):
         """
         Chunks and indexes an article. 
         metadata must include 'source', 'title', 'link', 'published_str'
+        and should include 'published_ts' and 'category' (used by /ask filters).
         """
         try:
-            # Simple chunking (checking size)
-            # 1000 chars overlap 100
-            chunk_size = 1000
-            overlap = 100
-            
-            chunks = []
-            ids = []
-            metadatas = []
-            
-            if not text:
-                return
-
-            for i in range(0, len(text), chunk_size - overlap):
-                chunk = text[i:i + chunk_size]
-                if len(chunk) < 50: continue # Skip tiny chunks
-                
-                chunks.append(chunk)
-                ids.append(f"{metadata['link']}_{i}")
-                metadatas.append(metadata)
+            ids, chunks, metadatas = self._chunk_article(text, metadata)
             
             if chunks:
-                self.collection.upsert(
-                    documents=chunks,
-                    metadatas=metadatas,
-                    ids=ids
-                )
+                embeddings = self._embed(chunks)
+                with timed("chroma_upsert"):
+                    stored = self.shards.upsert(
+                        documents=chunks,
+                        metadatas=metadatas,
+                        embeddings=embeddings,
+                        ids=ids
+                    )
+                self._lexical_upsert(stored, ids, chunks, metadatas)
                 logger.info(f"Indexed {len(chunks)} chunks for {metadata['title']}")
+                self._record_related(metadata['link'], embeddings)
                 
         except Exception as e:
             logger.error(f"Error indexing article {metadata.get('title')}: {e}")
 
-    def query_similar(self, query, n_results=5):
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
-        return results
+    def index_articles(self, articles):
+        """
+        Bulk version of index_article for (text, metadata) pairs.
+        All chunks are embedded in one call, so the embedding service can
+        spread them across its workers. Returns the number of chunks indexed.
+        Raises on failure (callers like reindex.py decide whether to retry).
+        """
+        all_ids, all_chunks, all_metadatas = [], [], []
+        for text, metadata in articles:
+            ids, chunks, metadatas = self._chunk_article(text, metadata)
+            all_ids.extend(ids)
+            all_chunks.extend(chunks)
+            all_metadatas.extend(metadatas)
 
-    def generate_answer(self, query):
+        if not all_chunks:
+            return 0
+
+        embeddings = self._embed(all_chunks)
+        with timed("chroma_upsert"):
+            stored = self.shards.upsert(
+                documents=all_chunks,
+                metadatas=all_metadatas,
+                embeddings=embeddings,
+                ids=all_ids
+            )
+        self._lexical_upsert(stored, all_ids, all_chunks, all_metadatas)
+
+        by_link = {}
+        for metadata, embedding in zip(all_metadatas, embeddings):
+            by_link.setdefault(metadata['link'], []).append(embedding)
+        for link, article_embeddings in by_link.items():
+            self._record_related(link, article_embeddings)
+        return len(stored)
+
+    def article_metadata(self, links):
+        """Metadata already stored for indexed articles: {link: metadata of one of its chunks}."""
+        if not links:
+            return {}
+        with timed("chroma_get", "metadata"):
+            batch = self.shards.get(where={'link': {'$in': list(links)}}, include=["metadatas"])
+        found = {}
+        for metadata in batch['metadatas']:
+            found.setdefault(metadata['link'], metadata)
+        return found
+
+    def iter_chunks(self, batch_size=500):
+        """
+        Streams every indexed chunk with its stored embedding, batch_size at a
+        time. Yields Chroma get() results (ids, documents, metadatas, embeddings).
+        """
+        yield from self.shards.iter_batches(include=["documents", "metadatas", "embeddings"], batch_size=batch_size)
+
+    def restore_chunks(self, ids, documents, metadatas, embeddings):
+        """
+        Upserts chunks with their precomputed embeddings (nothing is re-embedded),
+        e.g. from a snapshot. Raises on failure.
+        """
+        with timed("chroma_upsert", "snapshot"):
+            stored = self.shards.upsert(
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings,
+                ids=ids
+            )
+        self._lexical_upsert(stored, ids, documents, metadatas)
+        return len(stored)
+
+    def _nearest_articles(self, embeddings, exclude_link=None, k=RELATED_ARTICLES_K):
+        """
+        Articles closest to the centroid of `embeddings` (one article's chunks):
+        [(link, title, distance)], closest first, one entry per article.
+        """
+        dims = len(embeddings[0])
+        centroid = [sum(float(e[i]) for e in embeddings) / len(embeddings) for i in range(dims)]
+        # Several chunks can belong to one article; ask for enough to still find k articles
+        with timed("chroma_query", "related"):
+            result = self.shards.query(
+                query_embeddings=[centroid],
+                n_results=k * 4,
+                include=["metadatas", "distances"]
+            )
+        best = {}
+        for meta, distance in zip(result['metadatas'][0], result['distances'][0]):
+            link = meta.get('link')
+            if not link or link == exclude_link:
+                continue
+            if link not in best or distance < best[link][1]:
+                best[link] = (meta.get('title'), distance)
+        ranked = sorted(best.items(), key=lambda item: item[1][1])[:k]
+        return [(link, title, distance) for link, (title, distance) in ranked]
+
+    def _record_related(self, link, embeddings):
+        """Stores an article's neighbours in the related-article graph (computed once, at index time)."""
+        if self.related_store is None or not embeddings:
+            return
+        try:
+            neighbours = self._nearest_articles(embeddings, exclude_link=link)
+            self.related_store.add_related(link, [(other, distance) for other, _, distance in neighbours],
+                                           keep=RELATED_ARTICLES_K)
+        except Exception as e:
+            logger.error(f"Related-article update failed for {link}: {e}")
+
+    def related_articles(self, text, link=None, k=3):
+        """
+        Fast path for articles that aren't indexed (e.g. links sent in private):
+        embeds the text once and returns the k closest indexed articles as
+        [(link, title)].
+        """
+        if not text:
+            return []
+        embeddings = self._embed([text[:1000]])
+        return [(other, title) for other, title, _ in self._nearest_articles(embeddings, exclude_link=link, k=k)]
+
+    def query_similar(self, query, n_results=5, filters=None):
+        """
+        Hybrid retrieval: dense (MiniLM) and lexical (BM25) candidates fused
+        with reciprocal-rank fusion, optionally reranked.
+        filters (from resolve_filters) are pushed down to both indexes.
+        Returns the same shape as a Chroma query (lists nested per query).
+        """
+        filters = filters or {}
+        where = self._build_where(filters)
+
+        query_embeddings = self._embed([query])
+
+        if not self.lexical:
+            with timed("chroma_query"):
+                return self.shards.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    where=where,
+                    since=filters.get('since'),
+                    until=filters.get('until')
+                )
+
+        n_candidates = max(RAG_CANDIDATES, n_results)
+
+        # 1. Dense candidates
+        with timed("chroma_query"):
+            dense = self.shards.query(
+                query_embeddings=query_embeddings,
+                n_results=n_candidates,
+                where=where,
+                since=filters.get('since'),
+                until=filters.get('until')
+            )
+        chunks = {}  # id -> (document, metadata)
+        for chunk_id, doc, meta in zip(dense['ids'][0], dense['documents'][0], dense['metadatas'][0]):
+            chunks[chunk_id] = (doc, meta)
+        dense_ids = dense['ids'][0]
+
+        # 2. Lexical candidates
+        lexical_ids = [chunk_id for chunk_id, _ in self.lexical.search(query, n_candidates, filters)]
+        missing = [chunk_id for chunk_id in lexical_ids if chunk_id not in chunks]
+        if missing:
+            with timed("chroma_get"):
+                fetched = self.shards.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, doc, meta in zip(fetched['ids'], fetched['documents'], fetched['metadatas']):
+                chunks[chunk_id] = (doc, meta)
+        # Drop ids that only exist in the lexical index (e.g. deleted from Chroma)
+        lexical_ids = [chunk_id for chunk_id in lexical_ids if chunk_id in chunks]
+
+        # 3. Reciprocal-rank fusion
+        scores = {}
+        for ranking in (dense_ids, lexical_ids):
+            for rank, chunk_id in enumerate(ranking):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RAG_RRF_K + rank + 1)
+        fused = sorted(scores, key=scores.get, reverse=True)
+
+        # 4. Optional rerank of the fused head
+        if self.reranker and fused:
+            head = fused[:n_candidates]
+            try:
+                with timed("rerank"):
+                    rerank_scores = self.reranker.predict([(query, chunks[chunk_id][0]) for chunk_id in head])
+                fused = [chunk_id for _, chunk_id in sorted(zip(rerank_scores, head), key=lambda x: x[0], reverse=True)]
+            except Exception as e:
+                logger.warning(f"Rerank failed (using fused order): {e}")
+
+        top = fused[:n_results]
+        return {
+            'ids': [top],
+            'documents': [[chunks[chunk_id][0] for chunk_id in top]],
+            'metadatas': [[chunks[chunk_id][1] for chunk_id in top]],
+        }
+
+    def generate_answer(self, query, filters=None, on_text=None):
+        """Answers from the indexed articles. on_text(answer so far) is called as the answer streams in."""
         # 1. Retrieve relevant chunks
-        results = self.query_similar(query, n_results=10) # Fetch more to ensure we get enough distinct sources
+        # Hybrid retrieval ranks well enough that a handful of chunks is sufficient
+        filters = self.resolve_filters(filters or {})
+        results = self.query_similar(query, n_results=RAG_TOP_K if self.lexical else 10, filters=filters)
         
         if not results['documents'][0]:
+            if filters:
+                return "I couldn't find any relevant articles matching those filters to answer that."
             return "I couldn't find any relevant articles in my database to answer that."
             
         # Group chunks by source to limit to top 2 articles
@@ -110,17 +619,18 @@ class RagEngine:
         """
         
         try:
-            response = self.ollama.chat(
-                model=OLLAMA_MODEL, 
-                messages=[{'role': 'user', 'content': prompt}],
-                options={'temperature': 0.3}
-            )
-            answer = response['message']['content']
+            answer = self.llm.chat(prompt, deadline=LLM_ASK_DEADLINE, options={'temperature': 0.3}, label="ask",
+                                   on_text=on_text)
             
             # Append sources
             answer += "\n\n📚 **Sources:**\n" + sources_text
             return answer
             
+        except LLMCancelled:
+            raise
+        except LLMTimeout as e:
+            logger.warning(f"Answer generation timed out: {e}")
+            return "Sorry, generating the answer took too long. Please try again in a moment."
         except Exception as e:
             logger.error(f"Ollama generation failed: {e}")
             return "Sorry, I encountered an error generating the answer."
@@ -0,0 +1,192 @@
+"""
+Rebuilds the vector store (and keyword index) from the SQLite history.
+
+Usage:
+    python reindex.py                    # index title + stored summary, resume if interrupted
+    python reindex.py --refetch          # re-download article bodies with goose3 first
+    python reindex.py --restart          # ignore the checkpoint and start from the first row
+
+Rows are streamed in chunks by rowid. After each chunk is embedded and
+upserted, progress is saved to the checkpoint file, so an interrupted run
+picks up where it stopped. Embedding goes through RagEngine's embedding
+function, i.e. the embedding service's worker pool when EMBED_WORKERS > 0.
+"""
+import argparse
+import html
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+from rag_engine import RagEngine, to_timestamp
+from storage import Storage
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = "reindex_checkpoint.json"
+
+
+def clean_summary(summary):
+    """Stored summaries are Telegram HTML (possibly with the AI Summary prefix)."""
+    if not summary:
+        return ""
+    text = re.sub(r'<[^>]+>', '', summary)
+    text = html.unescape(text)
+    text = text.replace("✨ AI Summary:", "").strip()
+    return text
+
+
+def fetch_body(url):
+    """Downloads the article body. Returns (text, published) or (None, None)."""
+    try:
+        from goose3 import Goose
+        g = Goose()
+        try:
+            with timed("goose_extract"):
+                article = g.extract(url=url)
+            return article.cleaned_text, article.publish_date
+        finally:
+            g.close()
+    except Exception as e:
+        logger.warning(f"Refetch failed for {url}: {e}")
+        return None, None
+
+
+def build_article(row, body=None, published=None, existing=None):
+    """
+    (text, metadata) for RagEngine.index_articles, or None if there's nothing to index.
+    existing is the article's current chunk metadata, if it is indexed: its
+    source and publish date (set from the feed) are kept; the URL domain and
+    history created_at only fill in for articles that were never indexed.
+    """
+    _, link, title, summary, category, created_at = row
+    existing = existing or {}
+    title = title or link
+    text = body or clean_summary(summary)
+    if not text and title == link:
+        # Legacy link-only rows (from history.json) need --refetch
+        return None
+
+    published_str = existing.get('published_str') or str(published or created_at or datetime.now())
+    source = existing.get('source') or urlparse(link).netloc.replace("www.", "") or "Unknown"
+    metadata = {
+        'source': source,
+        'title': title,
+        'link': link,
+        'published_str': published_str,
+        'published_ts': existing.get('published_ts') or to_timestamp(published_str),
+        'category': category or existing.get('category') or "General Tech Law"
+    }
+    return f"{title}\n\n{text}", metadata
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"last_rowid": 0, "rows": 0, "indexed": 0, "chunks": 0, "skipped": 0, "elapsed_s": 0.0}
+
+
+def save_checkpoint(path, checkpoint):
+    # Write-then-rename so a crash mid-write never corrupts the checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="bot_data.db", help="SQLite database with the history table")
+    parser.add_argument("--chunk-size", type=int, default=200, help="history rows per batch")
+    parser.add_argument("--refetch", action="store_true", help="re-download article bodies")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="parallel downloads with --refetch")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = load_checkpoint(args.checkpoint)
+    if checkpoint["last_rowid"]:
+        logger.info(f"Resuming after rowid {checkpoint['last_rowid']} ({checkpoint['rows']} rows done).")
+
+    storage = Storage(args.db)
+    rag_engine = RagEngine(related_store=storage)
+    total = storage.get_history_count()
+    fetch_pool = ThreadPoolExecutor(max_workers=args.fetch_workers) if args.refetch else None
+
+    try:
+        for rows in storage.iter_articles(checkpoint["last_rowid"], args.chunk_size):
+            batch_start = time.perf_counter()
+
+            # 1. Optionally refetch bodies (network bound, so threads)
+            if fetch_pool:
+                fetched = list(fetch_pool.map(fetch_body, [row[1] for row in rows]))
+            else:
+                fetched = [(None, None)] * len(rows)
+
+            # 2. Build (text, metadata) pairs, keeping the metadata of articles already indexed
+            existing = rag_engine.article_metadata([row[1] for row in rows])
+            articles = []
+            for row, (body, published) in zip(rows, fetched):
+                article = build_article(row, body, published, existing.get(row[1]))
+                if article:
+                    articles.append(article)
+                else:
+                    checkpoint["skipped"] += 1
+
+            # 3. Embed + upsert the whole batch (one retry, then stop so a resume redoes it)
+            try:
+                n_chunks = rag_engine.index_articles(articles)
+            except Exception as e:
+                logger.warning(f"Batch after rowid {checkpoint['last_rowid']} failed, retrying: {e}")
+                n_chunks = rag_engine.index_articles(articles)
+
+            # 4. Checkpoint
+            checkpoint["last_rowid"] = rows[-1][0]
+            checkpoint["rows"] += len(rows)
+            checkpoint["indexed"] += len(articles)
+            checkpoint["chunks"] += n_chunks
+            checkpoint["elapsed_s"] += time.perf_counter() - batch_start
+            save_checkpoint(args.checkpoint, checkpoint)
+
+            # 5. Progress
+            elapsed = checkpoint["elapsed_s"] or 1e-9
+            rows_per_s = checkpoint["rows"] / elapsed
+            eta = (total - checkpoint["rows"]) / rows_per_s if rows_per_s else 0
+            logger.info(
+                f"{checkpoint['rows']}/{total} rows ({100 * checkpoint['rows'] / max(total, 1):.1f}%) | "
+                f"{checkpoint['chunks']} chunks | {rows_per_s:.1f} rows/s, "
+                f"{checkpoint['chunks'] / elapsed:.1f} chunks/s | ETA {eta:.0f}s"
+            )
+    except KeyboardInterrupt:
+        logger.info(f"Interrupted. Run again to resume from {args.checkpoint}.")
+        return
+    finally:
+        if fetch_pool:
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+        storage.close()
+
+    logger.info(
+        f"Re-index complete: {checkpoint['indexed']} articles, {checkpoint['chunks']} chunks, "
+        f"{checkpoint['skipped']} skipped (no text; try --refetch) in {checkpoint['elapsed_s']:.1f}s."
+    )
+    # No batch saved a checkpoint if the history was empty
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+
+if __name__ == "__main__":
+    main()
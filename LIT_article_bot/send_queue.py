@@ -0,0 +1,225 @@
+import asyncio
+import itertools
+import logging
+import time
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+from metrics import STAGE_SECONDS, timed, count
+
+logger = logging.getLogger(__name__)
+
+# Lower value = sent first
+PRIORITY_USER = 0     # replies to people waiting on a command
+PRIORITY_CHANNEL = 1  # channel posts from fetch cycles / shares
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # set when Telegram answers with RetryAfter
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now=None):
+        """Seconds until a token is available (0 if one is available now)."""
+        now = now or time.monotonic()
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def consume(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+
+class _Job:
+    def __init__(self, priority, seq, chat_id, send, future):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.send = send
+        self.future = future
+        self.attempts = 0
+        self.not_before = 0.0
+        self.submitted_at = time.monotonic()
+
+
+class SendQueue:
+    """
+    Single outbound queue for Telegram messages.
+
+    Every send goes through a global bucket and a bucket for its chat, sized
+    to Telegram's limits (about 30 msg/s overall, 1 msg/s per private chat,
+    20 msg/min per group or channel). User replies go ahead of channel posts,
+    RetryAfter pauses the affected chat for the time Telegram asks, and
+    network errors are retried with backoff in the background.
+    """
+
+    def __init__(self, global_rate=30, private_rate=1.0, group_rate_per_min=20, max_retries=5):
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.private_rate = private_rate
+        self.group_rate = group_rate_per_min / 60
+        self.max_retries = max_retries
+        self.chat_buckets = {}
+        self.pending = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+        self._in_flight = set()
+        self.stats = {"sent": 0, "failed": 0, "retries": 0, "flood_waits": 0}
+
+    # --- Public API ---
+
+    async def start(self):
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+    def submit(self, chat_id, send, priority=PRIORITY_CHANNEL):
+        """
+        Queues a send. `send` is a zero-argument callable returning the
+        coroutine to await (called again on retry). Returns a Future with
+        the sent Message.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(_Job(priority, next(self._seq), str(chat_id), send, future))
+        self._wakeup.set()
+        return future
+
+    async def send(self, chat_id, send, priority=PRIORITY_CHANNEL):
+        """submit() and wait for delivery (raises if it ultimately fails)."""
+        return await self.submit(chat_id, send, priority)
+
+    def depth(self):
+        return len(self.pending)
+
+    # --- Internals ---
+
+    def _bucket_for(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative ids and @usernames are groups/channels; positive ids are private chats
+            if chat_id.startswith("-") or chat_id.startswith("@"):
+                bucket = TokenBucket(self.group_rate, capacity=3)
+            else:
+                bucket = TokenBucket(self.private_rate, capacity=3)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _next_job(self):
+        """Best ready job (priority, then FIFO), or (None, seconds until one is ready)."""
+        now = time.monotonic()
+        best = None
+        min_wait = None
+        for job in self.pending:
+            wait = max(job.not_before - now, self._bucket_for(job.chat_id).delay(now))
+            if wait <= 0:
+                if best is None or (job.priority, job.seq) < (best.priority, best.seq):
+                    best = job
+            elif min_wait is None or wait < min_wait:
+                min_wait = wait
+        return best, min_wait
+
+    async def _dispatch_loop(self):
+        while True:
+            if not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            job, wait = self._next_job()
+            if job is None:
+                # Nothing ready: sleep until a bucket refills or a new job arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            global_wait = self.global_bucket.delay()
+            if global_wait > 0:
+                await asyncio.sleep(global_wait)
+                continue
+
+            self.pending.remove(job)
+            self.global_bucket.consume()
+            self._bucket_for(job.chat_id).consume()
+            # Don't hold up the dispatcher while the HTTP request is in flight
+            task = asyncio.create_task(self._deliver(job))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    def _requeue(self, job, delay):
+        job.not_before = time.monotonic() + delay
+        self.pending.append(job)
+        self._wakeup.set()
+
+    async def _deliver(self, job):
+        if job.future.cancelled():
+            return
+
+        job.attempts += 1
+        if job.attempts == 1:
+            # Time spent waiting on rate limits / higher-priority sends
+            STAGE_SECONDS.observe(time.monotonic() - job.submitted_at, stage="send_queue_wait", target="")
+        kind = "group" if job.chat_id.startswith(("-", "@")) else "private"
+        try:
+            with timed("telegram_send", kind):
+                message = await job.send()
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            seconds = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+            logger.warning(f"Flood control for chat {job.chat_id}: retrying in {seconds}s")
+            self.stats["flood_waits"] += 1
+            count("telegram_flood_waits")
+            self._bucket_for(job.chat_id).blocked_until = time.monotonic() + seconds
+            self._requeue(job, seconds)
+            return
+        except BadRequest as e:
+            # Subclass of NetworkError in PTB, but retrying won't fix a bad request
+            self.stats["failed"] += 1
+            count("telegram_failed")
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        except (TimedOut, NetworkError) as e:
+            if job.attempts <= self.max_retries:
+                backoff = min(60, 2 ** job.attempts)
+                logger.warning(f"Send to {job.chat_id} failed ({e}); retry {job.attempts} in {backoff}s")
+                self.stats["retries"] += 1
+                count("telegram_retries")
+                self._requeue(job, backoff)
+                return
+            self.stats["failed"] += 1
+            count("telegram_failed")
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        except Exception as e:
+            self.stats["failed"] += 1
+            count("telegram_failed")
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+
+        self.stats["sent"] += 1
+        count("telegram_sent")
+        if not job.future.done():
+            job.future.set_result(message)
@@ -0,0 +1,107 @@
+"""
+Coalescing of identical in-flight requests.
+
+When several users send the same link (or the same /ask question) at once,
+only the first request does the work; the others await its result. Keys
+are canonical URLs (canonical_url) or normalized queries (normalize_query).
+The work runs in its own task, so one caller giving up doesn't cancel it
+for the rest. Streamed LLM text is passed on to every waiting caller.
+"""
+import asyncio
+import logging
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from metrics import count
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|igshid|ref|ref_src|cmpid|s)$", re.IGNORECASE)
+
+
+def canonical_url(url):
+    """Same page, same key: lower-case scheme/host, no www., fragment, tracking params or trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not TRACKING_PARAMS.match(k)))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", host, path, query, ""))
+
+
+def normalize_query(text):
+    """Case, spacing and trailing punctuation don't change the question."""
+    return re.sub(r"\s+", " ", text).strip().rstrip("?!. ").lower()
+
+
+class _Flight:
+    def __init__(self):
+        self.task = None
+        self.listeners = []
+        self.text = None
+
+    def emit(self, text):
+        # Called from the LLM worker thread; listeners must be thread-safe (StreamingReply.update is)
+        self.text = text
+        for listener in list(self.listeners):
+            listener(text)
+
+
+class SingleFlight:
+    """
+    run(key, work) awaits work(on_text) once per key at a time. on_text is
+    a callback passing streamed text to every caller's own `on_text`.
+
+    A caller that joined someone else's flight runs the work itself if that
+    flight failed with one of `rerun_on`, such as the first user cancelling
+    their request.
+    """
+
+    def __init__(self, rerun_on=()):
+        self.rerun_on = tuple(rerun_on)
+        self.flights = {}
+        self.stats = {"started": 0, "joined": 0}
+
+    async def run(self, key, work, on_text=None):
+        while True:
+            flight = self.flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = _Flight()
+                flight.task = asyncio.create_task(work(flight.emit))
+                self.flights[key] = flight
+                flight.task.add_done_callback(lambda _, key=key, flight=flight: self._done(key, flight))
+                self.stats["started"] += 1
+            else:
+                self.stats["joined"] += 1
+                count("requests_coalesced")
+                if on_text and flight.text:
+                    on_text(flight.text)
+
+            if on_text:
+                flight.listeners.append(on_text)
+            try:
+                # Shielded: this caller being cancelled mustn't cancel the others' work
+                return await asyncio.shield(flight.task)
+            except self.rerun_on:
+                if owner:
+                    raise
+                logger.info(f"Shared request for {key} was abandoned; running it again")
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+            finally:
+                if on_text in flight.listeners:
+                    flight.listeners.remove(on_text)
+
+    def _done(self, key, flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if not flight.task.cancelled():
+            # Retrieve it so a failure nobody awaited isn't logged as never retrieved
+            flight.task.exception()
+
+    def __len__(self):
+        return len(self.flights)
@@ -0,0 +1,294 @@
+"""
+Streaming export/import of the bot's data: the SQLite tables and the vector
+store, embeddings included.
+
+Usage:
+    python snapshot.py export backups/2024-06-01     # write a snapshot
+    python snapshot.py verify backups/2024-06-01     # check every file against the manifest
+    python snapshot.py import backups/2024-06-01     # restore into --db and the configured vector store
+
+A snapshot is a directory of gzipped JSONL shards, one JSON array per row:
+    history-00000.jsonl.gz, keywords-00000.jsonl.gz, ...  rows of each table in SNAPSHOT_TABLES
+    chunks-00000.jsonl.gz                                 [chunk id, document, metadata]
+    chunks-00000.npy                                      their embeddings (float32, same order)
+    manifest.json                                         columns, row counts and a sha256 per file
+
+Rows are streamed a batch at a time, so memory use depends on --shard-rows,
+not on the size of the data. The tables are read in one transaction, so
+they are consistent with each other while the bot keeps running; chunks
+indexed during the export may or may not be included. manifest.json is
+written last, so a directory without one is an incomplete export.
+
+Import checks every file's size and hash before writing anything, then
+upserts the stored embeddings directly, so nothing is re-embedded. Existing
+rows are kept and existing chunks are overwritten with the snapshot's,
+so an interrupted import can simply be run again.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from config import EMBED_MODEL
+from rag_engine import RagEngine
+from storage import Storage, SNAPSHOT_TABLES
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "litbot-snapshot"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ShardWriter:
+    """
+    Writes records to <directory>/<name>-NNNNN.jsonl.gz, starting a new shard
+    every shard_rows rows. Records written with a vector also get a matching
+    .npy shard. Finished shards are listed in `shards` and hashed into `files`.
+    """
+
+    def __init__(self, directory, name, shard_rows):
+        self.directory = directory
+        self.name = name
+        self.shard_rows = shard_rows
+        self.shards = []
+        self.files = {}
+        self.total = 0
+        self._out = None
+        self._file = None
+        self._rows = 0
+        self._vectors = []
+
+    def write(self, record, vector=None):
+        if self._out is None:
+            self._file = f"{self.name}-{len(self.shards):05d}.jsonl.gz"
+            self._out = gzip.open(os.path.join(self.directory, self._file), "wt", encoding="utf-8")
+        self._out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if vector is not None:
+            self._vectors.append(vector)
+        self._rows += 1
+        self.total += 1
+        if self._rows >= self.shard_rows:
+            self.close()
+
+    def close(self):
+        """Finishes the current shard (if any)."""
+        if self._out is None:
+            return
+        self._out.close()
+        shard = {"file": self._file, "rows": self._rows}
+        self._add_file(self._file)
+        if self._vectors:
+            shard["vectors"] = self._file.replace(".jsonl.gz", ".npy")
+            np.save(os.path.join(self.directory, shard["vectors"]), np.asarray(self._vectors, dtype=np.float32))
+            self._add_file(shard["vectors"])
+        self.shards.append(shard)
+        self._out = None
+        self._rows = 0
+        self._vectors = []
+
+    def _add_file(self, name):
+        path = os.path.join(self.directory, name)
+        self.files[name] = {"bytes": os.path.getsize(path), "sha256": file_sha256(path)}
+
+
+def export_snapshot(directory, storage, rag_engine, shard_rows=5000, batch_size=500):
+    """Writes a snapshot of the tables and the vector store. Returns the manifest."""
+    os.makedirs(directory, exist_ok=True)
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "embed_model": EMBED_MODEL,
+        "tables": {},
+        "chunks": None,
+        "files": {},
+    }
+
+    # 1. SQLite tables, all from the same point in time
+    with storage.read_snapshot():
+        for table in SNAPSHOT_TABLES:
+            writer = ShardWriter(directory, table, shard_rows)
+            columns = storage.table_columns(table)
+            for columns, rows in storage.iter_table(table, batch_size):
+                for row in rows:
+                    writer.write(list(row))
+            writer.close()
+            manifest["tables"][table] = {"columns": columns, "rows": writer.total, "shards": writer.shards}
+            manifest["files"].update(writer.files)
+            logger.info(f"Exported {writer.total} {table} rows.")
+
+    # 2. Chunks with their stored embeddings
+    start = time.perf_counter()
+    writer = ShardWriter(directory, "chunks", shard_rows)
+    dimensions = None
+    for batch in rag_engine.iter_chunks(batch_size):
+        embeddings = np.asarray(batch['embeddings'], dtype=np.float32)
+        dimensions = embeddings.shape[1]
+        for chunk_id, document, metadata, vector in zip(batch['ids'], batch['documents'],
+                                                        batch['metadatas'], embeddings):
+            writer.write([chunk_id, document, metadata], vector)
+        logger.info(f"Exported {writer.total} chunks ({writer.total / (time.perf_counter() - start):.0f}/s)")
+    writer.close()
+    manifest["chunks"] = {"rows": writer.total, "dimensions": dimensions, "shards": writer.shards}
+    manifest["files"].update(writer.files)
+
+    # 3. Manifest last (write-then-rename): its presence marks a complete export
+    path = os.path.join(directory, MANIFEST)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+    return manifest
+
+
+def verify_snapshot(directory):
+    """
+    Checks the manifest and the size and sha256 of every file it lists.
+    Returns the manifest; raises ValueError on the first problem.
+    """
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        raise ValueError(f"No {MANIFEST} in {directory} (not a snapshot, or an incomplete export)")
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT or manifest.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format')} v{manifest.get('version')}")
+
+    for name, expected in manifest["files"].items():
+        file_path = os.path.join(directory, name)
+        if not os.path.exists(file_path):
+            raise ValueError(f"{name} is missing")
+        if os.path.getsize(file_path) != expected["bytes"]:
+            raise ValueError(f"{name} is {os.path.getsize(file_path)} bytes, expected {expected['bytes']}")
+        if file_sha256(file_path) != expected["sha256"]:
+            raise ValueError(f"{name} is corrupt (sha256 mismatch)")
+    return manifest
+
+
+def read_shard(directory, name, batch_size):
+    """Yields the shard's records, batch_size at a time."""
+    batch = []
+    with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as f:
+        for line in f:
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def import_snapshot(directory, manifest, storage, rag_engine=None, batch_size=500):
+    """Restores a verified snapshot. rag_engine=None restores only the tables."""
+    # 1. SQLite tables
+    for table in SNAPSHOT_TABLES:
+        info = manifest["tables"].get(table)
+        if not info:
+            continue
+        inserted = 0
+        for shard in info["shards"]:
+            rows_read = 0
+            for rows in read_shard(directory, shard["file"], batch_size):
+                inserted += storage.import_rows(table, info["columns"], rows)
+                rows_read += len(rows)
+            if rows_read != shard["rows"]:
+                raise ValueError(f"{shard['file']} has {rows_read} rows, expected {shard['rows']}")
+        logger.info(f"Imported {table}: {inserted} of {info['rows']} rows new.")
+
+    chunks = manifest.get("chunks")
+    if rag_engine is None or not chunks or not chunks["rows"]:
+        return
+
+    # 2. Chunks, with the stored embeddings (memory-mapped, read a batch at a time)
+    start = time.perf_counter()
+    restored = 0
+    for shard in chunks["shards"]:
+        vectors = np.load(os.path.join(directory, shard["vectors"]), mmap_mode="r")
+        if vectors.shape != (shard["rows"], chunks["dimensions"]):
+            raise ValueError(f"{shard['vectors']} has shape {vectors.shape}, "
+                             f"expected ({shard['rows']}, {chunks['dimensions']})")
+        offset = 0
+        for records in read_shard(directory, shard["file"], batch_size):
+            ids, documents, metadatas = (list(column) for column in zip(*records))
+            embeddings = vectors[offset:offset + len(records)].tolist()
+            restored += rag_engine.restore_chunks(ids, documents, metadatas, embeddings)
+            offset += len(records)
+        if offset != shard["rows"]:
+            raise ValueError(f"{shard['file']} has {offset} rows, expected {shard['rows']}")
+        elapsed = time.perf_counter() - start
+        logger.info(f"Restored {restored}/{chunks['rows']} chunks ({restored / elapsed:.0f}/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "verify", "import"])
+    parser.add_argument("directory", help="snapshot directory")
+    parser.add_argument("--db", default="bot_data.db", help="SQLite database to export from / import into")
+    parser.add_argument("--shard-rows", type=int, default=5000, help="rows per shard file (export)")
+    parser.add_argument("--batch-size", type=int, default=500, help="rows read or written at a time")
+    parser.add_argument("--skip-vectors", action="store_true", help="import only the SQLite tables")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.command == "export":
+        if os.path.exists(os.path.join(args.directory, MANIFEST)):
+            parser.error(f"{args.directory} already holds a snapshot")
+        storage = Storage(args.db)
+        try:
+            manifest = export_snapshot(args.directory, storage, RagEngine(), args.shard_rows, args.batch_size)
+        finally:
+            storage.close()
+        rows = ", ".join(f"{info['rows']} {table}" for table, info in manifest["tables"].items())
+        logger.info(f"Snapshot written to {args.directory}: {rows}, {manifest['chunks']['rows']} chunks.")
+        return
+
+    try:
+        manifest = verify_snapshot(args.directory)
+    except ValueError as e:
+        logger.error(f"Snapshot check failed: {e}")
+        sys.exit(1)
+    logger.info(f"Snapshot OK ({len(manifest['files'])} files, created {manifest['created_at']}).")
+    if args.command == "verify":
+        return
+
+    restore_vectors = not args.skip_vectors and manifest["chunks"] and manifest["chunks"]["rows"]
+    if restore_vectors and manifest["embed_model"] != EMBED_MODEL:
+        # Vectors from another model would be silently wrong; re-embed with reindex.py instead
+        logger.error(f"Snapshot vectors were made with {manifest['embed_model']} but EMBED_MODEL is "
+                     f"{EMBED_MODEL}. Set EMBED_MODEL, or use --skip-vectors and run reindex.py.")
+        sys.exit(1)
+
+    storage = Storage(args.db)
+    try:
+        import_snapshot(args.directory, manifest, storage, RagEngine() if restore_vectors else None,
+                        args.batch_size)
+    except ValueError as e:
+        logger.error(f"Import stopped: {e}")
+        sys.exit(1)
+    finally:
+        storage.close()
+    logger.info("Import complete.")
+
+
+if __name__ == "__main__":
+    main()
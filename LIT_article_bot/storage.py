@@ -3,21 +3,65 @@ import json
 import os
 import logging
 import re
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from processor import CATEGORY_MAP
+from metrics import timed_call
 
 logger = logging.getLogger(__name__)
 
+# Days of trend counters kept (/trends compares a window with the one before it)
+TREND_RETENTION_DAYS = 120
+
+# Tables copied by snapshot.py export/import, in restore order
+SNAPSHOT_TABLES = ("history", "keywords", "channels", "channel_keywords", "related_articles", "trend_counts")
+
+
+def trend_terms(category, tags, source):
+    """(kind, term) counted for one stored article: its keyword tags, category and source."""
+    terms = []
+    cat_tag = category.replace(" ", "").replace("&", "") if category else None
+    for tag in set((tags or "").split()):
+        tag = tag.lstrip("#")
+        # The category's own tag is counted as the category
+        if tag and tag != cat_tag:
+            terms.append(("keyword", tag))
+    if category:
+        terms.append(("category", category))
+    if source:
+        terms.append(("source", source))
+    return terms
+
+
+def utc_day(when=None):
+    """YYYY-MM-DD in UTC (the same clock as history.created_at)."""
+    return (when or datetime.now(timezone.utc)).strftime("%Y-%m-%d")
+
 class Storage:
+    """
+    SQLite store of posted articles, keywords, channels and trends. Safe to
+    call from several threads (indexing records related articles from
+    asyncio.to_thread while the event loop stores and reads history): every
+    use of the shared connection holds a lock.
+    """
+
     def __init__(self, db_file="bot_data.db"):
         self.db_file = db_file
         self.conn = self._get_connection()
-        self._init_db()
-        self._run_migration()
-        self._backfill_metadata()
+        # Reentrant: add_article counts trends and read_snapshot reads tables under it
+        self._lock = threading.RLock()
+        with self._lock:
+            self._init_db()
+            self._run_migration()
+            self._backfill_metadata()
+            self._backfill_trends()
 
     def _get_connection(self):
-        return sqlite3.connect(self.db_file, check_same_thread=False)
+        conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        # WAL: the bot and worker processes can read while another one writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
 
     def _init_db(self):
         """Creates tables if they don't exist and handles schema updates."""
@@ -41,6 +85,44 @@ class Storage:
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+                # Extra topic channels; the main channel (CHANNEL_ID) uses the keywords table
+                self.conn.execute("""
+                    CREATE TABLE IF NOT EXISTS channels (
+                        name TEXT PRIMARY KEY,
+                        chat_id TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                self.conn.execute("""
+                    CREATE TABLE IF NOT EXISTS channel_keywords (
+                        channel TEXT NOT NULL,
+                        keyword TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (channel, keyword)
+                    )
+                """)
+                # Nearest neighbours of each indexed article (embedding distance, lower = closer)
+                self.conn.execute("""
+                    CREATE TABLE IF NOT EXISTS related_articles (
+                        link TEXT NOT NULL,
+                        related_link TEXT NOT NULL,
+                        distance REAL NOT NULL,
+                        PRIMARY KEY (link, related_link)
+                    )
+                """)
+                self.conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_related_distance ON related_articles (link, distance)"
+                )
+                # Articles stored per UTC day for each keyword tag, category and source (/trends)
+                self.conn.execute("""
+                    CREATE TABLE IF NOT EXISTS trend_counts (
+                        day TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        term TEXT NOT NULL,
+                        count INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (day, kind, term)
+                    )
+                """)
             
             # --- Schema Migration: Check for missing columns ---
             cursor = self.conn.execute("PRAGMA table_info(history)")
@@ -152,69 +234,238 @@ class Storage:
         except Exception as e:
             logger.error(f"Backfill failed: {e}")
 
+    def _backfill_trends(self):
+        """Builds trend counters from recent history the first time the table exists."""
+        try:
+            if self.conn.execute("SELECT 1 FROM trend_counts LIMIT 1").fetchone():
+                return
+            since = (datetime.now(timezone.utc) - timedelta(days=TREND_RETENTION_DAYS)).strftime("%Y-%m-%d")
+            cursor = self.conn.execute(
+                "SELECT date(created_at), category, tags FROM history WHERE created_at >= ?", (since,)
+            )
+            counts = {}
+            for day, category, tags in cursor:
+                # Older rows have no source
+                for kind, term in trend_terms(category, tags, None):
+                    counts[(day, kind, term)] = counts.get((day, kind, term), 0) + 1
+            if not counts:
+                return
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO trend_counts (day, kind, term, count) VALUES (?, ?, ?, ?)",
+                    [(day, kind, term, n) for (day, kind, term), n in counts.items()]
+                )
+            logger.info(f"Trend counters built from history ({len(counts)} buckets).")
+        except Exception as e:
+            logger.error(f"Trend backfill failed: {e}")
+
     # --- History Management ---
 
+    @timed_call("sqlite", "is_new")
     def is_new(self, link):
         """Checks if a link is new."""
-        cursor = self.conn.execute("SELECT 1 FROM history WHERE link = ?", (link,))
-        return cursor.fetchone() is None
+        with self._lock:
+            cursor = self.conn.execute("SELECT 1 FROM history WHERE link = ?", (link,))
+            return cursor.fetchone() is None
 
-    def add_article(self, link, title=None, summary=None, category=None, tags=None):
-        """Adds a link to history with optional metadata."""
+    @timed_call("sqlite", "add_article")
+    def add_article(self, link, title=None, summary=None, category=None, tags=None, source=None):
+        """Adds a link to history with optional metadata, and counts it in the trend counters."""
         try:
-            with self.conn:
-                self.conn.execute(
+            with self._lock, self.conn:
+                cursor = self.conn.execute(
                     "INSERT OR IGNORE INTO history (link, title, summary, category, tags) VALUES (?, ?, ?, ?, ?)", 
                     (link, title, summary, category, tags)
                 )
+                # Only new articles count (re-shares of a stored link are ignored)
+                if cursor.rowcount == 1:
+                    self._count_trends(trend_terms(category, tags, source))
         except sqlite3.Error as e:
             logger.error(f"Error adding article: {e}")
 
+    def _count_trends(self, terms, day=None):
+        """Increments today's counters for `terms` (inside the caller's transaction)."""
+        day = day or utc_day()
+        self.conn.executemany(
+            """
+            INSERT INTO trend_counts (day, kind, term, count) VALUES (?, ?, ?, 1)
+            ON CONFLICT (day, kind, term) DO UPDATE SET count = count + 1
+            """,
+            [(day, kind, term) for kind, term in terms]
+        )
+        # Rolling window: drop buckets that fell out of it (an index range, usually empty)
+        cutoff = utc_day(datetime.now(timezone.utc) - timedelta(days=TREND_RETENTION_DAYS))
+        self.conn.execute("DELETE FROM trend_counts WHERE day < ?", (cutoff,))
+
+    @timed_call("sqlite", "get_trends")
+    def get_trends(self, days=7, limit=8):
+        """
+        Top movers over the last `days` days versus the `days` before, from the
+        trend counters only: {kind: [(term, count, previous count)]}, biggest
+        increase first. Reads at most 2 * days buckets per term.
+        """
+        days = max(1, min(days, TREND_RETENTION_DAYS // 2))
+        now = datetime.now(timezone.utc)
+        # Today is day 1 of the window
+        start = utc_day(now - timedelta(days=days - 1))
+        previous_start = utc_day(now - timedelta(days=2 * days - 1))
+        trends = {"keyword": [], "category": [], "source": []}
+        try:
+            with self._lock:
+                cursor = self.conn.execute(
+                    """
+                    SELECT kind, term,
+                           SUM(CASE WHEN day >= ? THEN count ELSE 0 END) AS current,
+                           SUM(CASE WHEN day < ? THEN count ELSE 0 END) AS previous
+                    FROM trend_counts
+                    WHERE day >= ?
+                    GROUP BY kind, term
+                    HAVING current > 0
+                    """,
+                    (start, start, previous_start)
+                )
+                for kind, term, current, previous in cursor.fetchall():
+                    trends.setdefault(kind, []).append((term, current, previous))
+        except sqlite3.Error as e:
+            logger.error(f"Trend query error: {e}")
+        for kind in trends:
+            trends[kind].sort(key=lambda t: (t[1] - t[2], t[1]), reverse=True)
+            trends[kind] = trends[kind][:limit]
+        return trends
+
+    @timed_call("sqlite", "search_articles")
     def search_articles(self, query):
         """Search history for articles matching query (in title, summary, tags, or category)."""
         try:
             # Simple LIKE search
             search_query = f"%{query}%"
-            cursor = self.conn.execute(
-                """
-                SELECT link, title, created_at, category, tags
-                FROM history 
-                WHERE title LIKE ? 
-                   OR summary LIKE ? 
-                   OR link LIKE ?
-                   OR category LIKE ?
-                   OR tags LIKE ?
-                ORDER BY created_at DESC 
-                LIMIT 10
-                """, 
-                (search_query, search_query, search_query, search_query, search_query)
-            )
-            return cursor.fetchall()
+            with self._lock:
+                cursor = self.conn.execute(
+                    """
+                    SELECT link, title, created_at, category, tags
+                    FROM history 
+                    WHERE title LIKE ? 
+                       OR summary LIKE ? 
+                       OR link LIKE ?
+                       OR category LIKE ?
+                       OR tags LIKE ?
+                    ORDER BY created_at DESC 
+                    LIMIT 10
+                    """, 
+                    (search_query, search_query, search_query, search_query, search_query)
+                )
+                return cursor.fetchall()
         except sqlite3.Error as e:
             logger.error(f"Search error: {e}")
             return []
 
+    def iter_articles(self, after_rowid=0, batch_size=200):
+        """
+        Streams history rows in rowid order, batch_size at a time.
+        Yields lists of (rowid, link, title, summary, category, created_at);
+        pass the last rowid back in as after_rowid to resume.
+        """
+        while True:
+            with self._lock:
+                cursor = self.conn.execute(
+                    """
+                    SELECT rowid, link, title, summary, category, created_at
+                    FROM history
+                    WHERE rowid > ?
+                    ORDER BY rowid
+                    LIMIT ?
+                    """,
+                    (after_rowid, batch_size)
+                )
+                rows = cursor.fetchall()
+            if not rows:
+                return
+            yield rows
+            after_rowid = rows[-1][0]
+
+    # --- Related Articles ---
+
+    @timed_call("sqlite", "add_related")
+    def add_related(self, link, neighbours, keep=5):
+        """
+        Records an article's nearest neighbours [(related_link, distance)].
+        Edges are stored both ways, so older articles pick up newer related
+        ones; each article keeps its `keep` closest.
+        """
+        try:
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO related_articles (link, related_link, distance) VALUES (?, ?, ?)",
+                    [(a, b, distance) for other, distance in neighbours for a, b in ((link, other), (other, link))]
+                )
+                for owner in [link] + [other for other, _ in neighbours]:
+                    self.conn.execute(
+                        """
+                        DELETE FROM related_articles
+                        WHERE link = ? AND related_link NOT IN (
+                            SELECT related_link FROM related_articles WHERE link = ? ORDER BY distance LIMIT ?
+                        )
+                        """,
+                        (owner, owner, keep)
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Error storing related articles: {e}")
+
+    @timed_call("sqlite", "get_related")
+    def get_related(self, link, limit=3):
+        """Closest articles to `link`: [(link, title)], closest first ([] if not indexed)."""
+        try:
+            with self._lock:
+                cursor = self.conn.execute(
+                    """
+                    SELECT r.related_link, h.title
+                    FROM related_articles r
+                    LEFT JOIN history h ON h.link = r.related_link
+                    WHERE r.link = ?
+                    ORDER BY r.distance
+                    LIMIT ?
+                    """,
+                    (link, limit)
+                )
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Related lookup error: {e}")
+            return []
+
+    @timed_call("sqlite", "get_history_count")
     def get_history_count(self):
         """Returns the number of articles in history."""
-        cursor = self.conn.execute("SELECT COUNT(*) FROM history")
-        return cursor.fetchone()[0]
+        with self._lock:
+            cursor = self.conn.execute("SELECT COUNT(*) FROM history")
+            return cursor.fetchone()[0]
 
     # --- Keyword Management ---
 
-    def get_keywords(self):
-        """Returns list of active keywords."""
+    @timed_call("sqlite", "get_keywords")
+    def get_keywords(self, channel=None):
+        """Returns list of active keywords (of the main channel, or of `channel`)."""
         try:
-            cursor = self.conn.execute("SELECT keyword FROM keywords")
-            return [row[0] for row in cursor.fetchall()]
+            with self._lock:
+                if channel is None:
+                    cursor = self.conn.execute("SELECT keyword FROM keywords")
+                else:
+                    cursor = self.conn.execute("SELECT keyword FROM channel_keywords WHERE channel = ?", (channel,))
+                return [row[0] for row in cursor.fetchall()]
         except sqlite3.Error as e:
             logger.error(f"Error fetching keywords: {e}")
             return []
 
-    def add_keyword(self, keyword):
-        """Adds a keyword."""
+    @timed_call("sqlite", "add_keyword")
+    def add_keyword(self, keyword, channel=None):
+        """Adds a keyword (to the main channel, or to `channel`)."""
         try:
-            with self.conn:
-                self.conn.execute("INSERT INTO keywords (keyword) VALUES (?)", (keyword,))
+            with self._lock, self.conn:
+                if channel is None:
+                    self.conn.execute("INSERT INTO keywords (keyword) VALUES (?)", (keyword,))
+                else:
+                    self.conn.execute(
+                        "INSERT INTO channel_keywords (channel, keyword) VALUES (?, ?)", (channel, keyword)
+                    )
             return True
         except sqlite3.IntegrityError:
             return False # Already exists
@@ -222,15 +473,138 @@ class Storage:
             logger.error(f"Error adding keyword: {e}")
             return False
 
-    def remove_keyword(self, keyword):
-        """Removes a keyword."""
+    @timed_call("sqlite", "remove_keyword")
+    def remove_keyword(self, keyword, channel=None):
+        """Removes a keyword (from the main channel, or from `channel`)."""
         try:
-            with self.conn:
-                cursor = self.conn.execute("DELETE FROM keywords WHERE keyword = ?", (keyword,))
+            with self._lock, self.conn:
+                if channel is None:
+                    cursor = self.conn.execute("DELETE FROM keywords WHERE keyword = ?", (keyword,))
+                else:
+                    cursor = self.conn.execute(
+                        "DELETE FROM channel_keywords WHERE channel = ? AND keyword = ?", (channel, keyword)
+                    )
                 return cursor.rowcount > 0
         except sqlite3.Error as e:
             logger.error(f"Error removing keyword: {e}")
             return False
 
+    # --- Channel Management ---
+
+    @timed_call("sqlite", "get_channels")
+    def get_channels(self):
+        """Returns {name: chat_id} of the extra topic channels."""
+        try:
+            with self._lock:
+                cursor = self.conn.execute("SELECT name, chat_id FROM channels ORDER BY name")
+                return dict(cursor.fetchall())
+        except sqlite3.Error as e:
+            logger.error(f"Error fetching channels: {e}")
+            return {}
+
+    @timed_call("sqlite", "add_channel")
+    def add_channel(self, name, chat_id):
+        """Adds a topic channel, or points an existing one at a new chat."""
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT INTO channels (name, chat_id) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET chat_id = excluded.chat_id",
+                    (name, str(chat_id))
+                )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error adding channel: {e}")
+            return False
+
+    @timed_call("sqlite", "remove_channel")
+    def remove_channel(self, name):
+        """Removes a topic channel and its keywords."""
+        try:
+            with self._lock, self.conn:
+                cursor = self.conn.execute("DELETE FROM channels WHERE name = ?", (name,))
+                self.conn.execute("DELETE FROM channel_keywords WHERE channel = ?", (name,))
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.error(f"Error removing channel: {e}")
+            return False
+
+    @timed_call("sqlite", "get_subscriptions")
+    def get_subscriptions(self, main_channel="main"):
+        """Returns {channel name: [keywords]} for the main channel and every topic channel."""
+        subscriptions = {main_channel: self.get_keywords()}
+        try:
+            with self._lock:
+                cursor = self.conn.execute(
+                    "SELECT c.name, k.keyword FROM channels c JOIN channel_keywords k ON k.channel = c.name"
+                )
+                for name, keyword in cursor.fetchall():
+                    subscriptions.setdefault(name, []).append(keyword)
+        except sqlite3.Error as e:
+            logger.error(f"Error fetching subscriptions: {e}")
+        return subscriptions
+
+    # --- Snapshots (snapshot.py) ---
+
+    @contextmanager
+    def read_snapshot(self):
+        """
+        Reads inside the block all see the database as it was on entry (other
+        processes' writers aren't blocked; this process's threads wait).
+        """
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                yield
+            finally:
+                self.conn.rollback()
+
+    def table_columns(self, table):
+        if table not in SNAPSHOT_TABLES:
+            raise ValueError(f"Not a snapshot table: {table}")
+        with self._lock:
+            return [info[1] for info in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def iter_table(self, table, batch_size=1000):
+        """
+        Streams every row of a SNAPSHOT_TABLES table in rowid order, batch_size
+        at a time. Yields (columns, rows).
+        """
+        columns = self.table_columns(table)
+        select = ", ".join(columns)
+        after_rowid = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT rowid, {select} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (after_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield columns, [row[1:] for row in rows]
+            after_rowid = rows[-1][0]
+
+    def import_rows(self, table, columns, rows):
+        """
+        Inserts rows (tuples in `columns` order) into a SNAPSHOT_TABLES table.
+        Rows whose key already exists are kept as they are. Columns the table
+        doesn't have are dropped. Returns the number of rows inserted.
+        """
+        known = self.table_columns(table)
+        keep = [i for i, column in enumerate(columns) if column in known]
+        if len(keep) < len(columns):
+            dropped = [column for column in columns if column not in known]
+            logger.warning(f"Snapshot columns not in {table}, skipped: {dropped}")
+        names = [columns[i] for i in keep]
+        placeholders = ", ".join("?" for _ in names)
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO {table} ({', '.join(names)}) VALUES ({placeholders})",
+                [tuple(row[i] for i in keep) for row in rows]
+            )
+            return self.conn.total_changes - before
+
     def close(self):
-        self.conn.close()
+        with self._lock:
+            self.conn.close()
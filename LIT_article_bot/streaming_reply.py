@@ -0,0 +1,111 @@
+"""
+Progressive Telegram replies for streamed LLM output.
+
+The handler sends its usual placeholder ("🤔 Thinking..."), then hands the
+Message to a StreamingReply. The LLM client calls update() from its worker
+thread as text arrives, and the reply edits the placeholder with the text
+so far. Edits go through the send queue, so they share the chat's rate
+limit with ordinary replies. At most one edit is in flight, and edits come
+at most every `interval` seconds, so a fast model can't flood the chat.
+finish() then makes one last edit with the formatted result.
+"""
+import asyncio
+import logging
+import time
+
+from telegram.error import BadRequest
+
+from metrics import STAGE_SECONDS, count
+from send_queue import PRIORITY_USER
+
+logger = logging.getLogger(__name__)
+
+CURSOR = " ▌"
+MAX_MESSAGE_CHARS = 4096
+
+
+class StreamingReply:
+    def __init__(self, send_queue, message, interval=1.5, header=""):
+        self.send_queue = send_queue
+        self.message = message
+        self.interval = interval
+        self.header = header  # plain text shown above the streamed text, e.g. the article title
+        self.text = ""
+        self.shown = None
+        self.edits = 0
+        self.started = time.monotonic()
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    def update(self, text):
+        """Text generated so far. Safe to call from any thread."""
+        self._loop.call_soon_threadsafe(self._set, text)
+
+    def _set(self, text):
+        self.text = text
+        self._changed.set()
+
+    def _render(self, text):
+        body = f"{self.header}\n\n{text}" if self.header else text
+        # Telegram rejects longer messages; the final edit carries the full text
+        return body[:MAX_MESSAGE_CHARS - len(CURSOR)] + CURSOR
+
+    async def _edit(self, text, **kwargs):
+        return await self.send_queue.send(
+            self.message.chat_id,
+            lambda: self.message.edit_text(text, **kwargs),
+            priority=PRIORITY_USER
+        )
+
+    async def _run(self):
+        last_edit = 0.0
+        while True:
+            await self._changed.wait()
+            # The first text goes out at once; after that, coalesce changes for `interval`
+            wait = last_edit + self.interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._changed.clear()
+            text = self._render(self.text.strip())
+            if not self.text.strip() or text == self.shown:
+                continue
+            last_edit = time.monotonic()
+            try:
+                # Plain text: a half-streamed Markdown/HTML entity wouldn't parse
+                await self._edit(text, disable_web_page_preview=True)
+            except Exception as e:
+                logger.debug(f"Streaming edit failed: {e}")
+                continue
+            if self.edits == 0:
+                STAGE_SECONDS.observe(time.monotonic() - self.started, stage="reply_first_text", target="")
+            self.edits += 1
+            self.shown = text
+
+    async def close(self):
+        """Stops streaming edits (already-queued ones still go out)."""
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def finish(self, text, **kwargs):
+        """
+        Replaces the streamed text with the final, formatted one. Returns False
+        if the message couldn't be edited, so the caller can send a new one.
+        """
+        await self.close()
+        count("streamed_replies")
+        try:
+            await self._edit(text, **kwargs)
+            return True
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return True
+            logger.warning(f"Final streaming edit failed: {e}")
+            return False
+        except Exception as e:
+            logger.warning(f"Final streaming edit failed: {e}")
+            return False
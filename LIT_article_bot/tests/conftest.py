@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules live flat in LIT_article_bot/; config.py needs a token unless BOT_ROLE=worker
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_ROLE", "worker")
+os.environ.setdefault("LLM_BACKEND", "stub")
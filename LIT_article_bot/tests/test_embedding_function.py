@@ -0,0 +1,75 @@
+import inspect
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("dotenv")
+
+import embedding_service
+import rag_engine
+
+
+class FakeClient:
+    def __init__(self, host, port, authkey):
+        self.address = (host, port, authkey)
+
+    def ping(self):
+        return False
+
+
+def test_autostart_launches_service_with_its_signature(monkeypatch):
+    calls = []
+
+    def fake_launch(*args, **kwargs):
+        # Bind against the real signature so a wrong argument order shows up here
+        calls.append(inspect.signature(embedding_service.launch_service).bind(*args, **kwargs).arguments)
+
+    monkeypatch.setattr(rag_engine, "EMBED_WORKERS", 3)
+    monkeypatch.setattr(rag_engine, "EMBED_SERVICE_AUTOSTART", True)
+    monkeypatch.setattr(rag_engine, "EMBED_BACKEND", "onnx-int8")
+    monkeypatch.setattr(rag_engine, "EmbeddingClient", FakeClient)
+    monkeypatch.setattr(rag_engine, "launch_service", fake_launch)
+
+    embedding_fn = rag_engine.create_embedding_function()
+
+    assert isinstance(embedding_fn, rag_engine.ServiceEmbeddingFunction)
+    assert len(calls) == 1
+    launched = calls[0]
+    assert launched["model_name"] == rag_engine.EMBED_MODEL
+    assert launched["workers"] == 3
+    assert launched["batch_size"] == rag_engine.EMBED_BATCH_SIZE
+    assert launched["port"] == rag_engine.EMBED_SERVICE_PORT
+    assert isinstance(launched["authkey"], bytes)
+    assert launched["backend"] == "onnx-int8"
+
+
+def test_autostart_off_falls_back_to_in_process(monkeypatch):
+    monkeypatch.setattr(rag_engine, "EMBED_WORKERS", 2)
+    monkeypatch.setattr(rag_engine, "EMBED_SERVICE_AUTOSTART", False)
+    monkeypatch.setattr(rag_engine, "EmbeddingClient", FakeClient)
+    monkeypatch.setattr(rag_engine, "load_embedding_model", lambda *args: object())
+
+    assert isinstance(rag_engine.create_embedding_function(), rag_engine.LocalEmbeddingFunction)
+
+
+def test_in_process_encoding_uses_configured_backend(monkeypatch):
+    loaded = []
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            import numpy as np
+            return np.ones((len(texts), 4))
+
+    def fake_load(model_name, backend, onnx_file):
+        loaded.append((model_name, backend, onnx_file))
+        return FakeModel()
+
+    monkeypatch.setattr(rag_engine, "EMBED_WORKERS", 0)
+    monkeypatch.setattr(rag_engine, "EMBED_BACKEND", "torch-int8")
+    monkeypatch.setattr(rag_engine, "load_embedding_model", fake_load)
+
+    embedding_fn = rag_engine.create_embedding_function()
+
+    assert loaded == [(rag_engine.EMBED_MODEL, "torch-int8", rag_engine.EMBED_ONNX_FILE)]
+    # Chroma may hand the vectors back as numpy arrays
+    assert [list(map(float, v)) for v in embedding_fn(["a", "b"])] == [[1.0] * 4, [1.0] * 4]
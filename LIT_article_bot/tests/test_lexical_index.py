@@ -0,0 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from lexical_index import LexicalIndex
+
+
+def test_concurrent_upserts_and_searches(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+
+    def write(n):
+        ids = [f"https://example.com/{n}_{i}" for i in range(20)]
+        metadatas = [{'link': f"https://example.com/{n}", 'source': "PDPC", 'published_ts': 1700000000 + n,
+                      'title': f"PDPA decision {n}"}] * len(ids)
+        index.upsert(ids, [f"Section 13 PDPA breach number {n}"] * len(ids), metadatas)
+        return len(index.search("PDPA breach", n_results=5))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        found = list(pool.map(write, range(40)))
+
+    assert all(n > 0 for n in found)
+    assert index.count() == 40 * 20
+    assert index.list_sources() == ["PDPC"]
+    index.close()
@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("dotenv")
+
+import rag_engine
+from test_vector_shards import FakeClient, month_ts
+from vector_shards import VectorShards
+
+
+class RecordingLexical:
+    def __init__(self):
+        self.ids = []
+
+    def upsert(self, ids, documents, metadatas):
+        self.ids.extend(ids)
+
+
+def engine(retention_months):
+    engine = rag_engine.RagEngine.__new__(rag_engine.RagEngine)
+    engine.shards = VectorShards(FakeClient(), None, retention_months=retention_months)
+    engine.lexical = RecordingLexical()
+    return engine
+
+
+def test_chunks_past_retention_stay_out_of_the_lexical_index():
+    rag = engine(retention_months=12)
+    metadatas = [{'link': "a", 'published_ts': month_ts(0)}, {'link': "b", 'published_ts': month_ts(20)}]
+
+    stored = rag.restore_chunks(["a_0", "b_0"], ["doc a", "doc b"], metadatas, [[1.0, 0.0], [0.0, 1.0]])
+
+    assert stored == 1
+    assert rag.lexical.ids == ["a_0"]
@@ -0,0 +1,45 @@
+import sys
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("dotenv")
+
+import reindex
+
+ROW = (1, "https://www.example.com/a", "Title", "<b>✨ AI Summary:</b> Summary text.", "Data Privacy",
+       "2024-01-05 10:00:00")
+
+
+def test_build_article_keeps_indexed_metadata():
+    existing = {'source': "PDPC Singapore", 'published_str': "2023-12-30 08:00:00", 'published_ts': 1703923200}
+
+    text, metadata = reindex.build_article(ROW, existing=existing)
+
+    assert text == "Title\n\nSummary text."
+    assert metadata['source'] == "PDPC Singapore"
+    assert metadata['published_str'] == "2023-12-30 08:00:00"
+    assert metadata['published_ts'] == 1703923200
+    assert metadata['category'] == "Data Privacy"
+
+
+def test_build_article_falls_back_for_unindexed_rows():
+    _, metadata = reindex.build_article(ROW)
+
+    assert metadata['source'] == "example.com"
+    assert metadata['published_str'] == "2024-01-05 10:00:00"
+
+
+def test_empty_history_finishes_without_checkpoint(tmp_path, monkeypatch):
+    class NoRag:
+        def __init__(self, related_store=None):
+            pass
+
+    monkeypatch.setattr(reindex, "RagEngine", NoRag)
+    monkeypatch.setattr(sys, "argv", ["reindex.py", "--db", str(tmp_path / "empty.db"),
+                                      "--checkpoint", str(tmp_path / "checkpoint.json")])
+    monkeypatch.chdir(tmp_path)
+
+    reindex.main()
+
+    assert not (tmp_path / "checkpoint.json").exists()
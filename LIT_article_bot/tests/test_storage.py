@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from storage import Storage
+
+
+def test_related_edges_from_threads_while_history_is_written(tmp_path, monkeypatch):
+    # Storage migrates legacy JSON files from the working directory
+    monkeypatch.chdir(tmp_path)
+    storage = Storage(str(tmp_path / "bot.db"))
+    links = [f"https://example.com/{n}" for n in range(60)]
+
+    def index(n):
+        # What rag_engine.index_article does from asyncio.to_thread...
+        storage.add_related(links[n], [(links[n - 1], 0.1 * (n % 7)), (links[n - 2], 0.2)])
+        return storage.get_related(links[n])
+
+    def post(n):
+        # ...while the event loop stores and checks history
+        storage.add_article(links[n], f"Article {n}", "summary", "Data Privacy", "#PDPA", source="PDPC")
+        return storage.is_new(links[n])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        related, posted = [], []
+        for n in range(60):
+            posted.append(pool.submit(post, n))
+            if n >= 2:
+                related.append(pool.submit(index, n))
+
+    assert all(future.result() for future in related)
+    assert not any(future.result() for future in posted)
+    assert storage.get_history_count() == 60
+    assert all(len(storage.get_related(link, limit=10)) <= 5 for link in links)
+    storage.close()
@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+
+from vector_shards import VectorShards, UNDATED
+
+
+class FakeCollection:
+    """The parts of a Chroma collection VectorShards uses; squared L2 distance, no filters."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = {}
+        self.queries = 0
+
+    def count(self):
+        return len(self.rows)
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        for chunk_id, document, metadata, embedding in zip(ids, documents, metadatas, embeddings):
+            self.rows[chunk_id] = (document, metadata, list(embedding))
+
+    def get(self, ids=None, where=None, include=(), limit=None, offset=0):
+        keys = [k for k in sorted(self.rows) if ids is None or k in ids]
+        keys = keys[offset:offset + limit] if limit else keys
+        fields = {"documents": 0, "metadatas": 1, "embeddings": 2}
+        result = {"ids": keys}
+        for key in include:
+            result[key] = [self.rows[k][fields[key]] for k in keys]
+        return result
+
+    def query(self, query_embeddings, n_results, where=None, include=()):
+        self.queries += 1
+        ranked = sorted(
+            (sum((a - b) ** 2 for a, b in zip(query_embeddings[0], row[2])), chunk_id)
+            for chunk_id, row in self.rows.items()
+        )[:n_results]
+        result = {"ids": [[k for _, k in ranked]], "distances": [[d for d, _ in ranked]]}
+        if "documents" in include:
+            result["documents"] = [[self.rows[k][0] for _, k in ranked]]
+        if "metadatas" in include:
+            result["metadatas"] = [[self.rows[k][1] for _, k in ranked]]
+        return result
+
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    def list_collections(self):
+        return list(self.collections)
+
+    def get_or_create_collection(self, name, embedding_function=None, metadata=None):
+        return self.collections.setdefault(name, FakeCollection(name))
+
+    def get_collection(self, name, embedding_function=None):
+        return self.collections[name]
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+
+def month_ts(months_ago):
+    now = datetime.now(timezone.utc)
+    year, month = now.year, now.month - months_ago
+    while month <= 0:
+        year, month = year - 1, month + 12
+    return int(datetime(year, month, 15, tzinfo=timezone.utc).timestamp())
+
+
+def add(shards, chunk_id, months_ago, vector):
+    published_ts = month_ts(months_ago) if months_ago is not None else 0
+    return shards.upsert([chunk_id], [chunk_id], [{'link': chunk_id, 'published_ts': published_ts}], [vector])
+
+
+def test_upsert_routes_by_month_and_skips_chunks_past_retention():
+    client = FakeClient()
+    shards = VectorShards(client, None, hot_months=6, retention_months=24)
+
+    assert add(shards, "recent", 0, [1.0, 0.0]) == ["recent"]
+    assert add(shards, "cold", 10, [1.0, 0.0]) == ["cold"]
+    assert add(shards, "undated", None, [1.0, 0.0]) == ["undated"]
+    assert add(shards, "expired", 30, [1.0, 0.0]) == []
+
+    names = shards.names()
+    assert names[0].count("_") == 2  # articles_YYYY_MM first
+    assert names[-1] == UNDATED
+    assert sum(c.count() for c in client.collections.values()) == 3
+
+
+def test_upsert_does_not_run_retention():
+    client = FakeClient()
+    shards = VectorShards(client, None, hot_months=1)
+    old_month = datetime.fromtimestamp(month_ts(3), timezone.utc)
+    month_shard = f"articles_{old_month.year}_{old_month.month:02d}"
+    client.get_or_create_collection(month_shard).upsert(["old"], ["old"], [{'published_ts': month_ts(3)}], [[0.0, 1.0]])
+
+    add(shards, "new", 0, [1.0, 0.0])
+
+    # The cold month is only compacted by apply_retention (startup / maintenance job)
+    assert month_shard in client.collections
+    shards.apply_retention()
+    assert month_shard not in client.collections
+    assert f"articles_{old_month.year}" in client.collections
+
+
+def test_query_searches_recent_shards_first_and_widens_when_needed():
+    client = FakeClient()
+    shards = VectorShards(client, None, recent_shards=2, widen_distance=0.5)
+    for months_ago in range(6):
+        add(shards, f"m{months_ago}", months_ago, [1.0, 0.1 * months_ago] if months_ago < 2 else [0.0, 1.0])
+
+    result = shards.query([[1.0, 0.0]], n_results=2)
+    assert result['ids'][0] == ["m0", "m1"]
+    assert shards.stats["shards_searched"] == 2
+
+    result = shards.query([[1.0, 0.0]], n_results=4)
+    assert result['ids'][0][:2] == ["m0", "m1"]
+    assert len(result['ids'][0]) == 4
+    assert result['distances'][0] == sorted(result['distances'][0])
+    assert shards.stats["shards_searched"] == 2 + 6
+
+
+def test_query_skips_shards_outside_since():
+    client = FakeClient()
+    shards = VectorShards(client, None, recent_shards=1)
+    for months_ago in range(4):
+        add(shards, f"m{months_ago}", months_ago, [1.0, 0.0])
+
+    result = shards.query([[1.0, 0.0]], n_results=10, since=month_ts(1) - 14 * 86400)  # the 1st of last month
+
+    assert sorted(result['ids'][0]) == ["m0", "m1"]
+    assert sum(c.queries for c in client.collections.values()) == 2
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+
+telegram_ext = pytest.importorskip("telegram.ext")
+
+from benchmarks.fake_bot_api import FakeBotApi, make_message_update  # noqa: E402
+from http_helpers import read_request, RequestError  # noqa: E402
+from webhook_server import WebhookServer  # noqa: E402
+
+SECRET = "test-secret"
+
+
+def bound_port(server):
+    return server.server.sockets[0].getsockname()[1]
+
+
+async def raw_request(port, data):
+    """Sends raw bytes to the webhook server and returns the response status."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    status_line = await reader.readline()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def run_against_fake_api(scenario):
+    api = FakeBotApi(port=0)
+    await api.start()
+    api_port = api.server.sockets[0].getsockname()[1]
+
+    async def ping(update, context):
+        await update.effective_message.reply_text("pong")
+
+    application = (
+        telegram_ext.ApplicationBuilder()
+        .token("123:TEST")
+        .base_url(f"http://127.0.0.1:{api_port}/bot")
+        .updater(None)
+        .build()
+    )
+    application.add_handler(telegram_ext.CommandHandler("ping", ping))
+    server = WebhookServer(application, listen="127.0.0.1", port=0, path="/telegram", secret_token=SECRET)
+    await application.initialize()
+    await application.start()
+    await server.start()
+    try:
+        await application.bot.set_webhook(f"http://127.0.0.1:{bound_port(server)}/telegram", secret_token=SECRET)
+        return await scenario(api, server)
+    finally:
+        await server.stop()
+        await application.stop()
+        await application.shutdown()
+        await api.stop()
+
+
+def test_webhook_update_is_answered_through_fake_bot_api():
+    async def scenario(api, server):
+        since = len(api.calls)
+        status = await api.deliver_update(make_message_update(1, 4242, "/ping"))
+        _, _, params = await api.wait_for(
+            lambda method, params: method == "sendMessage", timeout=10, since=since
+        )
+        return status, params, server.stats
+
+    status, params, stats = asyncio.run(run_against_fake_api(scenario))
+    assert status == 200
+    assert str(params["chat_id"]) == "4242"
+    assert params["text"] == "pong"
+    assert stats["received"] == 1 and stats["processed"] == 1
+
+
+def test_webhook_rejects_bad_secret_and_oversized_headers():
+    async def scenario(api, server):
+        port = bound_port(server)
+        body = json.dumps(make_message_update(2, 4242, "/ping")).encode()
+        wrong_secret = (
+            f"POST /telegram HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+            f"X-Telegram-Bot-Api-Secret-Token: wrong\r\nConnection: close\r\n\r\n"
+        ).encode() + body
+        many_headers = b"POST /telegram HTTP/1.1\r\n" + b"X-Filler: x\r\n" * 200 + b"\r\n"
+        return await raw_request(port, wrong_secret), await raw_request(port, many_headers)
+
+    forbidden, too_many = asyncio.run(run_against_fake_api(scenario))
+    assert forbidden == 403
+    assert too_many == 431
+
+
+def test_read_request_times_out_on_a_stalled_request():
+    async def scenario():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"POST /telegram HTTP/1.1\r\nContent-Length: 10\r\n\r\n")
+        with pytest.raises(RequestError) as error:
+            await read_request(reader, timeout=0.1)
+        idle = asyncio.StreamReader()
+        return error.value.status, await read_request(idle, timeout=0.1)
+
+    status, idle_result = asyncio.run(scenario())
+    assert status == 408
+    assert idle_result is None
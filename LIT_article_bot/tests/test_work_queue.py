@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+
+import work_queue
+from work_queue import WorkQueue, SCHEDULER_LEASE, JOB_PROCESS_ARTICLE, JOB_POST_ARTICLE, JOB_INDEX_ARTICLE
+
+
+class Clock:
+    """Stands in for the time module in work_queue, so claims and leases can expire on demand."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def queues(tmp_path):
+    # Two processes' worth of queues: separate connections to one database file
+    db_file = str(tmp_path / "work_queue.db")
+    frontend, worker = WorkQueue(db_file), WorkQueue(db_file)
+    yield frontend, worker
+    frontend.close()
+    worker.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(work_queue, "time", clock)
+    return clock
+
+
+def test_each_job_is_claimed_by_one_worker(queues):
+    first, second = queues
+    job_ids = {first.enqueue(JOB_PROCESS_ARTICLE, {"n": n})[0] for n in range(100)}
+    claimed = {}
+
+    def drain(queue, worker_id):
+        while True:
+            job = queue.claim([JOB_PROCESS_ARTICLE], worker_id, visibility=600)
+            if job is None:
+                return
+            claimed.setdefault(job[0], []).append(worker_id)
+
+    threads = [
+        threading.Thread(target=drain, args=(queue, f"worker-{i}"))
+        for i, queue in enumerate([first, second, first, second])
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(claimed) == job_ids
+    assert all(len(workers) == 1 for workers in claimed.values())
+
+
+def test_expired_claim_is_handed_out_again(queues, clock):
+    frontend, worker = queues
+    job_id, _ = frontend.enqueue(JOB_PROCESS_ARTICLE, {"link": "https://example.com/a"}, max_attempts=2)
+
+    assert worker.claim([JOB_PROCESS_ARTICLE], "worker-1", visibility=60)[0] == job_id
+    assert frontend.claim([JOB_PROCESS_ARTICLE], "worker-2", visibility=60) is None
+
+    # worker-1 died; its claim runs out
+    clock.advance(61)
+    job = frontend.claim([JOB_PROCESS_ARTICLE], "worker-2", visibility=60)
+    assert job == (job_id, JOB_PROCESS_ARTICLE, {"link": "https://example.com/a"}, 2)
+
+    # Out of attempts: the next expired claim fails the job instead
+    clock.advance(61)
+    assert worker.claim([JOB_PROCESS_ARTICLE], "worker-1") is None
+    job = worker.get_job(job_id)
+    assert job["status"] == "failed" and job["error"] == "claim expired"
+
+
+def test_dedupe_key_collapses_active_jobs(queues):
+    frontend, worker = queues
+    job_id, created = frontend.enqueue(JOB_PROCESS_ARTICLE, {"n": 1}, dedupe_key="https://example.com/a")
+    assert created
+    assert worker.enqueue(JOB_PROCESS_ARTICLE, {"n": 2}, dedupe_key="https://example.com/a") == (job_id, False)
+    assert worker.stats() == {"pending": 1}
+
+    # Once finished, the key is free again
+    claimed = worker.claim([JOB_PROCESS_ARTICLE], "worker-1")
+    worker.complete(claimed[0])
+    new_id, created = frontend.enqueue(JOB_PROCESS_ARTICLE, {"n": 3}, dedupe_key="https://example.com/a")
+    assert created and new_id != job_id
+
+
+def test_follow_up_is_handed_to_the_other_process(queues):
+    frontend, worker = queues
+    frontend.enqueue(JOB_PROCESS_ARTICLE, {"link": "https://example.com/a"})
+
+    job_id, _, payload, _ = worker.claim([JOB_PROCESS_ARTICLE], "worker-1")
+    worker.complete(job_id, follow_up=(JOB_POST_ARTICLE, {"article": payload, "processed": {}}, payload["link"]))
+
+    assert worker.get_job(job_id)["status"] == "done"
+    post_id, kind, post_payload, _ = frontend.claim([JOB_POST_ARTICLE, JOB_INDEX_ARTICLE], "frontend")
+    assert kind == JOB_POST_ARTICLE
+    assert post_payload == {"article": {"link": "https://example.com/a"}, "processed": {}}
+
+    # A list of follow-ups, with the same dedupe rules as enqueue
+    frontend.complete(post_id, follow_up=[
+        (JOB_INDEX_ARTICLE, {"n": 1}, "https://example.com/a"),
+        (JOB_INDEX_ARTICLE, {"n": 2}, "https://example.com/a"),
+    ])
+    assert worker.claim([JOB_INDEX_ARTICLE], "worker-1")[2] == {"n": 1}
+    assert worker.claim([JOB_INDEX_ARTICLE], "worker-1") is None
+
+
+def test_leader_lease_is_taken_over_after_ttl(queues, clock):
+    first, second = queues
+    assert first.acquire_lease(SCHEDULER_LEASE, "worker-1", ttl=30)
+    assert not second.acquire_lease(SCHEDULER_LEASE, "worker-2", ttl=30)
+
+    # Renewals keep it
+    clock.advance(20)
+    assert first.acquire_lease(SCHEDULER_LEASE, "worker-1", ttl=30)
+    clock.advance(20)
+    assert not second.acquire_lease(SCHEDULER_LEASE, "worker-2", ttl=30)
+
+    # worker-1 stops renewing
+    clock.advance(31)
+    assert first.lease_holder(SCHEDULER_LEASE) is None
+    assert second.acquire_lease(SCHEDULER_LEASE, "worker-2", ttl=30)
+    assert not first.acquire_lease(SCHEDULER_LEASE, "worker-1", ttl=30)
+    assert first.lease_holder(SCHEDULER_LEASE) == "worker-2"
@@ -0,0 +1,156 @@
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value):
+    # Article dicts carry 'published' datetimes; tag them so they round-trip
+    def default(obj):
+        if isinstance(obj, datetime):
+            return {"__datetime__": obj.isoformat()}
+        raise TypeError(f"Unserializable cache value: {type(obj).__name__}")
+    return json.dumps(value, default=default)
+
+
+def _decode(text):
+    def hook(obj):
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        return obj
+    return json.loads(text, object_hook=hook)
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after ttl_seconds.
+    With db_file set, entries are mirrored to a SQLite table so they
+    survive restarts (values must be JSON-serializable, datetimes allowed).
+    """
+
+    def __init__(self, max_size=500, ttl_seconds=48 * 3600, db_file=None, table="share_cache"):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.table = table
+        self.entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+        self.conn = None
+        if db_file:
+            self.conn = sqlite3.connect(db_file, check_same_thread=False)
+            self._init_db()
+            self._load()
+
+    def _init_db(self):
+        try:
+            with self.conn:
+                self.conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {self.table} (
+                        key TEXT PRIMARY KEY,
+                        value TEXT,
+                        expires_at REAL
+                    )
+                """)
+        except sqlite3.Error as e:
+            logger.error(f"Cache table initialization error: {e}")
+            self.conn = None
+
+    def _load(self):
+        """Restores unexpired entries, keeping only the newest max_size."""
+        try:
+            now = time.time()
+            with self.conn:
+                self.conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            cursor = self.conn.execute(
+                f"SELECT key, value, expires_at FROM {self.table} ORDER BY expires_at DESC LIMIT ?",
+                (self.max_size,)
+            )
+            # Insert oldest first so LRU order matches expiry order
+            for key, value, expires_at in reversed(cursor.fetchall()):
+                self.entries[key] = (expires_at, _decode(value))
+            with self.conn:
+                self.conn.execute(
+                    f"""
+                    DELETE FROM {self.table} WHERE key NOT IN (
+                        SELECT key FROM {self.table} ORDER BY expires_at DESC LIMIT ?
+                    )
+                    """,
+                    (self.max_size,)
+                )
+            if self.entries:
+                logger.info(f"Restored {len(self.entries)} cached entries from {self.table}.")
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Failed to restore cache {self.table}: {e}")
+
+    def _delete_persisted(self, keys):
+        if self.conn and keys:
+            try:
+                with self.conn:
+                    self.conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(k,) for k in keys])
+            except sqlite3.Error as e:
+                logger.error(f"Cache delete failed: {e}")
+
+    def _purge_expired(self, now):
+        expired = [key for key, (expires_at, _) in self.entries.items() if expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+        self.stats["expirations"] += len(expired)
+        self._delete_persisted(expired)
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+
+        if self.conn:
+            try:
+                with self.conn:
+                    self.conn.execute(
+                        f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, _encode(value), expires_at)
+                    )
+            except (sqlite3.Error, TypeError) as e:
+                logger.error(f"Cache persist failed for {key}: {e}")
+
+        self._purge_expired(now)
+        evicted = []
+        while len(self.entries) > self.max_size:
+            oldest, _ = self.entries.popitem(last=False)
+            evicted.append(oldest)
+        self.stats["evictions"] += len(evicted)
+        self._delete_persisted(evicted)
+
+    def get(self, key, default=None):
+        item = self.entries.get(key)
+        if item is None:
+            self.stats["misses"] += 1
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.time():
+            del self.entries[key]
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            self._delete_persisted([key])
+            return default
+
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def pop(self, key, default=None):
+        item = self.entries.pop(key, None)
+        self._delete_persisted([key])
+        return item[1] if item else default
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
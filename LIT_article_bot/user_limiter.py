@@ -0,0 +1,71 @@
+"""
+Per-user limits for LLM-backed commands (/ask, /summarise, private links).
+
+Each user gets a token bucket (USER_REQUESTS_PER_MINUTE, bursts of
+USER_REQUEST_BURST) and a cap on requests running at once
+(USER_MAX_CONCURRENT), so one user can't fill the LLM queue.
+"""
+import logging
+import math
+import time
+
+from metrics import count
+from send_queue import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class UserLimiter:
+    def __init__(self, per_minute=6, burst=3, max_concurrent=2, exempt=()):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.exempt = set(exempt)
+        self.buckets = {}
+        self.running = {}
+        self.stats = {"rejected": 0}
+
+    def acquire(self, user_id):
+        """
+        Starts a request for user_id. Returns None if allowed (call release()
+        when it's done), or a message explaining why not.
+        """
+        if user_id in self.exempt:
+            self.running[user_id] = self.running.get(user_id, 0) + 1
+            return None
+
+        if self.running.get(user_id, 0) >= self.max_concurrent:
+            self._reject("concurrency")
+            return "⏳ Please wait for your current request to finish before sending another."
+
+        now = time.monotonic()
+        bucket = self.buckets.get(user_id)
+        if bucket is None:
+            bucket = self.buckets[user_id] = TokenBucket(self.rate, capacity=self.burst)
+        wait = bucket.delay(now)
+        if wait > 0:
+            self._reject("rate")
+            return f"⏳ Too many requests. Please try again in {math.ceil(wait)}s."
+
+        bucket.consume()
+        self.running[user_id] = self.running.get(user_id, 0) + 1
+        self._prune(now)
+        return None
+
+    def release(self, user_id):
+        running = self.running.get(user_id, 0) - 1
+        if running > 0:
+            self.running[user_id] = running
+        else:
+            self.running.pop(user_id, None)
+
+    def _reject(self, reason):
+        self.stats["rejected"] += 1
+        count(f"user_limit_{reason}")
+
+    def _prune(self, now):
+        # Full buckets carry no state; drop them so the dict doesn't grow with every user ever seen
+        if len(self.buckets) > 1000:
+            for user_id, bucket in list(self.buckets.items()):
+                if bucket.delay(now) == 0 and bucket.tokens >= bucket.capacity and user_id not in self.running:
+                    del self.buckets[user_id]
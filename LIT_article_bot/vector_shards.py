@@ -0,0 +1,328 @@
+"""
+Time-partitioned vector store: one Chroma collection per month of publication.
+
+Chunks go to articles_YYYY_MM by their 'published_ts' metadata, or to
+articles_undated if the date is unknown. Most questions are about recent
+news, so query() searches the newest RAG_RECENT_SHARDS shards first and
+widens to older shards one at a time only while it has fewer than
+n_results hits, or while its n-th best hit is further away than
+RAG_WIDEN_DISTANCE. Hits from several shards are merged by distance.
+Date filters (since/until) skip shards outside the range entirely.
+
+Retention (apply_retention) runs at startup and from a periodic maintenance
+job (every VECTOR_MAINTENANCE_HOURS), never on the indexing path:
+    - months older than VECTOR_HOT_MONTHS are compacted into one shard per
+      year (articles_YYYY). That leaves fewer indexes to load, and they are
+      searched last.
+    - with VECTOR_RETENTION_MONTHS > 0, shards entirely older than that are
+      dropped. The articles stay in the SQLite history, so reindex.py can
+      bring them back.
+A shard's index is only loaded when it is queried. With CHROMA_CACHE_MB set,
+Chroma unloads the least recently used shards to stay within that budget.
+"""
+import logging
+import re
+import time
+from datetime import datetime, timezone
+
+from metrics import count
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "articles_"
+UNDATED = "articles_undated"
+SHARD_NAME = re.compile(r"^articles_(\d{4})(?:_(\d{2}))?$")
+
+# Other processes (workers) create shards too, so the list is re-read this often
+REFRESH_SECONDS = 60
+
+
+def month_start(year, month):
+    """First instant of a month in UTC; month may be out of 1..12 (e.g. 0 = December of year - 1)."""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def months_back(now, months):
+    """Start of the month `months` months before now's (0 = the current month)."""
+    return month_start(now.year, now.month - months)
+
+
+def shard_range(name):
+    """
+    (start, end) unix timestamps of the publication times a shard holds,
+    or None if `name` isn't a shard. Undated chunks have published_ts 0.
+    """
+    if name == UNDATED:
+        return 0, 1
+    match = SHARD_NAME.match(name)
+    if not match:
+        return None
+    year = int(match.group(1))
+    if match.group(2):
+        month = int(match.group(2))
+        return int(month_start(year, month).timestamp()), int(month_start(year, month + 1).timestamp())
+    return int(month_start(year, 1).timestamp()), int(month_start(year + 1, 1).timestamp())
+
+
+def collection_names(client):
+    # Chroma 0.6 returns names, older versions Collection objects
+    return [c if isinstance(c, str) else c.name for c in client.list_collections()]
+
+
+class VectorShards:
+    def __init__(self, client, embedding_fn, hot_months=12, retention_months=0, recent_shards=3,
+                 widen_distance=1.0, metadata=None, on_drop=None):
+        """
+        metadata is set on newly created shards. on_drop(cutoff_ts) is called
+        after retention drops shards, so indexes kept elsewhere (the lexical
+        index) can forget chunks published before cutoff_ts.
+        """
+        self.client = client
+        self.embedding_fn = embedding_fn
+        self.hot_months = max(1, hot_months)
+        self.retention_months = retention_months
+        self.recent_shards = max(1, recent_shards)
+        self.widen_distance = widen_distance
+        self.metadata = metadata
+        self.on_drop = on_drop
+        self._collections = {}
+        self._names = []
+        self._listed_at = 0.0
+        self.stats = {"queries": 0, "shards_searched": 0}
+
+    # --- Shards ---
+
+    def names(self, refresh=False):
+        """Existing shard names, newest first (undated last)."""
+        if refresh or time.monotonic() - self._listed_at > REFRESH_SECONDS:
+            shards = [name for name in collection_names(self.client) if shard_range(name)]
+            self._names = sorted(shards, key=lambda name: shard_range(name), reverse=True)
+            self._listed_at = time.monotonic()
+        return self._names
+
+    def _collection(self, name, create=False):
+        collection = self._collections.get(name)
+        if collection is None:
+            if create:
+                collection = self.client.get_or_create_collection(
+                    name=name, embedding_function=self.embedding_fn, metadata=self.metadata
+                )
+            else:
+                collection = self.client.get_collection(name=name, embedding_function=self.embedding_fn)
+            self._collections[name] = collection
+        return collection
+
+    def _forget(self, name):
+        """Drops a cached shard that was deleted (possibly by another process)."""
+        self._collections.pop(name, None)
+        self._listed_at = 0.0
+
+    def retention_cutoff(self, now=None):
+        """Unix timestamp before which chunks are dropped, or None if everything is kept."""
+        if not self.retention_months:
+            return None
+        return int(months_back(now or datetime.now(timezone.utc), self.retention_months - 1).timestamp())
+
+    def shard_for(self, published_ts, now=None):
+        """Shard name for a chunk published at published_ts, or None if it's past the retention period."""
+        if not published_ts or published_ts <= 0:
+            return UNDATED
+        now = now or datetime.now(timezone.utc)
+        cutoff = self.retention_cutoff(now)
+        if cutoff is not None and published_ts < cutoff:
+            return None
+        published = datetime.fromtimestamp(published_ts, timezone.utc)
+        if published < months_back(now, self.hot_months - 1):
+            return f"{PREFIX}{published.year}"
+        return f"{PREFIX}{published.year}_{published.month:02d}"
+
+    # --- Reads and writes ---
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        """
+        Stores chunks in their publication month's shard. Returns the ids
+        stored (chunks past the retention period are skipped).
+        """
+        now = datetime.now(timezone.utc)
+        groups = {}
+        for i, metadata in enumerate(metadatas):
+            name = self.shard_for(metadata.get('published_ts'), now)
+            if name:
+                groups.setdefault(name, []).append(i)
+
+        created = False
+        for name, rows in groups.items():
+            created = created or name not in self.names()
+            self._collection(name, create=True).upsert(
+                ids=[ids[i] for i in rows],
+                documents=[documents[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows]
+            )
+        if created:
+            # So queries see the new shard now rather than at the next refresh
+            self.names(refresh=True)
+        return [ids[i] for rows in groups.values() for i in rows]
+
+    def get(self, ids=None, include=("metadatas",), where=None):
+        """
+        Chunks by id, from whichever shards hold them, or (with `where`)
+        every chunk matching the filter. Collection.get shape.
+        """
+        result = {key: [] for key in ["ids"] + list(include)}
+        wanted = set(ids or ())
+        for name in self.names():
+            if ids is not None and not wanted:
+                break
+            try:
+                if ids is None:
+                    batch = self._collection(name).get(where=where, include=include)
+                else:
+                    batch = self._collection(name).get(ids=list(wanted), include=include)
+            except Exception as e:
+                logger.warning(f"Get from vector shard {name} failed: {e}")
+                self._forget(name)
+                continue
+            for key in result:
+                result[key].extend(batch[key])
+            wanted.difference_update(batch['ids'])
+        return result
+
+    def iter_batches(self, include, batch_size=500):
+        """Streams every chunk, shard by shard, batch_size at a time (Collection.get results)."""
+        for name in self.names(refresh=True):
+            collection = self._collection(name)
+            offset = 0
+            while True:
+                batch = collection.get(include=include, limit=batch_size, offset=offset)
+                if not batch['ids']:
+                    break
+                yield batch
+                offset += len(batch['ids'])
+
+    def count(self):
+        return sum(self._collection(name).count() for name in self.names(refresh=True))
+
+    def query(self, query_embeddings, n_results, where=None, since=None, until=None,
+              include=("documents", "metadatas", "distances")):
+        """
+        Collection.query for one query embedding across the shards: newest
+        first, widening to older shards only when needed (see the module
+        docstring). since/until (unix timestamps) skip shards outside them.
+        """
+        include = list(dict.fromkeys(list(include) + ["distances"]))
+        candidates = []
+        for name in self.names():
+            start, end = shard_range(name)
+            if (since is None or end > since) and (until is None or start < until):
+                candidates.append(name)
+
+        hits = {}  # id -> (distance, {field: value})
+        searched = 0
+        step = self.recent_shards
+        while searched < len(candidates):
+            for name in candidates[searched:searched + step]:
+                try:
+                    result = self._collection(name).query(
+                        query_embeddings=query_embeddings, n_results=n_results, where=where, include=include
+                    )
+                except Exception as e:
+                    logger.warning(f"Query of vector shard {name} failed: {e}")
+                    self._forget(name)
+                    continue
+                for j, chunk_id in enumerate(result['ids'][0]):
+                    distance = result['distances'][0][j]
+                    # A chunk whose date changed can exist in two shards; keep its closer copy
+                    if chunk_id not in hits or distance < hits[chunk_id][0]:
+                        hits[chunk_id] = (distance, {key: result[key][0][j] for key in include})
+            searched += step
+            step = 1
+            if self._enough(hits, n_results):
+                break
+
+        self.stats["queries"] += 1
+        self.stats["shards_searched"] += min(searched, len(candidates))
+        if searched < len(candidates):
+            count("vector_query_older_shards_skipped")
+
+        ranked = sorted(hits.items(), key=lambda item: item[1][0])[:n_results]
+        result = {'ids': [[chunk_id for chunk_id, _ in ranked]]}
+        for key in include:
+            result[key] = [[fields[key] for _, (_, fields) in ranked]]
+        return result
+
+    def _enough(self, hits, n_results):
+        if len(hits) < n_results:
+            return False
+        if self.widen_distance <= 0:
+            return True
+        nth_best = sorted(distance for distance, _ in hits.values())[n_results - 1]
+        return nth_best <= self.widen_distance
+
+    # --- Retention ---
+
+    def apply_retention(self, now=None):
+        """Compacts months older than hot_months into yearly shards and drops shards past retention_months."""
+        now = now or datetime.now(timezone.utc)
+        hot_start = int(months_back(now, self.hot_months - 1).timestamp())
+        cutoff = self.retention_cutoff(now)
+
+        dropped = False
+        for name in list(self.names(refresh=True)):
+            if name == UNDATED:
+                continue
+            start, end = shard_range(name)
+            year, month = SHARD_NAME.match(name).groups()
+            if cutoff is not None and end <= cutoff:
+                dropped = self._drop(name) or dropped
+            elif month and end <= hot_start:
+                self._compact(name, f"{PREFIX}{year}")
+        self.names(refresh=True)
+
+        if dropped and self.on_drop:
+            self.on_drop(cutoff)
+
+    def _drop(self, name):
+        try:
+            self.client.delete_collection(name=name)
+            logger.info(f"Dropped vector shard {name} (older than {self.retention_months} months)")
+            return True
+        except Exception as e:
+            logger.error(f"Dropping vector shard {name} failed: {e}")
+            return False
+        finally:
+            self._forget(name)
+
+    def _compact(self, name, target, batch_size=500):
+        """Moves a month's chunks, embeddings included, into its year's shard, then deletes the month."""
+        try:
+            source = self._collection(name)
+            destination = self._collection(target, create=True)
+            moved = 0
+            while True:
+                batch = source.get(include=["documents", "metadatas", "embeddings"], limit=batch_size, offset=moved)
+                if not batch['ids']:
+                    break
+                destination.upsert(
+                    ids=batch['ids'],
+                    documents=batch['documents'],
+                    metadatas=batch['metadatas'],
+                    embeddings=batch['embeddings']
+                )
+                moved += len(batch['ids'])
+            self.client.delete_collection(name=name)
+            logger.info(f"Compacted vector shard {name} into {target} ({moved} chunks)")
+        except Exception as e:
+            # Upserts are idempotent, so the next run finishes the move
+            logger.error(f"Compacting vector shard {name} failed: {e}")
+        finally:
+            self._forget(name)
+
+    def summary(self):
+        """One line for /status (from the cached shard list; doesn't load any shard)."""
+        names = self._names
+        per_query = self.stats["shards_searched"] / self.stats["queries"] if self.stats["queries"] else 0
+        newest = names[0][len(PREFIX):].replace("_", "-") if names else "none"
+        return f"{len(names)} shards (newest {newest}), {per_query:.1f} searched per query"
@@ -0,0 +1,116 @@
+"""
+Embedded asyncio HTTP server for webhook delivery.
+
+Telegram POSTs each update to WEBHOOK_PATH with the secret token in the
+X-Telegram-Bot-Api-Secret-Token header. Updates are acknowledged right away
+and processed as background tasks, at most `max_concurrency` at a time.
+GET /healthz reports liveness and load, for the reverse proxy / orchestrator.
+"""
+import asyncio
+import hmac
+import json
+import logging
+
+from telegram import Update
+
+from http_helpers import read_request, write_response
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    def __init__(self, application, listen="0.0.0.0", port=8443, path="/telegram",
+                 secret_token=None, max_concurrency=16, max_pending=None):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Beyond this many queued updates answer 503 so Telegram redelivers later
+        self.max_pending = max_pending or max_concurrency * 4
+        self.pending = set()
+        self.stats = {"received": 0, "processed": 0, "rejected": 0, "errors": 0}
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle_client, self.listen, self.port)
+        logger.info(f"Webhook server listening on {self.listen}:{self.port}{self.path}")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        # Let in-flight updates finish
+        if self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError as e:
+                    # StreamReader raises a plain ValueError for a line longer than its buffer limit
+                    status = getattr(e, "status", 400)
+                    await write_response(writer, status, json.dumps({"error": str(e)}), keep_alive=False)
+                    return
+                if request is None:
+                    return
+
+                status, body = await self._route(request)
+                await write_response(writer, status, body, keep_alive=request.keep_alive)
+                if not request.keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, request):
+        path = request.path.split("?", 1)[0]
+
+        if path == "/healthz":
+            return 200, json.dumps({
+                "status": "ok",
+                "pending": len(self.pending),
+                **self.stats
+            })
+
+        if path != self.path:
+            return 404, json.dumps({"error": "not found"})
+        if request.method != "POST":
+            return 405, json.dumps({"error": "method not allowed"})
+
+        if self.secret_token:
+            supplied = request.headers.get("x-telegram-bot-api-secret-token", "")
+            if not hmac.compare_digest(supplied, self.secret_token):
+                self.stats["rejected"] += 1
+                logger.warning("Rejected webhook call with invalid secret token")
+                return 403, json.dumps({"error": "forbidden"})
+
+        try:
+            update = Update.de_json(json.loads(request.body), self.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            return 400, json.dumps({"error": f"invalid update: {e}"})
+
+        if len(self.pending) >= self.max_pending:
+            self.stats["rejected"] += 1
+            return 503, json.dumps({"error": "busy"})
+
+        self.stats["received"] += 1
+        task = asyncio.create_task(self._process(update))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        return 200, "{}"
+
+    async def _process(self, update):
+        async with self.semaphore:
+            try:
+                await self.application.process_update(update)
+                self.stats["processed"] += 1
+            except Exception as e:
+                # Handler errors normally go to the application's error handler;
+                # this only catches failures in dispatch itself
+                self.stats["errors"] += 1
+                logger.error(f"Failed to process update {update.update_id}: {e}")
@@ -0,0 +1,268 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Job kinds exchanged between the front-end and workers (BOT_ROLE=frontend/worker)
+JOB_FETCH_CYCLE = "fetch_cycle"        # leader worker: fetch feeds, queue relevant articles
+JOB_PROCESS_ARTICLE = "process_article"  # any worker: summarize an article
+JOB_POST_ARTICLE = "post_article"      # front-end: post to the channel, record in history
+JOB_INDEX_ARTICLE = "index_article"    # any worker: embed + index for /ask
+JOB_PROCESS_DIGEST = "process_digest"  # any worker: summarize a cycle's articles in batched prompts (DIGEST_MODE)
+JOB_POST_DIGEST = "post_digest"        # front-end: post the digest message(s), record in history
+
+# Lease held by the worker that runs the scheduled fetch cycle
+SCHEDULER_LEASE = "scheduler"
+
+ACTIVE = ("pending", "running")
+
+
+class WorkQueue:
+    """
+    Durable job queue and lease table in SQLite, shared by every process on
+    the machine (or on a shared volume).
+
+    Jobs are claimed with a visibility timeout: a job whose worker dies is
+    handed out again once its claim expires, up to max_attempts. Jobs with a
+    dedupe_key are not enqueued again while another job with the same key is
+    pending or running. Leases give one holder at a time a named role (the
+    scheduler) for ttl seconds, renewed by re-acquiring.
+    """
+
+    def __init__(self, db_file="work_queue.db"):
+        self.db_file = db_file
+        # Autocommit; claims use explicit BEGIN IMMEDIATE so only one process wins a job
+        self.conn = sqlite3.connect(db_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()  # one transaction at a time on the shared connection
+        self._init_db()
+
+    def _init_db(self):
+        try:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT,
+                    dedupe_key TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    available_at REAL NOT NULL,
+                    claimed_by TEXT,
+                    claimed_until REAL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    finished_at REAL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (kind, status, available_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key, status)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+        except sqlite3.Error as e:
+            logger.error(f"Work queue initialization error: {e}")
+
+    def _transaction(self):
+        return _Transaction(self.conn, self._lock)
+
+    # --- Jobs ---
+
+    def _insert(self, kind, payload, dedupe_key, delay, max_attempts):
+        """Inserts a job inside an open transaction. Returns (job_id, created)."""
+        if dedupe_key:
+            row = self.conn.execute(
+                f"SELECT id FROM jobs WHERE dedupe_key = ? AND status IN {ACTIVE} LIMIT 1",
+                (dedupe_key,)
+            ).fetchone()
+            if row:
+                return row[0], False
+        now = time.time()
+        cursor = self.conn.execute(
+            """
+            INSERT INTO jobs (kind, payload, dedupe_key, max_attempts, available_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (kind, json.dumps(payload), dedupe_key, max_attempts, now + delay, now)
+        )
+        return cursor.lastrowid, True
+
+    def enqueue(self, kind, payload, dedupe_key=None, delay=0, max_attempts=3):
+        """
+        Adds a job. Returns (job_id, created); if an active job with the same
+        dedupe_key exists, returns its id and created=False.
+        """
+        with self._transaction():
+            return self._insert(kind, payload, dedupe_key, delay, max_attempts)
+
+    def claim(self, kinds, worker_id, visibility=300):
+        """
+        Claims the oldest ready job of the given kinds for `visibility` seconds.
+        Returns (job_id, kind, payload, attempts) or None.
+        """
+        now = time.time()
+        placeholders = ", ".join("?" for _ in kinds)
+        with self._transaction():
+            # Claims that expired after the last attempt are given up on
+            self.conn.execute(
+                f"""
+                UPDATE jobs SET status = 'failed', error = 'claim expired', finished_at = ?
+                WHERE status = 'running' AND claimed_until < ? AND attempts >= max_attempts
+                  AND kind IN ({placeholders})
+                """,
+                (now, now, *kinds)
+            )
+            row = self.conn.execute(
+                f"""
+                SELECT id, kind, payload, attempts FROM jobs
+                WHERE kind IN ({placeholders})
+                  AND ((status = 'pending' AND available_at <= ?)
+                       OR (status = 'running' AND claimed_until < ?))
+                ORDER BY available_at, id
+                LIMIT 1
+                """,
+                (*kinds, now, now)
+            ).fetchone()
+            if row is None:
+                return None
+
+            job_id, kind, payload, attempts = row
+            self.conn.execute(
+                """
+                UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                                claimed_by = ?, claimed_until = ?
+                WHERE id = ?
+                """,
+                (worker_id, now + visibility, job_id)
+            )
+        return job_id, kind, json.loads(payload), attempts + 1
+
+    def complete(self, job_id, result=None, follow_up=None):
+        """
+        Marks a job done. follow_up=(kind, payload, dedupe_key), or a list of
+        them, enqueues the next stage in the same transaction, so the hand-off
+        can't be lost.
+        """
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ?, claimed_until = NULL WHERE id = ?",
+                (result, time.time(), job_id)
+            )
+            if isinstance(follow_up, tuple):
+                follow_up = [follow_up]
+            for kind, payload, dedupe_key in follow_up or ():
+                self._insert(kind, payload, dedupe_key, 0, 3)
+
+    def fail(self, job_id, error, retry_delay=60):
+        """Retries the job after retry_delay, or marks it failed once out of attempts."""
+        now = time.time()
+        with self._transaction():
+            row = self.conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            attempts, max_attempts = row
+            if attempts < max_attempts:
+                self.conn.execute(
+                    """
+                    UPDATE jobs SET status = 'pending', error = ?, available_at = ?, claimed_until = NULL
+                    WHERE id = ?
+                    """,
+                    (str(error), now + retry_delay * attempts, job_id)
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, claimed_until = NULL WHERE id = ?",
+                    (str(error), now, job_id)
+                )
+                logger.error(f"Job {job_id} failed after {attempts} attempts: {error}")
+
+    def get_job(self, job_id):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT kind, status, attempts, result, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        kind, status, attempts, result, error = row
+        return {"kind": kind, "status": status, "attempts": attempts, "result": result, "error": error}
+
+    def stats(self):
+        """{status: count} over all jobs."""
+        with self._lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def purge(self, older_than_seconds=7 * 24 * 3600):
+        """Deletes finished jobs older than the cutoff. Returns the number removed."""
+        with self._transaction():
+            cursor = self.conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - older_than_seconds,)
+            )
+        return cursor.rowcount
+
+    # --- Leases (leader election) ---
+
+    def acquire_lease(self, name, holder, ttl=30):
+        """
+        Takes or renews the named lease. Returns True if `holder` now holds it.
+        The current holder must renew well within ttl to keep it.
+        """
+        now = time.time()
+        with self._transaction():
+            row = self.conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != holder and row[1] > now:
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                (name, holder, now + ttl)
+            )
+        return True
+
+    def release_lease(self, name, holder):
+        with self._transaction():
+            self.conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    def lease_holder(self, name):
+        """Current unexpired holder of the lease, or None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT holder FROM leases WHERE name = ? AND expires_at > ?", (name, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK on an autocommit connection."""
+
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error:
+            self.lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
+        return False
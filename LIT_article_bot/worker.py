@@ -0,0 +1,306 @@
+"""
+Fetch / summarize / index worker for split deployments (BOT_ROLE=frontend).
+
+Start the front-end and any number of workers against the same files:
+    BOT_ROLE=frontend python bot.py
+    BOT_ROLE=worker python worker.py      # repeat for more workers
+
+Workers elect a leader through a lease in the work queue; only the leader
+runs the scheduled fetch cycle (and /force_fetch jobs) and queues the relevant
+articles. Every worker summarizes and indexes queued articles. The front-end
+posts summarized articles to the channel, so only it talks to Telegram.
+
+With more than one process on the vector store, run a Chroma server
+(`chroma run --path chroma_db`) and set CHROMA_HOST.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import signal
+import socket
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from config import (
+    RSS_FEEDS, CHECK_INTERVAL_MINUTES, WORK_QUEUE_DB, WORK_POLL_SECONDS, WORKER_CONCURRENCY,
+    LEADER_LEASE_SECONDS, METRICS_HOST, METRICS_PORT, LLM_WARMUP, DIGEST_MODE, DIGEST_MIN_ARTICLES, DIGEST_MAX_ARTICLES,
+    VECTOR_MAINTENANCE_HOURS
+)
+from fetcher import RSSFetcher
+from processor import ArticleProcessor
+from storage import Storage
+from rag_engine import RagEngine
+from fetch_cycle import FetchCycleRunner
+from metrics import MetricsServer
+from llm_client import get_client
+from pipeline import (
+    ensure_default_keywords, channel_router, group_for_digest, index_text, rag_metadata, article_to_payload, article_from_payload
+)
+from work_queue import (
+    WorkQueue, SCHEDULER_LEASE, JOB_FETCH_CYCLE, JOB_PROCESS_ARTICLE, JOB_POST_ARTICLE, JOB_INDEX_ARTICLE,
+    JOB_PROCESS_DIGEST, JOB_POST_DIGEST
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(self, queue, worker_id=None, concurrency=WORKER_CONCURRENCY):
+        self.queue = queue
+        self.worker_id = worker_id or f"worker-{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = concurrency
+
+        self.fetcher = RSSFetcher(RSS_FEEDS)
+        self.processor = ArticleProcessor()
+        self.storage = Storage()
+        self.rag_engine = RagEngine(related_store=self.storage)
+        self.runner = FetchCycleRunner()
+
+        self.is_leader = False
+        self.startup_pending = False
+        self.next_cycle_at = 0.0
+        self.active = set()  # claimed process/index jobs
+        self.cycle_reports = set()  # forced fetch jobs waiting on their run
+        # Vector store retention; RagEngine already ran it at startup
+        self.next_maintenance_at = time.monotonic() + VECTOR_MAINTENANCE_HOURS * 3600
+        self.maintenance = set()
+
+    async def run(self, stop_event):
+        logger.info(f"{self.worker_id} started ({self.concurrency} concurrent jobs).")
+        ensure_default_keywords(self.storage)
+        try:
+            while not stop_event.is_set():
+                try:
+                    self._elect()
+                    if self.is_leader:
+                        self._schedule()
+                    self._claim_jobs()
+                except sqlite3.Error as e:
+                    logger.error(f"Work queue error: {e}")
+
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=WORK_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Finish what we claimed; anything cut short is re-run after its claim expires
+            if self.active:
+                await asyncio.gather(*self.active, return_exceptions=True)
+            if self.is_leader:
+                self.queue.release_lease(SCHEDULER_LEASE, self.worker_id)
+            logger.info(f"{self.worker_id} stopped.")
+
+    # --- Leader election ---
+
+    def _elect(self):
+        leader = self.queue.acquire_lease(SCHEDULER_LEASE, self.worker_id, ttl=LEADER_LEASE_SECONDS)
+        if leader and not self.is_leader:
+            logger.info(f"{self.worker_id} is now the scheduler leader.")
+            # A new leader behaves like a fresh start: catch up on the last week first
+            self.startup_pending = True
+            self.next_cycle_at = time.monotonic() + 5
+        elif not leader and self.is_leader:
+            logger.warning(f"{self.worker_id} lost the scheduler lease.")
+        self.is_leader = leader
+
+    def _schedule(self):
+        now = time.monotonic()
+        if now >= self.next_cycle_at:
+            if self.startup_pending:
+                lookback, limit, reason = datetime.now() - timedelta(days=7), 4, "startup"
+                self.startup_pending = False
+            else:
+                # Look back since last interval (plus a buffer)
+                lookback, limit, reason = datetime.now() - timedelta(minutes=CHECK_INTERVAL_MINUTES + 30), None, "scheduled"
+            self.runner.start(lambda run: self.fetch_cycle(run, lookback, limit), reason=reason)
+            self.next_cycle_at = now + CHECK_INTERVAL_MINUTES * 60
+
+            removed = self.queue.purge()
+            if removed:
+                logger.info(f"Purged {removed} finished jobs.")
+
+        if now >= self.next_maintenance_at and not self.maintenance:
+            self.next_maintenance_at = now + VECTOR_MAINTENANCE_HOURS * 3600
+            self._track(asyncio.to_thread(self.rag_engine.maintain), self.maintenance)
+
+        # Forced fetches from the front-end; the runner keeps them from overlapping a scheduled cycle
+        job = self.queue.claim([JOB_FETCH_CYCLE], self.worker_id, visibility=3600)
+        if job:
+            job_id, _, payload, _ = job
+            lookback = datetime.now() - timedelta(minutes=payload.get("lookback_minutes", CHECK_INTERVAL_MINUTES + 30))
+            run, _ = self.runner.start(
+                lambda run: self.fetch_cycle(run, lookback),
+                reason=payload.get("reason", "forced")
+            )
+            self._track(self._report_cycle(job_id, run), self.cycle_reports)
+
+    async def _report_cycle(self, job_id, run):
+        await run.task
+        if run.status == "done":
+            self.queue.complete(job_id, result=run.summary())
+        else:
+            self.queue.fail(job_id, run.summary())
+
+    async def fetch_cycle(self, run, lookback, limit=None):
+        """Fetches feeds and queues relevant new articles for summarization."""
+        run.set_stage("fetching feeds")
+        # Feed and scraper requests are blocking; keep them off the event loop
+        articles = await asyncio.to_thread(self.fetcher.fetch_updates, lookback)
+        run.found = len(articles)
+        if not articles:
+            logger.info("No new articles found.")
+            return
+
+        run.set_stage("queueing relevant articles")
+        # Newest first, so a limited (startup) cycle queues the latest ones
+        articles.sort(key=lambda x: x['published'], reverse=True)
+        # Every channel's keywords, matched in one pass per article
+        router = channel_router(self.storage)
+        relevant = []
+
+        for article in articles:
+            if limit and len(relevant) >= limit:
+                break
+            if not self.storage.is_new(article['link']):
+                continue
+            run.checked += 1
+            channels = router.route(article)
+            if channels:
+                # Travels with the payload, so the front-end posts to each of them
+                article['channels'] = channels
+                relevant.append(article)
+
+        if DIGEST_MODE in ("cycle", "category") and len(relevant) >= DIGEST_MIN_ARTICLES:
+            # The whole cycle goes to one worker, so a "cycle" digest stays one post
+            links = sorted(article['link'] for article in relevant)
+            _, created = self.queue.enqueue(
+                JOB_PROCESS_DIGEST,
+                {"articles": [article_to_payload(article) for article in relevant]},
+                dedupe_key="digest:" + hashlib.sha1("\n".join(links).encode()).hexdigest()
+            )
+            if created:
+                run.queued += len(relevant)
+            return
+
+        for article in relevant:
+            # Keyed by link: an article already queued or being posted isn't queued twice
+            _, created = self.queue.enqueue(
+                JOB_PROCESS_ARTICLE, article_to_payload(article), dedupe_key=article['link']
+            )
+            if created:
+                run.queued += 1
+
+    # --- Job execution ---
+
+    def _track(self, coro, tasks=None):
+        tasks = self.active if tasks is None else tasks
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    def _claim_jobs(self):
+        while len(self.active) < self.concurrency:
+            job = self.queue.claim(
+                [JOB_PROCESS_ARTICLE, JOB_PROCESS_DIGEST, JOB_INDEX_ARTICLE], self.worker_id, visibility=600
+            )
+            if job is None:
+                return
+            self._track(self._run_job(*job))
+
+    async def _run_job(self, job_id, kind, payload, attempts):
+        try:
+            if kind == JOB_PROCESS_ARTICLE:
+                await self._process_article(job_id, payload)
+            elif kind == JOB_PROCESS_DIGEST:
+                await self._process_digest(job_id, payload)
+            elif kind == JOB_INDEX_ARTICLE:
+                await self._index_article(job_id, payload)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}, attempt {attempts}) failed: {e}")
+            self.queue.fail(job_id, e)
+
+    async def _process_article(self, job_id, payload):
+        article = article_from_payload(payload)
+        if not self.storage.is_new(article['link']):
+            self.queue.complete(job_id, result="already posted")
+            return
+
+        logger.info(f"Processing relevant article: {article['title']}")
+        # Summarization calls Ollama; keep it off the event loop
+        current_keywords = channel_router(self.storage).keywords
+        processed_data = await asyncio.to_thread(self.processor.process_article, article, current_keywords)
+        if not processed_data:
+            raise RuntimeError(f"Failed to process article: {article['title']}")
+
+        # Hand off to the front-end for posting
+        self.queue.complete(
+            job_id,
+            follow_up=(JOB_POST_ARTICLE, {"article": payload, "processed": processed_data}, article['link'])
+        )
+
+    async def _process_digest(self, job_id, payload):
+        articles = [article_from_payload(a) for a in payload["articles"]]
+        articles = [a for a in articles if self.storage.is_new(a['link'])]
+        if not articles:
+            self.queue.complete(job_id, result="already posted")
+            return
+
+        # One Ollama prompt per category group
+        current_keywords = channel_router(self.storage).keywords
+        items = []
+        for group in group_for_digest(self.processor, articles, current_keywords, DIGEST_MAX_ARTICLES):
+            processed = await asyncio.to_thread(self.processor.process_batch, group, current_keywords)
+            items.extend(
+                {"article": article_to_payload(article), "processed": processed_data}
+                for article, processed_data in zip(group, processed)
+            )
+
+        # Hand off to the front-end for posting
+        self.queue.complete(job_id, follow_up=(JOB_POST_DIGEST, {"items": items}, None))
+
+    async def _index_article(self, job_id, payload):
+        article = article_from_payload(payload["article"])
+        await asyncio.to_thread(
+            self.rag_engine.index_article,
+            text=index_text(article),
+            metadata=rag_metadata(article, payload["processed"])
+        )
+        self.queue.complete(job_id)
+
+
+async def main():
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    # Each worker on a host needs its own METRICS_PORT to be scraped
+    metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+    if metrics_server:
+        await metrics_server.start()
+
+    worker = Worker(WorkQueue(WORK_QUEUE_DB))
+    llm = get_client()
+    if LLM_WARMUP:
+        # Load the model before the first summarize job arrives
+        llm.warm_up_in_background()
+    try:
+        await worker.run(stop_event)
+    finally:
+        llm.close()
+        if metrics_server:
+            await metrics_server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(main())